@@ -0,0 +1,84 @@
+"""Launches HackBoard with 'python -m hackboard'"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import NoReturn
+
+from PySide6.QtCore import QObject, QEvent
+
+_launched = time.perf_counter()
+
+
+class _FirstPaint(QObject):
+  """Event filter recording the time of the first paint of a window
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, window: QObject, callback: callable) -> None:
+    QObject.__init__(self)
+    self._window = window
+    self._callback = callback
+
+  def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+    """Invokes the callback on the first paint inside the window"""
+    if event.type() == QEvent.Type.Paint and self._callback is not None:
+      if getattr(obj, 'window', None) is not None \
+          and obj.window() is self._window:
+        callback, self._callback = self._callback, None
+        callback(time.perf_counter())
+    return False
+
+
+def main(argv: list[str] = None) -> int:
+  """Parses the arguments, shows the main window and runs the event
+  loop"""
+  parser = argparse.ArgumentParser(prog='hackboard',
+                                   description='Fast Word Processing')
+  parser.add_argument('files', nargs='*', help='files to open')
+  parser.add_argument('--view', action='store_true',
+                      help='open the first file in the read only viewer')
+  parser.add_argument('--profile-startup', action='store_true',
+                      help='report import time and time to first paint')
+  args = parser.parse_args(argv)
+  started = time.perf_counter()
+  from PySide6.QtWidgets import QApplication
+  app = QApplication.instance() or QApplication(sys.argv[:1])
+  app.setOrganizationName('AsgerJon')
+  app.setApplicationName('hackboard')
+  from hackboard.pyside import MainWindow
+  imported = time.perf_counter()
+  window = MainWindow()
+  constructed = time.perf_counter()
+
+  def report(painted: float) -> NoReturn:
+    """Prints the startup timings"""
+    app.removeEventFilter(firstPaint)
+    rows = [
+      ('launcher', started - _launched),
+      ('imports', imported - started),
+      ('MainWindow()', constructed - imported),
+      ('show to first paint', painted - constructed),
+      ('total to first paint', painted - _launched),
+    ]
+    for name, duration in rows:
+      print('%-22s %8.1f ms' % (name, 1000 * duration), file=sys.stderr)
+
+  if args.profile_startup:
+    firstPaint = _FirstPaint(window, report)
+    app.installEventFilter(firstPaint)
+  window.show()
+  if args.view and args.files:
+    window.openFile(args.files[0], True)
+    for fid in args.files[1:]:
+      window.getTabs().newPage(fid, False)
+  elif args.files:
+    window.openFiles(args.files)
+  return app.exec()
+
+
+if __name__ == '__main__':
+  sys.exit(main())
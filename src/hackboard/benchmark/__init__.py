@@ -0,0 +1,9 @@
+"""Headless benchmarks of the editor hot paths. Run them with
+'python -m hackboard.benchmark'."""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from ._suite import benchmark, getBenchmarks, runBenchmarks
+from ._suite import compareResults, loadResults, saveResults
+from ._suite import formatSize, parseSize
@@ -0,0 +1,63 @@
+"""Runs the benchmarks with 'python -m hackboard.benchmark'"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+
+def main(argv: list[str] = None) -> int:
+  """Runs the benchmarks, writes the results as JSON and compares them
+  with the baseline. Returns 1 if a benchmark regressed."""
+  parser = argparse.ArgumentParser(
+    prog='python -m hackboard.benchmark',
+    description='Headless benchmarks of the editor hot paths')
+  parser.add_argument('names', nargs='*',
+                      help='benchmarks to run, by default all of them')
+  parser.add_argument('--sizes', default='10M,100M',
+                      help='comma separated file sizes, such as 10M,1G')
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--output', help='JSON file receiving the results')
+  parser.add_argument('--baseline', help='JSON results to compare with')
+  parser.add_argument('--tolerance', type=float, default=0.1,
+                      help='relative change accepted before a regression')
+  parser.add_argument('--list', action='store_true',
+                      help='list the benchmarks and exit')
+  args = parser.parse_args(argv)
+  os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+  from PySide6.QtCore import QStandardPaths
+  from PySide6.QtWidgets import QApplication
+  QStandardPaths.setTestModeEnabled(True)
+  app = QApplication.instance() or QApplication(sys.argv[:1])
+  from hackboard.benchmark import _cases
+  from hackboard.benchmark import getBenchmarks, runBenchmarks, parseSize
+  from hackboard.benchmark import saveResults, loadResults, compareResults
+  if args.list:
+    print('\n'.join(getBenchmarks()))
+    return 0
+  unknown = set(args.names) - set(getBenchmarks())
+  if unknown:
+    parser.error('unknown benchmarks: %s' % ', '.join(sorted(unknown)))
+  sizes = [parseSize(size) for size in args.sizes.split(',') if size]
+
+  def log(line: str) -> None:
+    """Reports progress on stderr, keeping stdout for the JSON"""
+    print(line, file=sys.stderr)
+
+  results = runBenchmarks(args.names, sizes, args.repeat, log)
+  saveResults(results, args.output)
+  if args.baseline is None:
+    return 0
+  regressions = 0
+  for key, ratio, regressed in compareResults(
+      results, loadResults(args.baseline), args.tolerance):
+    regressions += regressed
+    log('%-32s %7.2fx %s' % (key, ratio, 'REGRESSED' if regressed else ''))
+  app.processEvents()
+  return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
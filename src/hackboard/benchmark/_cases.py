@@ -0,0 +1,365 @@
+"""The benchmarks of the editor hot paths"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import atexit
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, NoReturn
+
+from PySide6.QtCore import QEventLoop, QTimer, SignalInstance
+from PySide6.QtGui import QTextCursor, QTextDocument
+from PySide6.QtWidgets import QApplication, QPlainTextDocumentLayout
+
+from hackboard.benchmark._suite import benchmark
+
+documentSize = 1 << 20
+logMessages = 100000
+dictionaryWords = 100000
+dictionaryQueries = 2000
+
+_words = """lorem ipsum dolor sit amet consectetur adipiscing elit sed do
+eiusmod tempor incididunt ut labore et dolore magna aliqua enim ad minim
+veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea
+commodo consequat duis aute irure in reprehenderit voluptate velit esse
+cillum fugiat nulla pariatur excepteur sint occaecat cupidatat non
+proident sunt culpa qui officia deserunt mollit anim id est laborum""".split()
+
+_workDir = None
+_files = {}
+_wordLists = {}
+
+
+def _getWorkDir() -> str:
+  """Returns the temporary directory of the benchmarks, removed at exit"""
+  global _workDir
+  if _workDir is None:
+    _workDir = tempfile.mkdtemp(prefix='hackboard-bench-')
+    atexit.register(shutil.rmtree, _workDir, True)
+  return _workDir
+
+
+def loremText(size: int, seed: int = 0) -> str:
+  """Returns lorem ipsum style text of about the size in characters, as
+  paragraphs of sentences"""
+  rng = random.Random(seed)
+  paragraphs, length = [], 0
+  while length < size:
+    sentences = []
+    for _ in range(rng.randint(3, 8)):
+      words = rng.choices(_words, k=rng.randint(6, 16))
+      sentences.append(' '.join(words).capitalize() + '.')
+    paragraph = ' '.join(sentences)
+    paragraphs.append(paragraph)
+    length += len(paragraph) + 1
+  return '\n'.join(paragraphs)[:size]
+
+
+def _loremFile(size: int) -> str:
+  """Returns a file of lorem ipsum of the size in bytes, writing it the
+  first time"""
+  fid = _files.get(size)
+  if fid is None:
+    fid = os.path.join(_getWorkDir(), 'lorem-%d.txt' % size)
+    chunk = (loremText(1 << 20) + '\n').encode('utf-8')
+    with open(fid, 'wb') as file:
+      written = 0
+      while written < size:
+        data = chunk[:size - written]
+        file.write(data)
+        written += len(data)
+    _files[size] = fid
+  return fid
+
+
+def _wait(signal: SignalInstance, timeout: int = 3600000) -> NoReturn:
+  """Runs the event loop until the signal is emitted"""
+  loop = QEventLoop()
+  signal.connect(loop.quit)
+  QTimer.singleShot(timeout, loop.quit)
+  loop.exec()
+  signal.disconnect(loop.quit)
+
+
+def _document(text: str = '') -> QTextDocument:
+  """Returns a plain text document with the text"""
+  document = QTextDocument()
+  document.setDocumentLayout(QPlainTextDocumentLayout(document))
+  document.setPlainText(text)
+  return document
+
+
+def _cursorWords(document: QTextDocument) -> int:
+  """Counts the words by moving a cursor word by word, as the document
+  was iterated before iterateWords"""
+  cursor, count = QTextCursor(document), 0
+  while not cursor.atEnd():
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfWord,
+                        QTextCursor.MoveMode.KeepAnchor)
+    if cursor.selectedText().strip():
+      count += 1
+    if not cursor.movePosition(QTextCursor.MoveOperation.NextWord):
+      break
+  return count
+
+
+@benchmark('docInsert')
+def docInsert() -> float:
+  """Inserts a large amount of lorem ipsum into a DocWidget, as
+  debugFunc01 does"""
+  from hackboard.pyside import DocWidget
+  text = loremText(documentSize)
+  widget = DocWidget()
+  widget.show()
+  start = time.perf_counter()
+  widget.insertPlainText(text)
+  QApplication.processEvents()
+  elapsed = time.perf_counter() - start
+  widget.close()
+  widget.deleteLater()
+  return elapsed
+
+
+@benchmark('logThroughput', 'msg/s', True)
+def logThroughput() -> float:
+  """Sends messages to LogWidget.tellMe and runs the event loop until all
+  of them are shown"""
+  from hackboard.pyside import LogWidget
+  widget = LogWidget(spoolDir=tempfile.mkdtemp(dir=_getWorkDir()))
+  widget.show()
+  QApplication.processEvents()
+  start = time.perf_counter()
+  for count in range(logMessages):
+    widget.tellMe('Benchmark message %d' % count)
+  while widget.model.pendingCount():
+    QApplication.processEvents()
+  elapsed = time.perf_counter() - start
+  widget.close()
+  widget.deleteLater()
+  return logMessages / elapsed
+
+
+@benchmark('openFile')
+def openFile(size: int) -> float:
+  """Streams a file of the size into a document with FileLoader"""
+  from hackboard.pyside import FileLoader
+  fid, document = _loremFile(size), _document()
+  loader = FileLoader()
+  start = time.perf_counter()
+  loader.load(fid, document)
+  _wait(loader.finished)
+  return time.perf_counter() - start
+
+
+@benchmark('saveFile')
+def saveFile(size: int) -> float:
+  """Saves a document of the size to a new file with FileSaver"""
+  from hackboard.pyside import FileSaver
+  with open(_loremFile(size), 'r', encoding='utf-8') as file:
+    document = _document(file.read())
+  target = os.path.join(_getWorkDir(), 'saved-%d.txt' % size)
+  if os.path.exists(target):
+    os.remove(target)
+  saver = FileSaver()
+  start = time.perf_counter()
+  saver.save(target, document)
+  saver.wait()
+  return time.perf_counter() - start
+
+
+@benchmark('cursorWords')
+def cursorWords() -> float:
+  """Iterates the words of a large document by moving a cursor"""
+  document = _document(loremText(documentSize))
+  start = time.perf_counter()
+  _cursorWords(document)
+  return time.perf_counter() - start
+
+
+@benchmark('blockWords')
+def blockWords() -> float:
+  """Iterates the words of a large document block by block"""
+  from hackboard.pyside import iterateWords
+  document = _document(loremText(documentSize))
+  start = time.perf_counter()
+  for _ in iterateWords(document):
+    pass
+  return time.perf_counter() - start
+
+
+@benchmark('search')
+def search() -> float:
+  """Searches a large document with a fresh SearchIndex, including the
+  indexing"""
+  from hackboard.pyside import SearchIndex
+  document = _document(loremText(documentSize))
+  index = SearchIndex(document)
+  start = time.perf_counter()
+  index.searchNow('laboris nisi')
+  _wait(index.searchFinished)
+  return time.perf_counter() - start
+
+
+@benchmark('searchIndexed')
+def searchIndexed() -> float:
+  """Searches a large document already indexed"""
+  from hackboard.pyside import SearchIndex
+  document = _document(loremText(documentSize))
+  index = SearchIndex(document)
+  index.searchNow('laboris nisi')
+  _wait(index.searchFinished)
+  start = time.perf_counter()
+  index.searchNow('dolore magna')
+  _wait(index.searchFinished)
+  return time.perf_counter() - start
+
+
+@benchmark('mainWindowShow')
+def mainWindowShow() -> float:
+  """Constructs and shows the MainWindow"""
+  from hackboard.pyside import MainWindow
+  start = time.perf_counter()
+  window = MainWindow()
+  window.show()
+  QApplication.processEvents()
+  elapsed = time.perf_counter() - start
+  window.close()
+  window.deleteLater()
+  QApplication.processEvents()
+  return elapsed
+
+
+def _wordList(count: int = dictionaryWords) -> str:
+  """Returns a word list of the count of random words with frequency
+  counts, writing it the first time"""
+  fid = _wordLists.get(count)
+  if fid is None:
+    rng, words = random.Random(count), set()
+    while len(words) < count:
+      words.add(''.join(rng.choices('abcdefghijklmnopqrstuvwxyz',
+                                    k=rng.randint(3, 12))))
+    fid = os.path.join(_getWorkDir(), 'words-%d.txt' % count)
+    with open(fid, 'w', encoding='utf-8') as file:
+      for word in sorted(words):
+        file.write('%s %d\n' % (word, rng.randint(1, 100000)))
+    _wordLists[count] = fid
+  return fid
+
+
+def _compiledDictionary(count: int = dictionaryWords) -> str:
+  """Returns the compiled dictionary of the word list of the count,
+  compiling it the first time"""
+  from hackboard.pyside import compileDictionary
+  target = '%s.hbdict' % _wordList(count)
+  if not os.path.exists(target):
+    compileDictionary(_wordList(count), target)
+  return target
+
+
+def _queries(count: int = dictionaryQueries) -> list[str]:
+  """Returns words of the word list followed by as many misspellings"""
+  rng = random.Random(1)
+  with open(_wordList(), 'r', encoding='utf-8') as file:
+    words = [line.split()[0] for line in file]
+  known = rng.sample(words, count)
+  return known + [word[:-1] + 'q' for word in known]
+
+
+def _openTime(opener: Callable) -> float:
+  """Returns the seconds taken by the opener"""
+  start = time.perf_counter()
+  opener()
+  return time.perf_counter() - start
+
+
+def _retainedBytes(opener: Callable) -> float:
+  """Returns the bytes of the Python heap retained by the object returned
+  by the opener. Pages of a memory map are shared with the page cache and
+  are not counted."""
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    dictionary = opener()
+    retained = tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+  del dictionary
+  return retained
+
+
+@benchmark('dictionaryCompile')
+def dictionaryCompile() -> float:
+  """Compiles the word list to the memory mapped dictionary format"""
+  from hackboard.pyside import compileDictionary
+  target = os.path.join(_getWorkDir(), 'compiled.hbdict')
+  source = _wordList()
+  start = time.perf_counter()
+  compileDictionary(source, target)
+  return time.perf_counter() - start
+
+
+@benchmark('dictionaryOpen')
+def dictionaryOpen() -> float:
+  """Opens the compiled dictionary, as at startup"""
+  from hackboard.pyside import CompactDictionary
+  fid = _compiledDictionary()
+  return _openTime(lambda: CompactDictionary(fid).close())
+
+
+@benchmark('wordListOpen')
+def wordListOpen() -> float:
+  """Reads the plain word list into the set based WordList, as the
+  dictionary was loaded before the compiled format"""
+  from hackboard.pyside import WordList
+  fid = _wordList()
+  return _openTime(lambda: WordList(fid))
+
+
+@benchmark('dictionaryMemory', 'B')
+def dictionaryMemory() -> float:
+  """Python heap retained by the opened compiled dictionary"""
+  from hackboard.pyside import CompactDictionary
+  fid = _compiledDictionary()
+  return _retainedBytes(lambda: CompactDictionary(fid))
+
+
+@benchmark('wordListMemory', 'B')
+def wordListMemory() -> float:
+  """Python heap retained by the set based WordList"""
+  from hackboard.pyside import WordList
+  fid = _wordList()
+  return _retainedBytes(lambda: WordList(fid))
+
+
+@benchmark('dictionaryLookup')
+def dictionaryLookup() -> float:
+  """Seconds per membership test in the compiled dictionary, half of the
+  words known"""
+  from hackboard.pyside import CompactDictionary
+  dictionary, queries = CompactDictionary(_compiledDictionary()), _queries()
+  start = time.perf_counter()
+  for word in queries:
+    _ = word in dictionary
+  elapsed = time.perf_counter() - start
+  dictionary.close()
+  return elapsed / len(queries)
+
+
+@benchmark('dictionarySuggest')
+def dictionarySuggest() -> float:
+  """Seconds per suggestion for a misspelled word from the compiled
+  dictionary"""
+  from hackboard.pyside import CompactDictionary
+  dictionary = CompactDictionary(_compiledDictionary())
+  queries = _queries(dictionaryQueries // 10)[dictionaryQueries // 10:]
+  start = time.perf_counter()
+  for word in queries:
+    dictionary.suggest(word)
+  elapsed = time.perf_counter() - start
+  dictionary.close()
+  return elapsed / len(queries)
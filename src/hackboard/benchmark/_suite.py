@@ -0,0 +1,128 @@
+"""The benchmark registry, runner and baseline comparison"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, NoReturn, Optional
+
+_benchmarks = {}
+
+
+def benchmark(name: str, unit: str = 's',
+              higherIsBetter: bool = False) -> Callable:
+  """Decorator registering the function as the benchmark of the name. The
+  function receives the size and returns the measured value, such that
+  setting up and tearing down are left out of the measurement."""
+
+  def decorator(func: Callable) -> Callable:
+    """Registers the function"""
+    _benchmarks[name] = (func, unit, higherIsBetter)
+    return func
+
+  return decorator
+
+
+def getBenchmarks() -> list[str]:
+  """Returns the names of the registered benchmarks"""
+  return list(_benchmarks)
+
+
+def runBenchmarks(names: list[str] = None, sizes: list[int] = None,
+                  repeat: int = 3, log: Callable = None) -> dict:
+  """Runs the benchmarks and returns the results as a dictionary ready
+  for JSON. A benchmark taking a size is run once per size, and its
+  results are keyed by name and size. Each benchmark is repeated and the
+  median and best values are reported."""
+  from PySide6 import __version__ as pysideVersion
+  results = {}
+  for name in names or getBenchmarks():
+    func, unit, higherIsBetter = _benchmarks[name]
+    for size in (sizes or [None]) if _takesSize(func) else [None]:
+      key = name if size is None else '%s[%s]' % (name, formatSize(size))
+      values = []
+      for _ in range(repeat):
+        values.append(func(size) if size is not None else func())
+      best = max(values) if higherIsBetter else min(values)
+      results[key] = {
+        'median': statistics.median(values),
+        'best': best,
+        'values': values,
+        'unit': unit,
+        'higherIsBetter': higherIsBetter,
+      }
+      if log is not None:
+        log('%-32s %12.4g %s' % (key, results[key]['median'], unit))
+  return {
+    'meta': {
+      'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+      'python': sys.version.split()[0],
+      'pyside': pysideVersion,
+      'platform': platform.platform(),
+      'repeat': repeat,
+    },
+    'results': results,
+  }
+
+
+def _takesSize(func: Callable) -> bool:
+  """Flag indicating if the benchmark takes a size"""
+  return func.__code__.co_argcount > 0
+
+
+def formatSize(size: int) -> str:
+  """Returns the size with a binary unit suffix"""
+  for suffix, factor in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+    if size >= factor and not size % factor:
+      return '%d%s' % (size // factor, suffix)
+  return str(size)
+
+
+def parseSize(text: str) -> int:
+  """Parses a size such as '10M' or '1G'"""
+  factors = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+  text = text.strip().upper()
+  if text and text[-1] in factors:
+    return int(float(text[:-1]) * factors[text[-1]])
+  return int(text)
+
+
+def compareResults(results: dict, baseline: dict,
+                   tolerance: float = 0.1) -> list[tuple[str, float, bool]]:
+  """Compares the medians of the results with those of the baseline.
+  Returns for each benchmark present in both the ratio of the new value
+  to the baseline value and a flag indicating if the benchmark regressed
+  by more than the tolerance."""
+  comparison = []
+  old = baseline.get('results', {})
+  for key, new in results.get('results', {}).items():
+    if key not in old or not old[key]['median']:
+      continue
+    ratio = new['median'] / old[key]['median']
+    if new['higherIsBetter']:
+      regressed = ratio < 1 - tolerance
+    else:
+      regressed = ratio > 1 + tolerance
+    comparison.append((key, ratio, regressed))
+  return comparison
+
+
+def loadResults(fid: str) -> dict:
+  """Reads results from the JSON file"""
+  with open(fid, 'r', encoding='utf-8') as file:
+    return json.load(file)
+
+
+def saveResults(results: dict, fid: Optional[str]) -> NoReturn:
+  """Writes the results as JSON to the file, or to stdout if no file is
+  given"""
+  if fid is None:
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return
+  with open(fid, 'w', encoding='utf-8') as file:
+    json.dump(results, file, indent=2)
@@ -1,14 +1,132 @@
-"""PySide6 implementations"""
+"""PySide6 implementations. The members are imported lazily on first
+access, such that importing the package only loads the modules needed."""
 #  Copyright (c) 2023 Asger Jon Vistisen
 #  MIT Licence
 from __future__ import annotations
 
-from ._styles import getStyle
-from ._policy import hPol, vPol, minPol, maxPol
-from ._toolbar import CustomToolBar
-from ._logwidget import LogWidget
-from ._docwidget import DocWidget
-from ._basewindow import BaseWindow
-from ._layoutwindow import LayoutWindow
-from ._inputwindow import InputWindow
-from ._mainwindow import MainWindow
+from importlib import import_module
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+  from ._styles import StyleRegistry, getStyleRegistry, getStyle
+  from ._policy import hPol, vPol, minPol, maxPol
+  from ._toolbar import CustomToolBar
+  from ._logspool import LogSpool, LogHistoryModel, defaultSpoolDir
+  from ._logmodel import LogModel
+  from ._logwidget import LogWidget
+  from ._dictionary import CompactDictionary, compileDictionary
+  from ._dictionary import openDictionary, editDistance
+  from ._dictionary import defaultDictionaryDir
+  from ._worditerator import WordSpan, wordPattern
+  from ._worditerator import iterateWords, iterateBlockWords
+  from ._spellchecker import SpellChecker, WordList
+  from ._markdown import MarkdownHighlighter, blockState
+  from ._keylatency import KeyLatency, LatencyHistogram, keyLatency
+  from ._watchdog import StallWatchdog, defaultReportFile
+  from ._docstats import DocumentStats
+  from ._searchindex import SearchIndex, trigrams
+  from ._replacer import Replacer
+  from ._replacedialog import ReplaceDialog
+  from ._textmodel import TextModel, TextSnapshot, utf16Length
+  from ._textmodel import pythonIndex
+  from ._undomanager import UndoManager
+  from ._completer import WordTrie, Vocabulary, WordCompleter
+  from ._completer import wordBefore
+  from ._docwidget import DocWidget
+  from ._fileloader import FileLoader, sniffEncoding
+  from ._fileviewer import FileViewer, isViewable, lineIndexFile
+  from ._filesaver import FileSaver
+  from ._autosave import AutoSaver, RecoverySession, defaultRecoveryDir
+  from ._doctabs import DocumentTabs, DocumentPage
+  from ._commands import Command, CommandRegistry, keySequences
+  from ._basewindow import BaseWindow
+  from ._layoutwindow import LayoutWindow
+  from ._inputwindow import InputWindow
+  from ._debugdata import DebugData, formatBytes
+  from ._mainwindow import MainWindow
+
+_members = {
+  'StyleRegistry': '._styles',
+  'getStyleRegistry': '._styles',
+  'getStyle': '._styles',
+  'hPol': '._policy',
+  'vPol': '._policy',
+  'minPol': '._policy',
+  'maxPol': '._policy',
+  'CustomToolBar': '._toolbar',
+  'LogSpool': '._logspool',
+  'LogHistoryModel': '._logspool',
+  'defaultSpoolDir': '._logspool',
+  'LogModel': '._logmodel',
+  'LogWidget': '._logwidget',
+  'CompactDictionary': '._dictionary',
+  'compileDictionary': '._dictionary',
+  'openDictionary': '._dictionary',
+  'editDistance': '._dictionary',
+  'defaultDictionaryDir': '._dictionary',
+  'WordSpan': '._worditerator',
+  'wordPattern': '._worditerator',
+  'iterateWords': '._worditerator',
+  'iterateBlockWords': '._worditerator',
+  'SpellChecker': '._spellchecker',
+  'WordList': '._spellchecker',
+  'MarkdownHighlighter': '._markdown',
+  'blockState': '._markdown',
+  'KeyLatency': '._keylatency',
+  'LatencyHistogram': '._keylatency',
+  'keyLatency': '._keylatency',
+  'StallWatchdog': '._watchdog',
+  'defaultReportFile': '._watchdog',
+  'DocumentStats': '._docstats',
+  'SearchIndex': '._searchindex',
+  'trigrams': '._searchindex',
+  'Replacer': '._replacer',
+  'ReplaceDialog': '._replacedialog',
+  'TextModel': '._textmodel',
+  'TextSnapshot': '._textmodel',
+  'utf16Length': '._textmodel',
+  'pythonIndex': '._textmodel',
+  'UndoManager': '._undomanager',
+  'WordTrie': '._completer',
+  'Vocabulary': '._completer',
+  'WordCompleter': '._completer',
+  'wordBefore': '._completer',
+  'DocWidget': '._docwidget',
+  'FileLoader': '._fileloader',
+  'sniffEncoding': '._fileloader',
+  'FileViewer': '._fileviewer',
+  'isViewable': '._fileviewer',
+  'lineIndexFile': '._fileviewer',
+  'FileSaver': '._filesaver',
+  'AutoSaver': '._autosave',
+  'RecoverySession': '._autosave',
+  'defaultRecoveryDir': '._autosave',
+  'DocumentTabs': '._doctabs',
+  'DocumentPage': '._doctabs',
+  'Command': '._commands',
+  'CommandRegistry': '._commands',
+  'keySequences': '._commands',
+  'BaseWindow': '._basewindow',
+  'LayoutWindow': '._layoutwindow',
+  'InputWindow': '._inputwindow',
+  'DebugData': '._debugdata',
+  'formatBytes': '._debugdata',
+  'MainWindow': '._mainwindow',
+}
+
+__all__ = list(_members)
+
+
+def __getattr__(name: str) -> Any:
+  """Imports the module defining the member on first access"""
+  module = _members.get(name)
+  if module is None:
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+  value = getattr(import_module(module, __name__), name)
+  globals()[name] = value
+  return value
+
+
+def __dir__() -> list[str]:
+  """Lists the members including those not yet imported"""
+  return sorted(set(globals()) | set(_members))
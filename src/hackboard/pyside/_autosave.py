@@ -0,0 +1,420 @@
+"""AutoSaver journals unsaved edits for crash recovery"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import json
+import os
+import queue
+import shutil
+import struct
+import time
+import zlib
+from typing import NoReturn, Optional, Iterator
+
+from PySide6.QtCore import QObject, QThread, QTimer, QLockFile, \
+  QStandardPaths, Signal
+
+from hackboard.pyside import TextModel, TextSnapshot, utf16Length
+
+_RECORD = struct.Struct('<IQQI')
+
+
+def defaultRecoveryDir() -> str:
+  """Returns the default directory of the recovery sessions"""
+  location = QStandardPaths.StandardLocation.AppLocalDataLocation
+  return os.path.join(QStandardPaths.writableLocation(location), 'recovery')
+
+
+def _checkpointFile(directory: str, generation: int) -> str:
+  """Returns the name of the checkpoint of the generation"""
+  return os.path.join(directory, 'checkpoint-%08d.txt' % generation)
+
+
+def _journalFile(directory: str, generation: int) -> str:
+  """Returns the name of the journal of the generation"""
+  return os.path.join(directory, 'journal-%08d.bin' % generation)
+
+
+def _readJournal(fid: str) -> Iterator[tuple[int, int, str]]:
+  """Yields the position, the removed length and the added text of each
+  edit in the journal, stopping at the first incomplete or corrupt
+  record"""
+  try:
+    with open(fid, 'rb') as file:
+      data = file.read()
+  except OSError:
+    return
+  start = 0
+  while start + _RECORD.size <= len(data):
+    crc, position, removed, length = _RECORD.unpack_from(data, start)
+    end = start + _RECORD.size + length
+    if end > len(data) or zlib.crc32(data[start + 4:end]) != crc:
+      return
+    added = data[start + _RECORD.size:end]
+    yield position, removed, added.decode('utf-8', 'surrogatepass')
+    start = end
+
+
+class _AutosaveWorker(QThread):
+  """Performs the writes of the AutoSaver in the order they are queued.
+  Checkpoints are written to a temporary file which is renamed into place,
+  after which the files of the previous generation are removed. Journal
+  records are appended and synced. Failed writes are reported by failed.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  failed = Signal(str)
+
+  def __init__(self, tasks: queue.Queue, chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._tasks = tasks
+    self._chunkSize = chunkSize
+    self._journal = None
+    self.error: Optional[OSError] = None
+
+  def run(self) -> NoReturn:
+    """Performs the tasks until receiving None"""
+    while True:
+      task = self._tasks.get()
+      if task is None:
+        break
+      try:
+        getattr(self, task[0])(*task[1:])
+      except OSError as e:
+        self.error = e
+        self.failed.emit(str(e))
+    self._closeJournal()
+
+  def _closeJournal(self) -> NoReturn:
+    """Closes the open journal, if any"""
+    if self._journal is not None:
+      self._journal.close()
+      self._journal = None
+
+  def meta(self, directory: str, data: dict) -> NoReturn:
+    """Writes the description of the session"""
+    fid = os.path.join(directory, 'session.json')
+    with open('%s.tmp' % fid, 'w', encoding='utf-8') as file:
+      json.dump(data, file)
+    os.replace('%s.tmp' % fid, fid)
+
+  def checkpoint(self, directory: str, generation: int,
+                 snapshot: TextSnapshot) -> NoReturn:
+    """Writes the snapshot and starts the journal of the generation"""
+    self._closeJournal()
+    target = _checkpointFile(directory, generation)
+    with open('%s.tmp' % target, 'wb') as file:
+      start, length = 0, snapshot.length()
+      while start < length:
+        end = min(start + self._chunkSize, length)
+        data = snapshot.slice(start, end).encode('utf-8', 'surrogatepass')
+        file.write(data)
+        start = end
+      file.flush()
+      os.fsync(file.fileno())
+    os.replace('%s.tmp' % target, target)
+    self._journal = open(_journalFile(directory, generation), 'wb')
+    for old in (_checkpointFile(directory, generation - 1),
+                _journalFile(directory, generation - 1)):
+      if os.path.exists(old):
+        os.remove(old)
+
+  def journal(self, records: list[tuple[int, int, str]]) -> NoReturn:
+    """Appends the edits to the journal"""
+    if self._journal is None:
+      return
+    parts = []
+    for position, removed, added in records:
+      data = added.encode('utf-8', 'surrogatepass')
+      body = _RECORD.pack(0, position, removed, len(data))[4:] + data
+      parts.append(struct.pack('<I', zlib.crc32(body)))
+      parts.append(body)
+    self._journal.write(b''.join(parts))
+    self._journal.flush()
+    os.fsync(self._journal.fileno())
+
+  def discard(self, directory: str) -> NoReturn:
+    """Removes the files of the session"""
+    self._closeJournal()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class RecoverySession:
+  """RecoverySession is the journal left by a previous run which ended
+  with unsaved changes. Its lock is held from being found until it is
+  recovered or discarded, such that no other instance offers it too.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, directory: str, lock: QLockFile) -> None:
+    self._directory = directory
+    self._lock = lock
+    try:
+      with open(os.path.join(directory, 'session.json'),
+                encoding='utf-8') as file:
+        self._meta = json.load(file)
+    except (OSError, ValueError):
+      self._meta = {}
+
+  def getDirectory(self) -> str:
+    """Getter-function for the directory of the session"""
+    return self._directory
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file the document was opened from"""
+    return self._meta.get('fileName')
+
+  def getModified(self) -> float:
+    """Getter-function for the time of the last write to the session"""
+    return max((os.path.getmtime(os.path.join(self._directory, name))
+                for name in os.listdir(self._directory)), default=0.0)
+
+  def _generation(self) -> Optional[int]:
+    """Returns the most recent generation having a checkpoint"""
+    generations = [int(name[11:-4]) for name in os.listdir(self._directory)
+                   if name.startswith('checkpoint-')
+                   and name.endswith('.txt')]
+    return max(generations, default=None)
+
+  def isRecoverable(self) -> bool:
+    """Flag indicating if the session holds a checkpoint"""
+    return self._generation() is not None
+
+  def recover(self) -> TextSnapshot:
+    """Returns the text of the last checkpoint with the journal replayed
+    onto it"""
+    generation = self._generation()
+    with open(_checkpointFile(self._directory, generation), 'rb') as file:
+      text = file.read().decode('utf-8', 'surrogatepass')
+    snapshot = TextSnapshot.fromText(text)
+    for position, removed, added in _readJournal(
+        _journalFile(self._directory, generation)):
+      snapshot = snapshot.replace(position, position + removed, added)
+    return snapshot
+
+  def discard(self) -> NoReturn:
+    """Removes the session"""
+    self._lock.unlock()
+    shutil.rmtree(self._directory, ignore_errors=True)
+
+  def release(self) -> NoReturn:
+    """Leaves the session to be offered again on the next launch"""
+    self._lock.unlock()
+
+
+class AutoSaver(QObject):
+  """AutoSaver protects the unsaved edits of a document against crashes.
+  The edits reported by the TextModel are collected on the GUI thread,
+  which costs an append per keystroke. When the user has been idle for
+  the delay, the collected edits are handed to a worker thread which
+  appends them as compact records of position, removed length and added
+  text to a journal, and syncs it to disk.
+
+  The journal is replayed onto a checkpoint holding the full text. A
+  checkpoint is written from a snapshot of the TextModel, which is taken
+  in constant time, when the document is first modified and again when
+  the journal exceeds its limit. The session is removed when the document
+  is saved or loaded, and when the window closes without unsaved
+  changes. A session left by a crash, or by closing with unsaved changes,
+  is found by findSessions on the next launch.
+
+  The model may be replaced by setModel. A document which is freed while
+  its tab hibernates is detached with None, keeping the session, and the
+  document restored with the same text is attached in its place. The
+  worker thread is started with the first session, such that documents
+  without unsaved changes cost no thread. If the session cannot be created
+  or written, failed is emitted with the error, and the edits are not
+  protected until a later checkpoint succeeds.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  failed = Signal(str)
+
+  def __init__(self, model: Optional[TextModel], parent: QObject = None,
+               directory: str = None, delay: int = 2000,
+               journalLimit: int = 4194304,
+               chunkSize: int = 1048576) -> None:
+    QObject.__init__(self, parent)
+    self._model: Optional[TextModel] = None
+    self._document = None
+    self._modified = False
+    self._directory = defaultRecoveryDir() if directory is None \
+      else directory
+    self._journalLimit = journalLimit
+    self._fileName: Optional[str] = None
+    self._session: Optional[str] = None
+    self._lock: Optional[QLockFile] = None
+    self._generation = 0
+    self._records = []
+    self._journalSize = 0
+    self._needCheckpoint = False
+    self._suspended = False
+    self._tasks = queue.Queue()
+    self._worker = _AutosaveWorker(self._tasks, chunkSize)
+    self._worker.failed.connect(self.failed)
+    self._debounce = QTimer(self)
+    self._debounce.setSingleShot(True)
+    self._debounce.setInterval(delay)
+    self._debounce.timeout.connect(self.flush)
+    self.setModel(model)
+
+  def getModel(self) -> Optional[TextModel]:
+    """Getter-function for the model journaled"""
+    return self._model
+
+  def setModel(self, model: Optional[TextModel]) -> NoReturn:
+    """Sets the model journaled. The edits collected from the previous
+    model are flushed first, and the session is kept. The text of the new
+    model must be that of the session."""
+    if self._model is not None:
+      self.flush()
+      self._model.changed.disconnect(self._changed)
+      self._model.reset.disconnect(self.checkpoint)
+      self._document.modificationChanged.disconnect(
+        self._modificationChanged)
+    self._model = model
+    self._document = None if model is None else model.getDocument()
+    if model is None:
+      return
+    self._modified = self._document.isModified()
+    model.changed.connect(self._changed)
+    model.reset.connect(self.checkpoint)
+    self._document.modificationChanged.connect(self._modificationChanged)
+
+  def getSessionDir(self) -> Optional[str]:
+    """Getter-function for the directory of the current session"""
+    return self._session
+
+  def setFileName(self, fid: Optional[str]) -> NoReturn:
+    """Sets the file the document belongs to, recorded in the session"""
+    self._fileName = fid
+    if self._session is not None:
+      self._tasks.put(('meta', self._session, self._meta()))
+
+  def _meta(self) -> dict:
+    """Returns the description of the session"""
+    return {'fileName': self._fileName, 'pid': os.getpid(),
+            'started': time.time()}
+
+  def suspend(self) -> NoReturn:
+    """Stops journaling, such as while a file is loaded"""
+    self._suspended = True
+    self._debounce.stop()
+
+  def resume(self, *_) -> NoReturn:
+    """Resumes journaling of a document matching its file"""
+    self._suspended = False
+    self.discard()
+
+  def _changed(self, position: int, removed: str, added: str) -> NoReturn:
+    """Collects the edit. The removed length is journaled in the UTF-16
+    units of the positions."""
+    if self._suspended:
+      return
+    if self._session is None:
+      self._needCheckpoint = True
+    elif not self._needCheckpoint:
+      self._records.append((position, utf16Length(removed), added))
+      self._journalSize += _RECORD.size + len(added)
+    self._debounce.start()
+
+  def checkpoint(self) -> NoReturn:
+    """Schedules a checkpoint of the whole text, such as when the edits
+    were not reported"""
+    if not self._suspended:
+      self._needCheckpoint = True
+      self._debounce.start()
+
+  def _modificationChanged(self, modified: bool) -> NoReturn:
+    """Removes the session when the document matches its file"""
+    self._modified = modified
+    if not modified and not self._suspended:
+      self.discard()
+
+  def _startSession(self) -> bool:
+    """Creates the directory of the session and locks it. Returns False,
+    after emitting failed, if either is not possible."""
+    name = '%d-%d' % (os.getpid(), time.time_ns())
+    session = os.path.join(self._directory, name)
+    try:
+      os.makedirs(session, exist_ok=True)
+    except OSError as e:
+      self.failed.emit(str(e))
+      return False
+    lock = QLockFile(os.path.join(session, 'lock'))
+    if not lock.tryLock(0):
+      shutil.rmtree(session, ignore_errors=True)
+      self.failed.emit('Cannot lock the recovery session %s' % session)
+      return False
+    self._session, self._lock = session, lock
+    if not self._worker.isRunning():
+      self._worker.start()
+    self._tasks.put(('meta', self._session, self._meta()))
+    return True
+
+  def flush(self) -> NoReturn:
+    """Hands the collected edits, or a new checkpoint, to the worker"""
+    self._debounce.stop()
+    if self._suspended or self._model is None:
+      return
+    if self._journalSize > self._journalLimit:
+      self._needCheckpoint = True
+    if self._needCheckpoint:
+      if self._session is None and not self._startSession():
+        return
+      self._generation += 1
+      self._tasks.put(('checkpoint', self._session, self._generation,
+                       self._model.snapshot()))
+      self._needCheckpoint = False
+      self._records, self._journalSize = [], 0
+    elif self._records:
+      self._tasks.put(('journal', self._records))
+      self._records = []
+
+  def discard(self) -> NoReturn:
+    """Removes the session, leaving no edits to recover"""
+    self._debounce.stop()
+    self._records, self._journalSize = [], 0
+    self._needCheckpoint = False
+    if self._session is None:
+      return
+    self._lock.unlock()
+    self._tasks.put(('discard', self._session))
+    self._session, self._lock = None, None
+
+  def close(self) -> NoReturn:
+    """Writes the remaining edits and stops the worker. The session is
+    kept if the document has unsaved changes, and removed otherwise."""
+    if self._modified and not self._suspended:
+      self.flush()
+    else:
+      self.discard()
+    if self._worker.isRunning():
+      self._tasks.put(None)
+      self._worker.wait()
+    if self._lock is not None:
+      self._lock.unlock()
+
+  @staticmethod
+  def findSessions(directory: str = None) -> list[RecoverySession]:
+    """Returns the sessions left by previous runs which are not held by a
+    running instance, the most recent first"""
+    directory = defaultRecoveryDir() if directory is None else directory
+    if not os.path.isdir(directory):
+      return []
+    sessions = []
+    for name in os.listdir(directory):
+      path = os.path.join(directory, name)
+      if not os.path.isdir(path):
+        continue
+      lock = QLockFile(os.path.join(path, 'lock'))
+      lock.setStaleLockTime(0)
+      if not lock.tryLock(0):
+        continue
+      session = RecoverySession(path, lock)
+      if session.isRecoverable():
+        sessions.append(session)
+      else:
+        session.discard()
+    return sorted(sessions, key=RecoverySession.getModified, reverse=True)
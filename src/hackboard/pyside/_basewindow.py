@@ -5,14 +5,14 @@
 from __future__ import annotations
 
 import os
-from typing import NoReturn
+from typing import NoReturn, Optional
 
-from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QAction, QPixmap, QKeyEvent
-from PySide6.QtWidgets import QMainWindow, QMenu, QLabel, QStatusBar, \
-  QSizePolicy, QWidget
+from PySide6.QtGui import QTextDocument, QCloseEvent, QKeySequence
+from PySide6.QtWidgets import QMainWindow, QLabel, QSizePolicy, QWidget, \
+  QFileDialog, QPlainTextDocumentLayout
 
-from hackboard.pyside import getStyle
+from hackboard.pyside import getStyleRegistry, FileLoader, FileSaver, \
+  ReplaceDialog, isViewable, CommandRegistry
 
 
 class BaseWindow(QMainWindow):
@@ -25,165 +25,79 @@ class BaseWindow(QMainWindow):
   You can add more widgets and layouts to this subclass later on to create
   your word processing application.
 
-  Signals:
-  -------
-  None
+  The actions are commands of a CommandRegistry, see getCommands. The
+  menus are filled when first opened, and shortcuts are dispatched by the
+  registry, including from the document widgets watched by it.
 
   Slots:
   -----
   new_file()
       Creates a new file.
   open_file()
-      Opens an existing file.
+      Opens existing files.
+  open_read_only()
+      Opens an existing file in the read only viewer.
+  cancel_load()
+      Cancels the file load in progress.
   save_file()
       Saves the current file.
   save_file_as()
       Saves the current file with a new name.
+  close_file()
+      Closes the current file.
   cut()
       Cuts the selected text.
   copy()
       Copies the selected text.
   paste()
       Pastes the copied or cut text.
+  replace_all()
+      Finds and replaces all matches of a pattern.
+  load_dictionary()
+      Loads the dictionary used for spell checking.
 
   """
 
-  spaceKeyRelease = Signal()
-  spaceKeyPress = Signal()
+  viewerThreshold = 268435456
 
   def __init__(self, parent: QWidget = None) -> None:
     QMainWindow.__init__(self, parent)
-    statusBar = QLabel()
-    statusBar.setStyleSheet(getStyle('QLabel'))
+    self._statusLabel = QLabel()
     policy = QSizePolicy()
     policy.setVerticalPolicy(QSizePolicy.Policy.Maximum)
     policy.setHorizontalPolicy(QSizePolicy.Policy.Expanding)
-    statusBar.setSizePolicy(policy)
-    self.statusBar().addWidget(statusBar)
-
-    # Create menus
-    file_menu = self.menuBar().addMenu("&File")
-    edit_menu = self.menuBar().addMenu("&Edit")
-    helpMenu = self.menuBar().addMenu("&Help")
-
-    # Create actions
-    new_action = QAction("&New", self)
-    open_action = QAction("&Open", self)
-    save_action = QAction("&Save", self)
-    save_as_action = QAction("Save &As...", self)
-    exit_action = QAction("&Exit", self)
-
-    cut_action = QAction("Cu&t", self)
-    copy_action = QAction("&Copy", self)
-    paste_action = QAction("&Paste", self)
-
-    # Add actions to menus
-    file_menu.addAction(new_action)
-    file_menu.addAction(open_action)
-    file_menu.addAction(save_action)
-    file_menu.addAction(save_as_action)
-    file_menu.addSeparator()
-    file_menu.addAction(exit_action)
-
-    edit_menu.addAction(cut_action)
-    edit_menu.addAction(copy_action)
-    edit_menu.addAction(paste_action)
-
-    # Connect signals and slots
-    new_action.triggered.connect(self.new_file)
-    open_action.triggered.connect(self.open_file)
-    save_action.triggered.connect(self.save_file)
-    save_as_action.triggered.connect(self.save_file_as)
-    exit_action.triggered.connect(self.close)
-
-    cut_action.triggered.connect(self.cut)
-    copy_action.triggered.connect(self.copy)
-    paste_action.triggered.connect(self.paste)
-
-    self.debugAction01 = QAction("Debug 01", self)
-    self.debugAction02 = QAction("Debug 02", self)
-    self.debugAction03 = QAction("Debug 03", self)
-    self.debugAction04 = QAction("Debug 04", self)
-    self.debugAction05 = QAction("Debug 05", self)
-    self.debugAction06 = QAction("Debug 06", self)
-    self.debugAction07 = QAction("Debug 07", self)
-    self.debugAction08 = QAction("Debug 08", self)
-    self.debugAction09 = QAction("Debug 09", self)
-    self.debugAction10 = QAction("Debug 10", self)
-    self.debugAction11 = QAction("Debug 11", self)
-    self.debugAction12 = QAction("Debug 12", self)
-    helpMenu.addAction(self.debugAction01)
-    helpMenu.addAction(self.debugAction02)
-    helpMenu.addAction(self.debugAction03)
-    helpMenu.addAction(self.debugAction04)
-    helpMenu.addAction(self.debugAction05)
-    helpMenu.addAction(self.debugAction06)
-    helpMenu.addAction(self.debugAction07)
-    helpMenu.addAction(self.debugAction08)
-    helpMenu.addAction(self.debugAction09)
-    helpMenu.addAction(self.debugAction10)
-    helpMenu.addAction(self.debugAction11)
-    helpMenu.addAction(self.debugAction12)
-
-    self.debugAction01.setShortcut("QKeySequence.fromString('F1')")
-    self.debugAction01.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction01.triggered.connect(self.debugFunc01)
-
-    self.debugAction02.setShortcut("QKeySequence.fromString('F2')")
-    self.debugAction02.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction02.triggered.connect(self.debugFunc02)
-
-    self.debugAction03.setShortcut("QKeySequence.fromString('F3')")
-    self.debugAction03.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction03.triggered.connect(self.debugFunc03)
-
-    self.debugAction04.setShortcut("QKeySequence.fromString('F4')")
-    self.debugAction04.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction04.triggered.connect(self.debugFunc04)
-
-    self.debugAction05.setShortcut("QKeySequence.fromString('F5')")
-    self.debugAction05.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction05.triggered.connect(self.debugFunc05)
-
-    self.debugAction06.setShortcut("QKeySequence.fromString('F6')")
-    self.debugAction06.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction06.triggered.connect(self.debugFunc06)
-
-    self.debugAction07.setShortcut("QKeySequence.fromString('F7')")
-    self.debugAction07.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction07.triggered.connect(self.debugFunc07)
-
-    self.debugAction08.setShortcut("QKeySequence.fromString('F8')")
-    self.debugAction08.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction08.triggered.connect(self.debugFunc08)
-
-    self.debugAction09.setShortcut("QKeySequence.fromString('F9')")
-    self.debugAction09.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction09.triggered.connect(self.debugFunc09)
-
-    self.debugAction10.setShortcut("QKeySequence.fromString('F10')")
-    self.debugAction10.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction10.triggered.connect(self.debugFunc10)
-
-    self.debugAction11.setShortcut("QKeySequence.fromString('F11')")
-    self.debugAction11.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction11.triggered.connect(self.debugFunc11)
-
-    self.debugAction12.setShortcut("QKeySequence.fromString('F12')")
-    self.debugAction12.setShortcutContext(
-      Qt.ShortcutContext.ApplicationShortcut)
-    self.debugAction12.triggered.connect(self.debugFunc12)
+    self._statusLabel.setSizePolicy(policy)
+    self.statusBar().addWidget(self._statusLabel)
+    getStyleRegistry().apply(self.statusBar(), 'QLabel')
+
+    self._fileName = None
+    self._replaceDialog = None
+    self._document: Optional[QTextDocument] = None
+    self._fileLoader: Optional[FileLoader] = None
+    self._fileSaver: Optional[FileSaver] = None
+
+    self._commands = CommandRegistry(self)
+    add, key = self._commands.add, QKeySequence.StandardKey
+    add('new', '&New', self.new_file, key.AddTab, '&File')
+    add('open', '&Open', self.open_file, None, '&File')
+    add('openReadOnly', 'Open &Read-Only...', self.open_read_only, None,
+        '&File')
+    add('save', '&Save', self.save_file, None, '&File')
+    add('saveAs', 'Save &As...', self.save_file_as, None, '&File')
+    add('close', '&Close', self.close_file, key.Close, '&File')
+    add('cancelLoad', 'Cancel &Load', self.cancel_load, 'Esc', '&File',
+        enabled=False)
+    add('exit', '&Exit', self.close, None, '&File', True)
+    add('cut', 'Cu&t', self.cut, None, '&Edit')
+    add('copy', '&Copy', self.copy, None, '&Edit')
+    add('paste', '&Paste', self.paste, None, '&Edit')
+    add('replace', '&Replace All...', self.replace_all, key.Replace,
+        '&Edit', True)
+    add('dictionary', 'Load &Dictionary...', self.load_dictionary, None,
+        '&Edit')
+    for index in range(1, 13):
+      add('debug%02d' % index, 'Debug %02d' % index,
+          getattr(self, 'debugFunc%02d' % index), 'F%d' % index, '&Help')
 
   def show(self) -> NoReturn:
     """Sets up debuggers"""
@@ -194,13 +108,156 @@ class BaseWindow(QMainWindow):
     """Sets up the debuggers"""
     print('Setting up debuggers!')
 
-  def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    QMainWindow.keyReleaseEvent(self, event)
-
-  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    QMainWindow.keyPressEvent(self, event)
+  def getCommands(self) -> CommandRegistry:
+    """Getter-function for the command registry, in which plugins may
+    register commands of their own"""
+    return self._commands
+
+  def getDoc(self) -> QTextDocument:
+    """Getter-function for the underlying document. The window holds an
+    empty plain text document of its own, created on first use, while
+    subclasses providing the document widget reimplement this method."""
+    if self._document is None:
+      self._document = QTextDocument(self)
+      self._document.setDocumentLayout(
+        QPlainTextDocumentLayout(self._document))
+    return self._document
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file name of the document"""
+    return self._fileName
+
+  def setFileName(self, fid: Optional[str]) -> NoReturn:
+    """Setter-function for the file name of the document"""
+    self._fileName = fid
+
+  def getFileLoader(self) -> FileLoader:
+    """Getter-function for the loader of the document. The loader is
+    created on first use, as subclasses holding several documents
+    reimplement this method."""
+    if self._fileLoader is None:
+      self._fileLoader = FileLoader(self)
+      self._fileLoader.progressed.connect(self._loadProgressed)
+      self._fileLoader.finished.connect(self._loadFinished)
+      self._fileLoader.failed.connect(self._loadFailed)
+      self._fileLoader.cancelled.connect(self._loadCancelled)
+    return self._fileLoader
+
+  def getFileSaver(self) -> FileSaver:
+    """Getter-function for the saver of the document. The saver is
+    created on first use, see getFileLoader."""
+    if self._fileSaver is None:
+      self._fileSaver = FileSaver(self)
+      self._fileSaver.saved.connect(self._saveFinished)
+      self._fileSaver.failed.connect(self._saveFailed)
+    return self._fileSaver
+
+  def newDocument(self) -> NoReturn:
+    """Starts a new document by cancelling any load in progress and
+    clearing the document"""
+    self.getFileLoader().cancel()
+    self.getDoc().clear()
+    self.getDoc().setModified(False)
+    self.setFileName(None)
+    self.setStatus('New document')
+
+  def closeDocument(self) -> NoReturn:
+    """Closes the document, leaving an empty one in its place"""
+    self.newDocument()
+
+  def loadDictionary(self, fid: str) -> NoReturn:
+    """Loads the spell checking dictionary from the file. The window has
+    no spell checker of its own and says so in the status bar, while
+    subclasses providing the document widget reimplement this method."""
+    self.setStatus('Spell checking is not available for %s'
+                   % os.path.basename(fid))
+
+  def setStatus(self, msg: str) -> NoReturn:
+    """Shows the message in the status bar"""
+    self._statusLabel.setText(msg)
+
+  def viewFile(self, fid: str) -> NoReturn:
+    """Shows the file in the read only viewer. The window has no viewer of
+    its own, so the message is shown in the status bar, while subclasses
+    providing the viewer reimplement this method."""
+    self.setStatus('Cannot open %s read-only' % os.path.basename(fid))
+
+  def isViewing(self) -> bool:
+    """Flag indicating if a file is shown in the read only viewer"""
+    return False
+
+  def openFile(self, fid: str, readOnly: bool = None) -> NoReturn:
+    """Opens the file in the read only viewer if readOnly is True, and
+    otherwise loads it into the document. If readOnly is None, files
+    larger than viewerThreshold bytes are opened in the viewer."""
+    if readOnly is None:
+      try:
+        readOnly = os.path.getsize(fid) > self.viewerThreshold
+      except OSError as e:
+        return self.setStatus('Failed to load file: %s' % e)
+    if readOnly and isViewable(fid):
+      return self.viewFile(fid)
+    self.loadFile(fid)
+
+  def openFiles(self, fids: list[str]) -> NoReturn:
+    """Opens the files in turn"""
+    for fid in fids:
+      self.openFile(fid)
+
+  def loadFile(self, fid: str) -> NoReturn:
+    """Streams the file into the document"""
+    self.setFileName(fid)
+    self._commands.setEnabled('cancelLoad', True)
+    self.getFileLoader().load(fid, self.getDoc())
+
+  def _loadProgressed(self, position: int, total: int) -> NoReturn:
+    """Shows loading progress in the status bar"""
+    percent = 100 * position // total if total else 100
+    name = os.path.basename(self.getFileLoader().getFileName())
+    self.setStatus('Loading %s: %d%%' % (name, percent))
+
+  def _loadFinished(self, fid: str) -> NoReturn:
+    """Invoked when the file has been loaded"""
+    self._commands.setEnabled('cancelLoad', self.getFileLoader().isLoading())
+    self.setStatus('Loaded %s' % os.path.basename(fid))
+
+  def _loadFailed(self, msg: str) -> NoReturn:
+    """Invoked when the file could not be loaded"""
+    self._commands.setEnabled('cancelLoad', self.getFileLoader().isLoading())
+    self.setStatus('Failed to load file: %s' % msg)
+
+  def _loadCancelled(self) -> NoReturn:
+    """Invoked when the load was cancelled"""
+    self._commands.setEnabled('cancelLoad', self.getFileLoader().isLoading())
+    self.setStatus('Cancelled loading %s' % os.path.basename(
+      self.getFileLoader().getFileName()))
+
+  def saveFile(self, fid: str) -> NoReturn:
+    """Saves the document to the file in the background"""
+    if self.getFileLoader().isLoading():
+      return self.setStatus('Cannot save while the file is loading')
+    if self.isViewing():
+      return self.setStatus('Cannot save a file opened read-only')
+    self.setFileName(fid)
+    self.setStatus('Saving %s' % os.path.basename(fid))
+    self.getFileSaver().save(fid, self.getDoc())
+
+  def _saveFinished(self, fid: str) -> NoReturn:
+    """Invoked when the file has been saved"""
+    if not self.getFileSaver().isDirty():
+      self.getDoc().setModified(False)
+    self.setStatus('Saved %s' % os.path.basename(fid))
+
+  def _saveFailed(self, msg: str) -> NoReturn:
+    """Invoked when the file could not be saved"""
+    self.setStatus('Failed to save file: %s' % msg)
+
+  def closeEvent(self, event: QCloseEvent) -> NoReturn:
+    """Stops the file loader and completes any save in progress before
+    closing"""
+    self.getFileLoader().cancel()
+    self.getFileSaver().wait()
+    QMainWindow.closeEvent(self, event)
 
   def debugFunc01(self) -> NoReturn:
     """Debugger 01"""
@@ -251,11 +308,13 @@ class BaseWindow(QMainWindow):
     -------
     None
     """
-    pass
+    self.newDocument()
 
   def open_file(self):
     """
-    Opens an existing file.
+    Opens existing files. The files are streamed into documents in the
+    background, see FileLoader. Files larger than viewerThreshold are
+    opened in the read only viewer, see FileViewer.
 
     Parameters:
     ----------
@@ -265,11 +324,45 @@ class BaseWindow(QMainWindow):
     -------
     None
     """
-    pass
+    fids, _ = QFileDialog.getOpenFileNames(self, 'Open Files')
+    if fids:
+      self.openFiles(fids)
+
+  def open_read_only(self):
+    """
+    Opens an existing file in the read only viewer regardless of its size.
+
+    Parameters:
+    ----------
+    None
+
+    Returns:
+    -------
+    None
+    """
+    fid, _ = QFileDialog.getOpenFileName(self, 'Open File Read-Only')
+    if fid:
+      self.openFile(fid, True)
+
+  def cancel_load(self):
+    """
+    Cancels the file load in progress. Text already loaded remains in the
+    document.
+
+    Parameters:
+    ----------
+    None
+
+    Returns:
+    -------
+    None
+    """
+    self.getFileLoader().cancel()
 
   def save_file(self):
     """
-    Saves the current file.
+    Saves the current file. The file is written in the background, see
+    FileSaver.
 
     Parameters:
     ----------
@@ -279,7 +372,9 @@ class BaseWindow(QMainWindow):
     -------
     None
     """
-    pass
+    if self.getFileName() is None:
+      return self.save_file_as()
+    self.saveFile(self.getFileName())
 
   def save_file_as(self):
     """
@@ -293,7 +388,24 @@ class BaseWindow(QMainWindow):
     -------
     None
     """
-    pass
+    fid, _ = QFileDialog.getSaveFileName(self, 'Save File As')
+    if fid:
+      self.saveFile(fid)
+
+  def close_file(self):
+    """
+    Closes the current file. Unsaved changes are kept by the autosaver
+    and offered for recovery on the next launch.
+
+    Parameters:
+    ----------
+    None
+
+    Returns:
+    -------
+    None
+    """
+    self.closeDocument()
 
   def cut(self):
     """
@@ -336,3 +448,40 @@ class BaseWindow(QMainWindow):
     None
     """
     pass
+
+  def replace_all(self):
+    """
+    Finds and replaces all matches of a pattern. The matches can be
+    previewed before they are applied as a single undo step.
+
+    Parameters:
+    ----------
+    None
+
+    Returns:
+    -------
+    None
+    """
+    document = self.getDoc()
+    dialog = self._replaceDialog
+    if dialog is None or dialog.getDocument() is not document:
+      dialog = ReplaceDialog(document, self.centralWidget(), self)
+      self._replaceDialog = dialog
+    dialog.show()
+    dialog.raise_()
+
+  def load_dictionary(self):
+    """
+    Loads the dictionary used for spell checking.
+
+    Parameters:
+    ----------
+    None
+
+    Returns:
+    -------
+    None
+    """
+    fid, _ = QFileDialog.getOpenFileName(self, 'Load Dictionary')
+    if fid:
+      self.loadDictionary(fid)
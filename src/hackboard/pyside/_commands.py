@@ -0,0 +1,273 @@
+"""CommandRegistry dispatches the commands of a window"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import weakref
+from typing import NoReturn, Any, Callable, Optional
+
+from PySide6.QtCore import QObject, QEvent, Qt, Signal
+from PySide6.QtGui import QAction, QKeyEvent, QKeySequence
+from PySide6.QtWidgets import QMainWindow, QMenu, QWidget, QApplication
+
+from hackboard.pyside import keyLatency
+
+_modifierMask = (Qt.KeyboardModifier.ShiftModifier
+                 | Qt.KeyboardModifier.ControlModifier
+                 | Qt.KeyboardModifier.AltModifier
+                 | Qt.KeyboardModifier.MetaModifier).value
+
+
+def keySequences(shortcut: Any) -> list[QKeySequence]:
+  """Returns the key sequences of the shortcut, which may be None, a
+  standard key, a key, a string such as 'Ctrl+T', a QKeySequence or a
+  list of these. A standard key gives the bindings of the platform."""
+  if shortcut is None:
+    return []
+  if isinstance(shortcut, (list, tuple)):
+    return [sequence for item in shortcut for sequence in keySequences(item)]
+  if isinstance(shortcut, QKeySequence.StandardKey):
+    sequences = QKeySequence.keyBindings(shortcut)
+  elif isinstance(shortcut, str):
+    sequences = [QKeySequence.fromString(shortcut)]
+  else:
+    sequences = [QKeySequence(shortcut)]
+  return [sequence for sequence in sequences if not sequence.isEmpty()]
+
+
+def eventKey(event: QKeyEvent) -> int:
+  """Returns the key of the event combined with its modifiers, disregarding
+  the keypad modifier, as in the first key of a QKeySequence"""
+  return event.key() | event.modifiers().value & _modifierMask
+
+
+class Command:
+  """Command is an operation of the window declared by its id, the label
+  shown in its menu, its handler, its shortcuts and the title of its menu.
+  Commands without a menu are reached by their shortcuts only. A command
+  with separator set is preceded by a separator in its menu.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, commandId: str, label: str, handler: Callable,
+               shortcut: Any = None, menu: str = None,
+               separator: bool = False, enabled: bool = True) -> None:
+    self._id = commandId
+    self._label = label
+    self._handler = handler
+    self._shortcuts = keySequences(shortcut)
+    self._menu = menu
+    self._separator = separator
+    self._enabled = enabled
+
+  def getId(self) -> str:
+    """Getter-function for the id"""
+    return self._id
+
+  def getLabel(self) -> str:
+    """Getter-function for the label"""
+    return self._label
+
+  def getHandler(self) -> Callable:
+    """Getter-function for the handler"""
+    return self._handler
+
+  def getShortcuts(self) -> list[QKeySequence]:
+    """Getter-function for the key sequences"""
+    return self._shortcuts
+
+  def getMenu(self) -> Optional[str]:
+    """Getter-function for the title of the menu"""
+    return self._menu
+
+  def hasSeparator(self) -> bool:
+    """Flag indicating if the command is preceded by a separator"""
+    return self._separator
+
+  def isEnabled(self) -> bool:
+    """Flag indicating if the command can be triggered"""
+    return self._enabled
+
+  def setEnabled(self, enabled: bool) -> NoReturn:
+    """Setter-function for the enabled flag. The registry updates the
+    action of the command, see CommandRegistry.setEnabled."""
+    self._enabled = enabled
+
+  def getText(self) -> str:
+    """Returns the text of the menu entry, showing the first shortcut"""
+    if not self._shortcuts:
+      return self._label
+    return '%s\t%s' % (self._label, self._shortcuts[0].toString(
+      QKeySequence.SequenceFormat.NativeText))
+
+
+class CommandRegistry(QObject):
+  """CommandRegistry holds the commands of a window. The menus are added
+  to the menu bar when the first command is registered in them, while
+  their actions are created the first time a menu opens, and again only
+  after commands are added to or removed from it.
+
+  Shortcuts are dispatched by an event filter on the window and on the
+  widgets passed to watch. The first key of each sequence of a command is
+  kept in a table, so a key press is matched by a single dictionary
+  lookup, and key latency is measured from there, see KeyLatency. When
+  commands share a key, the most recently registered takes it. Plugins
+  add commands with register or add in the same way as the window itself.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  commandTriggered = Signal(str)
+
+  def __init__(self, window: QMainWindow) -> None:
+    QObject.__init__(self, window)
+    self._window = window
+    self._commands: dict[str, Command] = {}
+    self._keys: dict[int, Command] = {}
+    self._menus: dict[str, QMenu] = {}
+    self._stale: set[str] = set()
+    self._actions: dict[str, QAction] = {}
+    self._watched = weakref.WeakSet()
+    self.watch(window)
+
+  def commands(self) -> list[Command]:
+    """Returns the commands in the order registered"""
+    return list(self._commands.values())
+
+  def getCommand(self, commandId: str) -> Optional[Command]:
+    """Returns the command of the id, or None if not registered"""
+    return self._commands.get(commandId)
+
+  def getAction(self, commandId: str) -> Optional[QAction]:
+    """Returns the action of the command, or None if its menu has not yet
+    been opened"""
+    return self._actions.get(commandId)
+
+  def add(self, commandId: str, label: str, handler: Callable,
+          shortcut: Any = None, menu: str = None, separator: bool = False,
+          enabled: bool = True) -> Command:
+    """Creates and registers a command, see Command"""
+    return self.register(Command(commandId, label, handler, shortcut,
+                                 menu, separator, enabled))
+
+  def register(self, command: Command) -> Command:
+    """Registers the command and binds its shortcuts"""
+    if command.getId() in self._commands:
+      raise ValueError('Command already registered: %s' % command.getId())
+    self._commands[command.getId()] = command
+    for sequence in command.getShortcuts():
+      self._keys[sequence[0].toCombined()] = command
+    if command.getMenu() is not None:
+      self.getMenu(command.getMenu())
+      self._stale.add(command.getMenu())
+    return command
+
+  def unregister(self, commandId: str) -> Optional[Command]:
+    """Removes the command and its shortcuts, and returns it"""
+    command = self._commands.pop(commandId, None)
+    if command is None:
+      return None
+    for key in [k for k, c in self._keys.items() if c is command]:
+      del self._keys[key]
+    for other in reversed(self._commands.values()):
+      for sequence in other.getShortcuts():
+        self._keys.setdefault(sequence[0].toCombined(), other)
+    action = self._actions.pop(commandId, None)
+    if action is not None:
+      action.deleteLater()
+    if command.getMenu() is not None:
+      self._stale.add(command.getMenu())
+    return command
+
+  def getMenu(self, title: str) -> QMenu:
+    """Returns the menu of the title, adding it to the menu bar of the
+    window if it does not exist"""
+    menu = self._menus.get(title)
+    if menu is None:
+      menu = self._window.menuBar().addMenu(title)
+      menu.aboutToShow.connect(lambda t=title: self._buildMenu(t))
+      self._menus[title] = menu
+    return menu
+
+  def _buildMenu(self, title: str) -> NoReturn:
+    """Fills the menu with actions for its commands, if changed since it
+    was last filled"""
+    if title not in self._stale:
+      return
+    self._stale.discard(title)
+    menu = self._menus[title]
+    menu.clear()
+    for command in self._commands.values():
+      if command.getMenu() != title:
+        continue
+      if command.hasSeparator():
+        menu.addSeparator()
+      action = self._actions.get(command.getId())
+      if action is None:
+        action = QAction(command.getText(), self)
+        action.setEnabled(command.isEnabled())
+        action.triggered.connect(
+          lambda *_, c=command.getId(): self.trigger(c))
+        self._actions[command.getId()] = action
+      menu.addAction(action)
+
+  def isEnabled(self, commandId: str) -> bool:
+    """Flag indicating if the command is registered and enabled"""
+    command = self._commands.get(commandId)
+    return command is not None and command.isEnabled()
+
+  def setEnabled(self, commandId: str, enabled: bool) -> NoReturn:
+    """Enables or disables the command"""
+    self._commands[commandId].setEnabled(enabled)
+    action = self._actions.get(commandId)
+    if action is not None:
+      action.setEnabled(enabled)
+
+  def trigger(self, commandId: str) -> bool:
+    """Invokes the handler of the command if it is enabled, and returns
+    whether it was invoked"""
+    command = self._commands.get(commandId)
+    if command is None or not command.isEnabled():
+      return False
+    command.getHandler()()
+    self.commandTriggered.emit(commandId)
+    return True
+
+  def findCommand(self, event: QKeyEvent) -> Optional[Command]:
+    """Returns the command bound to the key of the event, if any"""
+    return self._keys.get(eventKey(event))
+
+  def dispatch(self, event: QKeyEvent) -> bool:
+    """Triggers the enabled command bound to the key of the event, and
+    returns whether one was triggered"""
+    command = self._keys.get(eventKey(event))
+    if command is None or not command.isEnabled():
+      return False
+    return self.trigger(command.getId())
+
+  def watch(self, widget: QWidget) -> NoReturn:
+    """Dispatches the shortcuts pressed in the widget before the widget
+    handles them"""
+    widget.installEventFilter(self)
+    if widget is not self._window:
+      self._watched.add(widget)
+
+  def _entered(self, watched: QObject) -> bool:
+    """Flag indicating if the key press enters the window at the watched
+    object, rather than having propagated to the window from a watched
+    widget which ignored it"""
+    return watched is not self._window \
+      or QApplication.focusWidget() not in self._watched
+
+  def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+    """Dispatches key presses bound to commands. When key latency is
+    measured, the key press is timestamped here, before dispatch, and the
+    dispatch is marked as a stage."""
+    if event.type() != QEvent.Type.KeyPress:
+      return QObject.eventFilter(self, watched, event)
+    measured = keyLatency.enabled and self._entered(watched)
+    if measured:
+      keyLatency.begin()
+    handled = bool(self._keys) and self.dispatch(event)
+    if measured:
+      keyLatency.mark('dispatch')
+    return handled
@@ -0,0 +1,453 @@
+"""Word completion from the vocabulary of the document"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import heapq
+import re
+import time
+from collections import Counter, deque
+from typing import NoReturn, Any, Optional
+
+from PySide6.QtCore import QObject, QTimer, QStringListModel, Qt, Signal
+from PySide6.QtWidgets import QCompleter, QPlainTextEdit
+
+from hackboard.pyside import TextModel, TextSnapshot, wordPattern, \
+  utf16Length
+from hackboard.pyside import pythonIndex
+
+_nonWord = re.compile(r"[\d_]|(?!['’])\W")
+
+
+def _wordStart(snapshot: TextSnapshot, position: int, length: int) -> str:
+  """Returns the text before the position back to the nearest character
+  which cannot be part of a word of wordPattern, reading windows of the
+  length, doubled until such a character or the start is found"""
+  while True:
+    start = max(position - length, 0)
+    text = snapshot.slice(start, position)
+    reverse = text[::-1]
+    match = _nonWord.search(reverse, 0, len(reverse) - bool(start))
+    if match is not None:
+      return text[len(text) - match.start():]
+    if not start:
+      return text
+    length *= 2
+
+
+def _wordEnd(snapshot: TextSnapshot, position: int, length: int) -> str:
+  """Returns the text after the position up to the nearest character
+  which cannot be part of a word of wordPattern, see _wordStart"""
+  total = snapshot.length()
+  while True:
+    end = min(position + length, total)
+    text = snapshot.slice(position, end)
+    match = _nonWord.search(text, 0, len(text) - (end < total))
+    if match is not None:
+      return text[:match.start()]
+    if end >= total:
+      return text
+    length *= 2
+
+
+class _TrieNode:
+  """Node of the WordTrie. The count is the frequency of the word ending
+  at the node, and best is the highest count in the subtree.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('children', 'count', 'best')
+
+  def __init__(self) -> None:
+    self.children: Optional[dict[str, _TrieNode]] = None
+    self.count = 0
+    self.best = 0
+
+
+class WordTrie:
+  """WordTrie is a prefix trie of words weighted by their frequency. Each
+  node knows the highest frequency in its subtree, such that the most
+  frequent completions of a prefix are found by a best first search which
+  visits only the branches leading to them, however many words share the
+  prefix.
+
+  The number of words is bounded by maxWords. When exceeded, the rarest
+  words are evicted until a quarter of the room is free again. An evicted
+  word starts over from its next occurrence, so the counts of rare words
+  are approximate.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, maxWords: int = 20000) -> None:
+    self._maxWords = maxWords
+    self._root = _TrieNode()
+    self._size = 0
+    self._nodes = 1
+
+  def __len__(self) -> int:
+    return self._size
+
+  def __contains__(self, word: str) -> bool:
+    return self.getCount(word) > 0
+
+  def getMaxWords(self) -> int:
+    """Getter-function for the maximum number of words"""
+    return self._maxWords
+
+  def getNodeCount(self) -> int:
+    """Getter-function for the number of nodes"""
+    return self._nodes
+
+  def clear(self) -> NoReturn:
+    """Removes every word"""
+    self._root = _TrieNode()
+    self._size = 0
+    self._nodes = 1
+
+  def _find(self, word: str) -> Optional[_TrieNode]:
+    """Returns the node of the word or prefix, or None if not present"""
+    node = self._root
+    for char in word:
+      if node.children is None:
+        return None
+      node = node.children.get(char)
+      if node is None:
+        return None
+    return node
+
+  def getCount(self, word: str) -> int:
+    """Returns the frequency of the word"""
+    node = self._find(word)
+    return 0 if node is None else node.count
+
+  def add(self, word: str, count: int = 1) -> NoReturn:
+    """Adds count occurrences of the word"""
+    node, path = self._root, [self._root]
+    for char in word:
+      if node.children is None:
+        node.children = {}
+      child = node.children.get(char)
+      if child is None:
+        child = node.children[char] = _TrieNode()
+        self._nodes += 1
+      node = child
+      path.append(node)
+    if not node.count:
+      self._size += 1
+    node.count += count
+    for item in path:
+      if item.best < node.count:
+        item.best = node.count
+    if self._size > self._maxWords:
+      self.evict(self._maxWords * 3 // 4)
+
+  def remove(self, word: str, count: int = 1) -> NoReturn:
+    """Removes count occurrences of the word. Words not present, such as
+    evicted ones, are ignored."""
+    node, path = self._root, []
+    for char in word:
+      if node.children is None or char not in node.children:
+        return
+      path.append((node, char))
+      node = node.children[char]
+    if not node.count:
+      return
+    previous = node.count
+    node.count = max(previous - count, 0)
+    if not node.count:
+      self._size -= 1
+    for parent, char in reversed(path):
+      best = node.count
+      if node.children:
+        best = max(best, max(c.best for c in node.children.values()))
+      if not best:
+        del parent.children[char]
+        if not parent.children:
+          parent.children = None
+        self._nodes -= 1
+      elif best == node.best:
+        return
+      node.best = best
+      node = parent
+    best = node.count
+    if node.children:
+      best = max(best, max(c.best for c in node.children.values()))
+    node.best = best
+
+  def words(self) -> list[tuple[int, str]]:
+    """Returns the frequency and the text of every word"""
+    found, stack = [], [(self._root, '')]
+    while stack:
+      node, text = stack.pop()
+      if node.count:
+        found.append((node.count, text))
+      if node.children:
+        stack.extend((child, text + char)
+                     for char, child in node.children.items())
+    return found
+
+  def evict(self, target: int) -> NoReturn:
+    """Removes the rarest words until at most target words remain"""
+    excess = self._size - target
+    if excess <= 0:
+      return
+    for count, word in heapq.nsmallest(excess, self.words()):
+      self.remove(word, count)
+
+  def complete(self, prefix: str, limit: int = 8) -> list[str]:
+    """Returns up to limit words starting with the prefix, other than the
+    prefix itself, most frequent first and alphabetically among equally
+    frequent words"""
+    node = self._find(prefix)
+    if node is None:
+      return []
+    found, heap = [], [(-node.best, prefix, 1, node)]
+    while heap and len(found) < limit:
+      value, text, kind, node = heapq.heappop(heap)
+      if not kind:
+        if text != prefix:
+          found.append(text)
+        continue
+      if node.count:
+        heapq.heappush(heap, (-node.count, text, 0, None))
+      if node.children:
+        for char, child in node.children.items():
+          heapq.heappush(heap, (-child.best, text + char, 1, child))
+    return found
+
+
+class Vocabulary(QObject):
+  """Vocabulary keeps the words of a document in a WordTrie, updated from
+  the changes reported by the TextModel of the document. Each change is
+  widened to the words it touches by reading the text around it from a
+  snapshot, and only the words differing between the old and the new text
+  are counted, so typing costs the same regardless of the length of the
+  document or of the line.
+
+  Large changes, such as a file being loaded, are queued and counted in
+  time slices on the event loop. Completions of a prefix are the most
+  frequent words of the document followed by those of the dictionary, if
+  the dictionary supports prefix completion.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  countingFinished = Signal()
+
+  contextLength = 64
+  directLimit = 4096
+
+  def __init__(self, model: TextModel, maxWords: int = 20000,
+               timeSlice: float = 0.008) -> None:
+    QObject.__init__(self, model.getDocument())
+    self._model = model
+    self._trie = WordTrie(maxWords)
+    self._dictionary = None
+    self._timeSlice = timeSlice
+    self._pending = deque()
+    self._timer = QTimer(self)
+    self._timer.setInterval(0)
+    self._timer.timeout.connect(self._countSlice)
+    model.changed.connect(self._changed)
+    model.reset.connect(self.recompute)
+    self.recompute()
+
+  def getTrie(self) -> WordTrie:
+    """Getter-function for the trie of the words of the document"""
+    return self._trie
+
+  def getDictionary(self) -> Any:
+    """Getter-function for the dictionary"""
+    return self._dictionary
+
+  def setDictionary(self, dictionary: Any) -> NoReturn:
+    """Setter-function for the dictionary completing the words of the
+    document. Dictionaries without a complete method are not used."""
+    self._dictionary = dictionary
+
+  def isComplete(self) -> bool:
+    """Flag indicating if every change has been counted"""
+    return not self._pending
+
+  def recompute(self) -> NoReturn:
+    """Counts the entire document again"""
+    self._trie.clear()
+    self._pending.clear()
+    self._enqueue(1, self._model.snapshot().text())
+
+  def _enqueue(self, sign: int, text: str) -> NoReturn:
+    """Queues the words of the text to be added or removed"""
+    if text:
+      self._pending.append([sign, text, 0])
+      if not self._timer.isActive():
+        self._timer.start()
+
+  def _context(self, position: int, added: str) -> tuple[str, str]:
+    """Returns the text before and after the change, read from the current
+    snapshot, out to the boundaries of the words touching it. No match of
+    wordPattern crosses these boundaries in the old or the new text, so
+    the words of the context and the change are whole, however long."""
+    snapshot, length = self._model.snapshot(), self.contextLength
+    end = position + utf16Length(added)
+    return (_wordStart(snapshot, position, length),
+            _wordEnd(snapshot, end, length))
+
+  def _changed(self, position: int, removedText: str,
+               addedText: str) -> NoReturn:
+    """Counts the words differing between the old and the new text"""
+    left, right = self._context(position, addedText)
+    old = '%s%s%s' % (left, removedText, right)
+    new = '%s%s%s' % (left, addedText, right)
+    if self._pending or len(old) + len(new) > self.directLimit:
+      self._enqueue(-1, old)
+      return self._enqueue(1, new)
+    counts = Counter(wordPattern.findall(new))
+    counts.subtract(wordPattern.findall(old))
+    self._apply(counts)
+
+  def _apply(self, counts: Counter) -> NoReturn:
+    """Applies the differences in word counts to the trie"""
+    trie = self._trie
+    for word, count in counts.items():
+      if count > 0:
+        trie.add(word, count)
+      elif count < 0:
+        trie.remove(word, -count)
+
+  def _countSlice(self) -> NoReturn:
+    """Counts queued words for the duration of a time slice"""
+    deadline = time.perf_counter() + self._timeSlice
+    counts = Counter()
+    while self._pending and time.perf_counter() < deadline:
+      item = self._pending[0]
+      sign, text, offset = item
+      words = wordPattern.finditer(text, offset)
+      for index, match in enumerate(words):
+        counts[match.group()] += sign
+        offset = match.end()
+        if index & 1023 == 1023 and time.perf_counter() >= deadline:
+          break
+      else:
+        offset = len(text)
+      if offset >= len(text):
+        self._pending.popleft()
+      else:
+        item[2] = offset
+    self._apply(counts)
+    if not self._pending:
+      self._timer.stop()
+      self.countingFinished.emit()
+
+  def complete(self, prefix: str, limit: int = 8) -> list[str]:
+    """Returns up to limit completions of the prefix, the words of the
+    document first"""
+    found = self._trie.complete(prefix, limit)
+    complete = getattr(self._dictionary, 'complete', None)
+    if len(found) < limit and complete is not None:
+      for word in complete(prefix, limit):
+        if word not in found:
+          found.append(word)
+    return found[:limit]
+
+
+def wordBefore(text: str, column: int) -> Optional[tuple[int, str]]:
+  """Returns the column at which the word ending at the column starts and
+  the word, or None if no word ends there"""
+  if column < len(text) and wordPattern.match(text[column]) is not None:
+    return None
+  match, start = None, max(column - Vocabulary.contextLength, 0)
+  for match in wordPattern.finditer(text, start, column):
+    pass
+  if match is None or match.end() != column:
+    return None
+  return match.start(), match.group()
+
+
+class WordCompleter(QCompleter):
+  """WordCompleter shows the completions of the word being typed in a
+  popup below the cursor. The completions are found when the key is
+  pressed, while the popup is shown from the event loop, such that the
+  keystroke is painted without waiting for the layout of the popup.
+  Choosing a completion replaces the word being typed.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, widget: QPlainTextEdit, vocabulary: Vocabulary,
+               minPrefix: int = 2, limit: int = 8) -> None:
+    QCompleter.__init__(self, widget)
+    self._vocabulary = vocabulary
+    self._minPrefix = minPrefix
+    self._limit = limit
+    self._start = None
+    self._words = []
+    self._model = QStringListModel(self)
+    self.setModel(self._model)
+    self.setWidget(widget)
+    self.setCompletionMode(
+      QCompleter.CompletionMode.UnfilteredPopupCompletion)
+    self.setCaseSensitivity(Qt.CaseSensitivity.CaseSensitive)
+    self.setMaxVisibleItems(limit)
+    self._timer = QTimer(self)
+    self._timer.setSingleShot(True)
+    self._timer.setInterval(0)
+    self._timer.timeout.connect(self._showPopup)
+    self.activated[str].connect(self._insert)
+
+  def getVocabulary(self) -> Vocabulary:
+    """Getter-function for the vocabulary"""
+    return self._vocabulary
+
+  def isPopupVisible(self) -> bool:
+    """Flag indicating if the popup is shown"""
+    return self.popup().isVisible()
+
+  def hidePopup(self) -> NoReturn:
+    """Hides the popup and cancels any pending update of it"""
+    self._timer.stop()
+    self._start = None
+    if self.popup().isVisible():
+      self.popup().hide()
+
+  def updateCompletions(self) -> NoReturn:
+    """Finds the completions of the word before the cursor, and schedules
+    the popup to show them"""
+    cursor = self.widget().textCursor()
+    found = None
+    text = cursor.block().text()
+    if not cursor.hasSelection():
+      found = wordBefore(text, pythonIndex(text, cursor.positionInBlock()))
+    if found is None or len(found[1]) < self._minPrefix:
+      return self.hidePopup()
+    column, prefix = found
+    words = self._vocabulary.complete(prefix, self._limit)
+    if not words:
+      return self.hidePopup()
+    self._start = cursor.block().position() + utf16Length(text[:column])
+    self._words = words
+    self.setCompletionPrefix(prefix)
+    self._timer.start()
+
+  def _showPopup(self) -> NoReturn:
+    """Shows the completions found by the latest update"""
+    if self._start is None:
+      return
+    self._model.setStringList(self._words)
+    popup = self.popup()
+    popup.setCurrentIndex(self._model.index(0, 0))
+    rect = self.widget().cursorRect()
+    rect.setWidth(popup.sizeHintForColumn(0)
+                  + popup.verticalScrollBar().sizeHint().width())
+    self.complete(rect)
+
+  def _insert(self, word: str) -> NoReturn:
+    """Replaces the word being typed with the completion"""
+    if self._start is None:
+      return
+    cursor = self.widget().textCursor()
+    end = cursor.position()
+    if end < self._start:
+      return
+    cursor.setPosition(self._start)
+    cursor.setPosition(end, cursor.MoveMode.KeepAnchor)
+    cursor.insertText(word)
+    self.widget().setTextCursor(cursor)
+    self._start = None
@@ -3,29 +3,219 @@
 #  MIT Licence
 from __future__ import annotations
 
-from typing import NoReturn
+import tracemalloc
+from typing import NoReturn, Optional
 
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QFormLayout
-from worktoy.parsing import extractArg
-from worktoy.stringtools import stringList
-from worktoy.waitaminute import ProceduralError
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QTextDocument
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QFormLayout, QLabel, \
+  QCheckBox, QPushButton, QPlainTextEdit
+
+from hackboard.pyside import getStyleRegistry, UndoManager
+from hackboard.pyside.style import FontRegistry
+
+
+def formatBytes(size: float) -> str:
+  """Returns the number of bytes with a binary unit"""
+  for unit in ('B', 'KiB', 'MiB'):
+    if abs(size) < 1024:
+      return '%.1f %s' % (size, unit)
+    size /= 1024
+  return '%.1f GiB' % size
 
 
 class DebugData(QWidget):
-  """Debugging data
+  """DebugData shows the memory used by the open documents, the log, the
+  Python heap and the font and style caches. The values are sampled by a
+  low frequency timer, and only the texts of the labels change between
+  samples.
+
+  The memory of a document is estimated from its character and block
+  counts. Documents of hibernating tabs are freed, and only the bytes of
+  their compressed texts are shown. The undo history is taken from the
+  UndoManager of the document, or estimated from the characters edited
+  while Qt keeps undo steps.
+  Tracing the Python heap with tracemalloc slows down allocation, so it is
+  off until enabled by the check box. The snapshot
+  diff button compares the heap with the previous click, showing where
+  memory was allocated in between.
   #  Copyright (c) 2023 Asger Jon Vistisen
   #  MIT Licence"""
 
+  bytesPerBlock = 256
+  bytesPerUndoStep = 64
+  topAllocators = 8
+
   def __init__(self, *args, **kwargs) -> None:
-    parentKeys = stringList('parent, main, mainWindow')
-    data = extractArg(QWidget, parentKeys, *args, **kwargs)
-    parent: QWidget
-    parent, args, kwargs = data
+    keys = ('parent', 'main', 'mainWindow')
+    parent = next((kwargs[key] for key in keys
+                   if isinstance(kwargs.get(key), QWidget)), None)
     if parent is None:
-      raise ProceduralError('parent', QWidget, None)
+      parent = next((a for a in args if isinstance(a, QWidget)), None)
+    if parent is None:
+      raise TypeError('DebugData requires a parent QWidget')
     QWidget.__init__(self, parent)
-    self._baseWidget: QWidget
-    self._baseLayout: QFormLayout
-    self.parent.
+    self._window = parent
+    self._baseLayout = QVBoxLayout()
+    self._formLayout = QFormLayout()
+    self._labels = {}
+    self._documentRows = {}
+    self._edited = {}
+    self._snapshot: Optional[tracemalloc.Snapshot] = None
+    self._traceBox = QCheckBox('Trace Python heap')
+    self._snapshotButton = QPushButton('Snapshot diff')
+    self._heapView = QPlainTextEdit()
+    self._timer = QTimer(self)
+    self._timer.setInterval(kwargs.get('interval', 2000))
+    self._timer.timeout.connect(self.sample)
+    self.setupWidgets()
+
   def setupWidgets(self) -> NoReturn:
     """Setting up the widgets"""
+    for key in ('tabs', 'log', 'logDisk', 'fonts', 'metrics', 'styles',
+                'heap'):
+      self._labels[key] = QLabel()
+      self._formLayout.addRow(key, self._labels[key])
+    self._heapView.setReadOnly(True)
+    self._traceBox.setChecked(tracemalloc.is_tracing())
+    self._traceBox.toggled.connect(self.setTracing)
+    self._snapshotButton.clicked.connect(self.snapshotDiff)
+    self._baseLayout.addLayout(self._formLayout)
+    self._baseLayout.addWidget(self._traceBox)
+    self._baseLayout.addWidget(self._snapshotButton)
+    self._baseLayout.addWidget(self._heapView)
+    self.setLayout(self._baseLayout)
+
+  def showEvent(self, event) -> NoReturn:
+    """Samples at once and then on the timer while shown"""
+    QWidget.showEvent(self, event)
+    self.sample()
+    self._timer.start()
+
+  def hideEvent(self, event) -> NoReturn:
+    """Stops sampling while hidden"""
+    self._timer.stop()
+    QWidget.hideEvent(self, event)
+
+  def _setText(self, label: QLabel, text: str) -> NoReturn:
+    """Sets the text of the label if it changed"""
+    if label.text() != text:
+      label.setText(text)
+
+  def _documentLabel(self, document: QTextDocument) -> QLabel:
+    """Returns the label of the document, adding a row the first time"""
+    label = self._documentRows.get(document)
+    if label is None:
+      label = self._documentRows[document] = QLabel()
+      self._formLayout.insertRow(len(self._documentRows) - 1,
+                                 'document %d' % len(self._documentRows),
+                                 label)
+      self._edited[document] = 0
+      document.contentsChange.connect(
+        lambda _, removed, added, d=document: self._recordEdit(
+          d, removed, added))
+    return label
+
+  def _recordEdit(self, document: QTextDocument, removed: int,
+                  added: int) -> NoReturn:
+    """Counts the characters edited while undo steps are kept. Changes
+    removing as many characters as they add are mostly format changes,
+    such as those of the highlighters, which are not undoable."""
+    if removed != added and document.isUndoRedoEnabled():
+      edited = self._edited.get(document, 0) + removed + added
+      self._edited[document] = edited
+
+  def documentEstimate(self, document: QTextDocument) -> tuple[int, ...]:
+    """Returns the estimated bytes of the text, the layout and the undo
+    stack of the document"""
+    text = 2 * document.characterCount()
+    layout = self.bytesPerBlock * document.blockCount()
+    undoManager = document.findChild(UndoManager)
+    if undoManager is not None:
+      return text, layout, undoManager.getSize()
+    steps = document.availableUndoSteps() + document.availableRedoSteps()
+    if not steps:
+      self._edited[document] = 0
+    undo = 2 * self._edited.get(document, 0) + self.bytesPerUndoStep * steps
+    return text, layout, undo
+
+  def sample(self) -> NoReturn:
+    """Samples the values and updates the labels"""
+    documents = list(self._window.getDocuments())
+    for document in [d for d in self._documentRows if d not in documents]:
+      self._formLayout.removeRow(self._documentRows.pop(document))
+      self._edited.pop(document, None)
+    for document in documents:
+      text, layout, undo = self.documentEstimate(document)
+      self._setText(self._documentLabel(document),
+                    'text %s, layout %s, undo %s' % (
+                      formatBytes(text), formatBytes(layout),
+                      formatBytes(undo)))
+    tabs = self._window.getTabs().getStats()
+    self._setText(self._labels['tabs'],
+                  '%d open, %d live, %d spilled, %s hibernating' % (
+                    tabs['pages'], tabs['live'], tabs['spilled'],
+                    formatBytes(tabs['memory'])))
+    logWidget = self._window.getLogWidget()
+    model = logWidget.model
+    self._setText(self._labels['log'], '%d rows, %s' % (
+      model.rowCount(), formatBytes(model.memoryEstimate())))
+    self._setText(self._labels['logDisk'],
+                  '%d lines spooled' % logWidget.spool.count())
+    stats = FontRegistry.getStats()
+    self._setText(self._labels['fonts'], '%d fonts, %d hits' % (
+      stats['fontMisses'], stats['fontHits']))
+    self._setText(self._labels['metrics'],
+                  '%d metrics, %d sizes, %d/%d hits/misses' % (
+                    stats['metricsCached'], stats['sizesCached'],
+                    stats['sizeHits'], stats['sizeMisses']))
+    styles = getStyleRegistry().getStats()
+    self._setText(self._labels['styles'],
+                  '%d contexts, %d composed, %d widgets' % (
+                    styles['contexts'], styles['composed'],
+                    styles['widgets']))
+    self._sampleHeap()
+
+  def _sampleHeap(self) -> NoReturn:
+    """Shows the traced heap size and the top allocators"""
+    if not tracemalloc.is_tracing():
+      return self._setText(self._labels['heap'], 'not traced')
+    current, peak = tracemalloc.get_traced_memory()
+    self._setText(self._labels['heap'], '%s, peak %s' % (
+      formatBytes(current), formatBytes(peak)))
+    if self._snapshot is not None:
+      return
+    statistics = tracemalloc.take_snapshot().statistics('lineno')
+    lines = ['Top allocators']
+    for stat in statistics[:self.topAllocators]:
+      frame = stat.traceback[0]
+      lines.append('%s  %s:%d' % (
+        formatBytes(stat.size), frame.filename, frame.lineno))
+    self._heapView.setPlainText('\n'.join(lines))
+
+  def setTracing(self, enabled: bool) -> NoReturn:
+    """Starts or stops tracing the Python heap"""
+    if enabled and not tracemalloc.is_tracing():
+      tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+      tracemalloc.stop()
+      self._snapshot = None
+    self._sampleHeap()
+
+  def snapshotDiff(self) -> NoReturn:
+    """Shows the allocations since the previous click. The first click
+    only takes the snapshot compared with by the next."""
+    if not tracemalloc.is_tracing():
+      self._traceBox.setChecked(True)
+    snapshot = tracemalloc.take_snapshot()
+    previous, self._snapshot = self._snapshot, snapshot
+    if previous is None:
+      self._heapView.setPlainText('Snapshot taken, click again to compare')
+      return
+    lines = ['Allocated since the previous snapshot']
+    for stat in snapshot.compare_to(previous, 'lineno')[:self.topAllocators]:
+      frame = stat.traceback[0]
+      lines.append('%s (%+d blocks)  %s:%d' % (
+        formatBytes(stat.size_diff), stat.count_diff, frame.filename,
+        frame.lineno))
+    self._heapView.setPlainText('\n'.join(lines))
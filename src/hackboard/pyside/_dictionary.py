@@ -0,0 +1,319 @@
+"""CompactDictionary is a memory mapped dictionary for spell checking"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from typing import NoReturn, Optional, Iterator
+
+from PySide6.QtCore import QStandardPaths
+
+_MAGIC = b'HBDICT01'
+_MARKER = 0x01020304
+_HEADER = struct.Struct('<8sIIIIII')
+
+
+def defaultDictionaryDir() -> str:
+  """Returns the default directory of the compiled dictionaries"""
+  location = QStandardPaths.StandardLocation.CacheLocation
+  return os.path.join(QStandardPaths.writableLocation(location),
+                      'dictionaries')
+
+
+def _deletes(word: str, maxDistance: int) -> set[str]:
+  """Returns the strings obtained by deleting up to maxDistance characters
+  from word, including word itself."""
+  found, edge = {word}, {word}
+  for _ in range(maxDistance):
+    nextEdge = set()
+    for item in edge:
+      if len(item) > 1:
+        for i in range(len(item)):
+          nextEdge.add(item[:i] + item[i + 1:])
+    nextEdge -= found
+    found |= nextEdge
+    edge = nextEdge
+  return found
+
+
+def editDistance(a: str, b: str, maxDistance: int) -> int:
+  """Returns the optimal string alignment distance between a and b, or
+  maxDistance + 1 if the distance exceeds maxDistance."""
+  if abs(len(a) - len(b)) > maxDistance:
+    return maxDistance + 1
+  previous2, previous = None, list(range(len(b) + 1))
+  for i in range(1, len(a) + 1):
+    current = [i] + [0] * len(b)
+    rowMin = i
+    for j in range(1, len(b) + 1):
+      cost = 0 if a[i - 1] == b[j - 1] else 1
+      value = min(previous[j] + 1, current[j - 1] + 1,
+                  previous[j - 1] + cost)
+      if (previous2 is not None and i > 1 and j > 1
+              and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+        value = min(value, previous2[j - 2] + 1)
+      current[j] = value
+      rowMin = min(rowMin, value)
+    if rowMin > maxDistance:
+      return maxDistance + 1
+    previous2, previous = previous, current
+  return min(previous[-1], maxDistance + 1)
+
+
+def _hash(data: bytes) -> int:
+  """Hash function used by the dictionary file format"""
+  return zlib.crc32(data)
+
+
+def _readWordList(fid: str) -> dict[str, int]:
+  """Reads a word list with one word per line, optionally followed by
+  whitespace and a frequency count."""
+  words = {}
+  with open(fid, 'r', encoding='utf-8-sig') as file:
+    for line in file:
+      parts = line.split()
+      if not parts:
+        continue
+      count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+      words[parts[0]] = words.get(parts[0], 0) + count
+  return words
+
+
+def compileDictionary(source: str, target: str, maxDistance: int = 2,
+                      prefixLength: int = 7) -> NoReturn:
+  """Compiles the word list at source into a dictionary file at target.
+
+  The file holds the words sorted and concatenated as UTF-8 together with
+  fixed width arrays of offsets, frequency counts, a sorted hash index of
+  the words, a sorted hash index of the deletion neighbourhood of the
+  prefix of each word and the length of each word. All arrays are read
+  through a memory map, so opening the file does not create any per-word
+  objects."""
+  counts = _readWordList(source)
+  encoded = sorted(word.encode('utf-8') for word in counts)
+  offsets, wordCounts, wordBytes = array('I', [0]), array('I'), bytearray()
+  lengths, wordKeys, deleteKeys = array('B'), [], []
+  for index, data in enumerate(encoded):
+    word = data.decode('utf-8')
+    wordBytes += data
+    offsets.append(len(wordBytes))
+    wordCounts.append(min(counts[word], 0xFFFFFFFF))
+    lengths.append(min(len(word), 255))
+    wordKeys.append(_hash(data) << 32 | index)
+    for item in _deletes(word[:prefixLength], maxDistance):
+      deleteKeys.append(_hash(item.encode('utf-8')) << 32 | index)
+  wordKeys.sort()
+  deleteKeys.sort()
+  lengths.extend([0] * (-len(lengths) % 4))
+  header = _HEADER.pack(_MAGIC, _MARKER, maxDistance, prefixLength,
+                        len(encoded), len(deleteKeys), len(wordBytes))
+  tmp = '%s.tmp' % target
+  with open(tmp, 'wb') as file:
+    file.write(header)
+    offsets.tofile(file)
+    wordCounts.tofile(file)
+    for keys in (wordKeys, deleteKeys):
+      array('I', [key >> 32 for key in keys]).tofile(file)
+      array('I', [key & 0xFFFFFFFF for key in keys]).tofile(file)
+    lengths.tofile(file)
+    file.write(wordBytes)
+  os.replace(tmp, target)
+
+
+class CompactDictionary:
+  """CompactDictionary reads a dictionary compiled by compileDictionary
+  through a memory map. Membership is decided by a binary search of the
+  word hashes followed by a comparison against the mapped bytes, which
+  does not create any objects for the words in the dictionary.
+
+  Suggestions are found with the symmetric delete method: the deletion
+  neighbourhood of the misspelled word is looked up in the precomputed
+  delete index and the candidates are verified by their edit distance.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, fid: str) -> None:
+    self._fid = fid
+    with open(fid, 'rb') as file:
+      self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(self._map) < _HEADER.size:
+      self._map.close()
+      raise ValueError('Not a dictionary file: %s' % fid)
+    header = _HEADER.unpack_from(self._map, 0)
+    magic, marker, maxDistance, prefixLength, n, m, size = header
+    if magic != _MAGIC:
+      self._map.close()
+      raise ValueError('Not a dictionary file: %s' % fid)
+    if marker != _MARKER:
+      self._map.close()
+      raise ValueError('Dictionary compiled on other byte order: %s' % fid)
+    if len(self._map) < _HEADER.size + 4 * (4 * n + 1 + 2 * m) \
+        + n + (-n % 4) + size:
+      self._map.close()
+      raise ValueError('Truncated dictionary file: %s' % fid)
+    self._maxDistance = maxDistance
+    self._prefixLength = prefixLength
+    self._size = n
+    view = memoryview(self._map)
+    sections, start = [], _HEADER.size
+    for length in (n + 1, n, n, n, m, m):
+      sections.append(view[start:start + 4 * length].cast('I'))
+      start += 4 * length
+    self._views = [view] + sections
+    self._offsets, self._counts = sections[0], sections[1]
+    self._wordHashes, self._wordIds = sections[2], sections[3]
+    self._deleteHashes, self._deleteIds = sections[4], sections[5]
+    self._lengths = view[start:start + n]
+    self._views.append(self._lengths)
+    self._base = start + n + (-n % 4)
+
+  def close(self) -> NoReturn:
+    """Releases the memory map"""
+    for view in reversed(self._views):
+      view.release()
+    self._views = []
+    self._map.close()
+
+  def __len__(self) -> int:
+    return self._size
+
+  def __contains__(self, word: str) -> bool:
+    return self.find(word) is not None
+
+  def __iter__(self) -> Iterator[str]:
+    for index in range(self._size):
+      yield self.getWord(index)
+
+  def getMaxDistance(self) -> int:
+    """Getter-function for the maximum edit distance of the delete index"""
+    return self._maxDistance
+
+  def getWord(self, index: int) -> str:
+    """Returns the word at the index"""
+    start = self._base + self._offsets[index]
+    end = self._base + self._offsets[index + 1]
+    return self._map[start:end].decode('utf-8')
+
+  def getCount(self, index: int) -> int:
+    """Returns the frequency count of the word at the index"""
+    return self._counts[index]
+
+  def _wordBytes(self, index: int) -> bytes:
+    """Returns the UTF-8 encoding of the word at the index"""
+    start = self._base + self._offsets[index]
+    return self._map[start:self._base + self._offsets[index + 1]]
+
+  def _lowerBound(self, data: bytes) -> int:
+    """Returns the index of the first word not sorting before data"""
+    low, high = 0, self._size
+    while low < high:
+      middle = (low + high) // 2
+      if self._wordBytes(middle) < data:
+        low = middle + 1
+      else:
+        high = middle
+    return low
+
+  def complete(self, prefix: str, limit: int = 5,
+               scanLimit: int = 4096) -> list[str]:
+    """Returns up to limit words starting with the prefix, other than the
+    prefix itself, most frequent first. The words are sorted, so those
+    sharing the prefix are found by two binary searches. At most scanLimit
+    of them are ranked, which bounds the time taken by short prefixes."""
+    data = prefix.encode('utf-8')
+    first = self._lowerBound(data)
+    last = min(self._lowerBound(data + b'\xff'), first + scanLimit)
+    counts = self._counts
+    ranked = heapq.nsmallest(limit + 1, range(first, last),
+                             key=lambda index: (-counts[index], index))
+    found = [self.getWord(index) for index in ranked]
+    return [word for word in found if word != prefix][:limit]
+
+  def find(self, word: str) -> Optional[int]:
+    """Returns the index of the word or None if not in the dictionary"""
+    data = word.encode('utf-8')
+    key, hashes, offsets = _hash(data), self._wordHashes, self._offsets
+    i = bisect.bisect_left(hashes, key)
+    while i < self._size and hashes[i] == key:
+      index = self._wordIds[i]
+      start = self._base + offsets[index]
+      end = self._base + offsets[index + 1]
+      if end - start == len(data):
+        if self._map.find(data, start, end) == start:
+          return index
+      i += 1
+    return None
+
+  def _candidates(self, word: str, maxDistance: int) -> set[int]:
+    """Returns the indices of the words sharing a delete with word and
+    differing in length by at most maxDistance"""
+    found, hashes, ids = set(), self._deleteHashes, self._deleteIds
+    lengths, low, high = self._lengths, len(word) - maxDistance, \
+      len(word) + maxDistance
+    n = len(hashes)
+    for item in _deletes(word[:self._prefixLength], maxDistance):
+      key = _hash(item.encode('utf-8'))
+      i = bisect.bisect_left(hashes, key)
+      while i < n and hashes[i] == key:
+        index = ids[i]
+        if low <= lengths[index] <= high:
+          found.add(index)
+        i += 1
+    return found
+
+  def suggest(self, word: str, maxDistance: int = None,
+              limit: int = 5) -> list[str]:
+    """Returns up to limit words closest to word, most frequent first. The
+    distance is increased one step at a time up to maxDistance, and the
+    search stops at the first distance yielding any words."""
+    if maxDistance is None or maxDistance > self._maxDistance:
+      maxDistance = self._maxDistance
+    if word in self:
+      return [word]
+    distances = {}
+    for distance in range(1, maxDistance + 1):
+      scored = []
+      for index in self._candidates(word, distance):
+        candidate = self.getWord(index)
+        if index not in distances:
+          distances[index] = editDistance(word, candidate, maxDistance)
+        if distances[index] <= distance:
+          scored.append((-self._counts[index], candidate))
+      if scored:
+        scored.sort()
+        return [candidate for _, candidate in scored[:limit]]
+    return []
+
+
+def openDictionary(fid: str, directory: str = None) -> CompactDictionary:
+  """Opens the dictionary at fid. A plain word list is compiled to a
+  dictionary file in the directory, by default the cache directory of the
+  application, named by the path and the modification time of the word
+  list. The compiled file is reused until the word list changes, when the
+  files compiled from its previous versions are removed."""
+  with open(fid, 'rb') as file:
+    if file.read(len(_MAGIC)) == _MAGIC:
+      return CompactDictionary(fid)
+  directory = defaultDictionaryDir() if directory is None else directory
+  path = os.path.abspath(fid).encode('utf-8', 'surrogateescape')
+  key = hashlib.sha1(path).hexdigest()[:16]
+  target = os.path.join(directory, '%s-%d.hbdict' % (
+    key, os.stat(fid).st_mtime_ns))
+  if not os.path.exists(target):
+    os.makedirs(directory, exist_ok=True)
+    compileDictionary(fid, target)
+    for name in os.listdir(directory):
+      old = os.path.join(directory, name)
+      if name.startswith('%s-' % key) and old != target:
+        try:
+          os.remove(old)
+        except OSError:
+          pass
+  return CompactDictionary(target)
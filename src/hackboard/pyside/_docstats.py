@@ -0,0 +1,180 @@
+"""DocumentStats keeps running statistics of a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import time
+from typing import NoReturn
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextDocument, QTextBlock
+
+from hackboard.pyside import wordPattern
+
+
+def _blockStats(block: QTextBlock) -> tuple[int, int]:
+  """Returns the number of words and the number of characters other than
+  spaces and tabs in the block"""
+  text = block.text()
+  blanks = text.count(' ') + text.count('\t')
+  return len(wordPattern.findall(text)), len(text) - blanks
+
+
+class DocumentStats(QObject):
+  """DocumentStats keeps word, character, line and block counts of the
+  document. The counts of each block are stored, and when the document
+  changes only the blocks spanned by the change are counted again, and the
+  totals are adjusted by the difference.
+
+  Blocks not yet counted, such as after loading a file or pasting many
+  lines, are counted in time slices on the event loop from the first
+  uncounted block on. The
+  statsChanged signal is emitted at most once per frame, however many
+  changes occur.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  statsChanged = Signal()
+
+  def __init__(self, document: QTextDocument, wordsPerMinute: int = 238,
+               interval: int = 16, timeSlice: float = 0.008) -> None:
+    QObject.__init__(self, document)
+    self._document = document
+    self._wordsPerMinute = wordsPerMinute
+    self._timeSlice = timeSlice
+    self._words, self._chars = [], []
+    self._wordTotal, self._charTotal, self._lineTotal = 0, 0, 0
+    self._blockCount = document.blockCount()
+    self._timer = QTimer(self)
+    self._timer.setSingleShot(True)
+    self._timer.setInterval(interval)
+    self._timer.timeout.connect(self.statsChanged)
+    self._countTimer = QTimer(self)
+    self._countTimer.setInterval(0)
+    self._countTimer.timeout.connect(self._countSlice)
+    document.contentsChange.connect(self._contentsChanged)
+    self.recompute()
+
+  def isComplete(self) -> bool:
+    """Flag indicating if every block has been counted"""
+    return len(self._words) >= self._document.blockCount()
+
+  def recompute(self) -> NoReturn:
+    """Counts the entire document again"""
+    self._truncate(0)
+
+  def _truncate(self, first: int) -> NoReturn:
+    """Discards the counts from the block first on, such that they are
+    counted again"""
+    words, chars = self._words[first:], self._chars[first:]
+    self._wordTotal -= sum(words)
+    self._charTotal -= sum(chars)
+    self._lineTotal -= len(chars) - chars.count(0)
+    del self._words[first:], self._chars[first:]
+    if not self._countTimer.isActive():
+      self._countTimer.start()
+
+  def _countSlice(self) -> NoReturn:
+    """Counts uncounted blocks for the duration of a time slice"""
+    deadline = time.perf_counter() + self._timeSlice
+    block = self._document.findBlockByNumber(len(self._words))
+    words, chars = self._words, self._chars
+    wordTotal, charTotal, lineTotal = 0, 0, 0
+    while block.isValid():
+      for _ in range(256):
+        blockWords, blockChars = _blockStats(block)
+        words.append(blockWords)
+        chars.append(blockChars)
+        wordTotal += blockWords
+        charTotal += blockChars
+        lineTotal += 1 if blockChars else 0
+        block = block.next()
+        if not block.isValid():
+          break
+      if time.perf_counter() > deadline:
+        break
+    self._wordTotal += wordTotal
+    self._charTotal += charTotal
+    self._lineTotal += lineTotal
+    if not block.isValid():
+      self._countTimer.stop()
+    self._changed()
+
+  def _changed(self) -> NoReturn:
+    """Schedules the statsChanged signal"""
+    if not self._timer.isActive():
+      self._timer.start()
+
+  def _contentsChanged(self, position: int, removed: int,
+                       added: int) -> NoReturn:
+    """Counts the blocks spanned by the change again"""
+    document = self._document
+    firstBlock = document.findBlock(position)
+    lastBlock = document.findBlock(position + added)
+    if not firstBlock.isValid():
+      return self.recompute()
+    if not lastBlock.isValid():
+      lastBlock = document.lastBlock()
+    first, last = firstBlock.blockNumber(), lastBlock.blockNumber()
+    newCount = last - first + 1
+    blockCount, self._blockCount = self._blockCount, document.blockCount()
+    oldCount = blockCount - (self._blockCount - newCount)
+    if first >= len(self._words):
+      return
+    if oldCount < 1 or first + oldCount > len(self._words):
+      return self._truncate(first)
+    if newCount > 256:
+      return self._truncate(first)
+    words, chars = [], []
+    block = firstBlock
+    for _ in range(newCount):
+      blockWords, blockChars = _blockStats(block)
+      words.append(blockWords)
+      chars.append(blockChars)
+      block = block.next()
+    oldWords = self._words[first:first + oldCount]
+    oldChars = self._chars[first:first + oldCount]
+    self._wordTotal += sum(words) - sum(oldWords)
+    self._charTotal += sum(chars) - sum(oldChars)
+    self._lineTotal += oldChars.count(0) - chars.count(0)
+    self._lineTotal += newCount - oldCount
+    self._words[first:first + oldCount] = words
+    self._chars[first:first + oldCount] = chars
+    self._changed()
+
+  def getWordCount(self) -> int:
+    """Getter-function for the number of words"""
+    return self._wordTotal
+
+  def getCharacterCount(self) -> int:
+    """Getter-function for the number of characters"""
+    return self._document.characterCount() - 1
+
+  def getNonBlankCount(self) -> int:
+    """Getter-function for the number of characters other than spaces and
+    tabs"""
+    return self._charTotal
+
+  def getLineCount(self) -> int:
+    """Getter-function for the number of lines containing text"""
+    return self._lineTotal
+
+  def getBlockCount(self) -> int:
+    """Getter-function for the number of blocks"""
+    return self._document.blockCount()
+
+  def getReadingTime(self) -> float:
+    """Getter-function for the estimated reading time in minutes"""
+    return self._wordTotal / self._wordsPerMinute
+
+  def __str__(self) -> str:
+    minutes = self.getReadingTime()
+    if minutes < 1:
+      readingTime = '%d sec' % round(60 * minutes)
+    else:
+      readingTime = '%d min' % round(minutes)
+    text = 'Words: %d | Characters: %d (%d) | Lines: %d | Blocks: %d | ' \
+           'Reading time: %s' % (
+             self._wordTotal, self.getCharacterCount(), self._charTotal,
+             self._lineTotal, self.getBlockCount(), readingTime)
+    return text if self.isComplete() else '%s (counting)' % text
@@ -0,0 +1,523 @@
+"""DocumentTabs holds the open documents of a window in hibernating tabs"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import zlib
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QThread, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QTabWidget, QVBoxLayout, QWidget
+
+from hackboard.pyside import DocWidget, FileLoader, FileSaver, AutoSaver
+from hackboard.pyside import RecoverySession, TextSnapshot
+
+
+def _fileState(fid: Optional[str]) -> Optional[tuple[int, int]]:
+  """Returns the size and modification time of the file, or None if it
+  does not exist"""
+  try:
+    stat = os.stat(fid)
+  except (OSError, TypeError):
+    return None
+  return stat.st_size, stat.st_mtime_ns
+
+
+def _spillFile() -> str:
+  """Returns the name of a new temporary file for the text of a tab"""
+  fd, fid = tempfile.mkstemp(prefix='hackboard-tab-', suffix='.txt')
+  os.close(fd)
+  return fid
+
+
+class _HibernateWorker(QThread):
+  """Writes the text of the snapshot on a worker thread, either
+  compressed to memory or as UTF-8 to the file.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, snapshot: TextSnapshot, fid: Optional[str],
+               chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._snapshot = snapshot
+    self._chunkSize = chunkSize
+    self.fid = fid
+    self.revision = snapshot.revision
+    self.data: Optional[bytes] = None
+    self.error: Optional[OSError] = None
+
+  def _encoded(self):
+    """Yields the text encoded in chunks"""
+    start, length = 0, self._snapshot.length()
+    while start < length:
+      end = min(start + self._chunkSize, length)
+      yield self._snapshot.slice(start, end).encode('utf-8', 'surrogatepass')
+      start = end
+
+  def run(self) -> NoReturn:
+    """Writes the text"""
+    try:
+      if self.fid is not None:
+        with open(self.fid, 'wb') as file:
+          for data in self._encoded():
+            file.write(data)
+        return
+      compressor = zlib.compressobj(1)
+      parts = [compressor.compress(data) for data in self._encoded()]
+      parts.append(compressor.flush())
+      self.data = b''.join(parts)
+    except OSError as e:
+      self.error = e
+
+
+class DocumentPage(QWidget):
+  """DocumentPage is the tab of one document. While in use, the page holds
+  a DocWidget and thereby a QTextDocument with its layout, highlighter,
+  statistics and search index. A page left inactive for the hibernation
+  time gives them up. Its text is written by a worker thread from a
+  snapshot of the TextModel: compressed in memory, or to a temporary file
+  if longer than spillThreshold. The text of a document matching its file
+  is not kept at all, as it is read from the file again.
+
+  The widget is created again when the page is activated. Text from
+  memory is restored at once, while text from a file is streamed in by
+  the FileLoader of the page. The cursor, the scroll position, the
+  modification flag and the undo history are restored with the text. The
+  autosave session of a document with unsaved changes is kept while it
+  hibernates. A page created from a file without being activated starts
+  out hibernated, such that nothing is loaded, laid out or highlighted
+  until it is first shown.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  docWidgetCreated = Signal(DocWidget)
+  titleChanged = Signal(QWidget)
+  saved = Signal(str)
+  saveFailed = Signal(str)
+
+  spillThreshold = 4194304
+  chunkSize = 1048576
+
+  def __init__(self, window: QWidget, fid: str = None) -> None:
+    QWidget.__init__(self)
+    self._window = window
+    self._layout = QVBoxLayout()
+    self._layout.setContentsMargins(0, 0, 0, 0)
+    self.setLayout(self._layout)
+    self._docWidget: Optional[DocWidget] = None
+    self._fileSaver: Optional[FileSaver] = None
+    self._fileLoader = FileLoader(self)
+    self._fileLoader.finished.connect(self._loadEnded)
+    self._fileLoader.failed.connect(self._loadFailed)
+    self._fileLoader.cancelled.connect(self._loadFailed)
+    self._autoSaver = AutoSaver(None, self)
+    self._autoSaver.setFileName(fid)
+    self._fileName = fid
+    self._fileState = None
+    self._data: Optional[bytes] = None
+    self._spill: Optional[str] = None
+    self._state: Optional[dict] = None
+    self._restoring = False
+    self._recovery: Optional[RecoverySession] = None
+    self._worker: Optional[_HibernateWorker] = None
+    self._active = False
+    self.lastActive = time.monotonic()
+
+  def getDocWidget(self) -> Optional[DocWidget]:
+    """Getter-function for the document widget, which is None while the
+    page hibernates"""
+    return self._docWidget
+
+  def getFileLoader(self) -> FileLoader:
+    """Getter-function for the loader of the document"""
+    return self._fileLoader
+
+  def getFileSaver(self) -> Optional[FileSaver]:
+    """Getter-function for the saver of the document"""
+    return self._fileSaver
+
+  def getAutoSaver(self) -> AutoSaver:
+    """Getter-function for the autosaver of the document"""
+    return self._autoSaver
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file name of the document"""
+    return self._fileName
+
+  def setFileName(self, fid: Optional[str]) -> NoReturn:
+    """Setter-function for the file name of the document"""
+    self._fileName = fid
+    self._autoSaver.setFileName(fid)
+    self.titleChanged.emit(self)
+
+  def getTitle(self) -> str:
+    """Returns the title of the tab"""
+    return os.path.basename(self._fileName or '') or 'untitled'
+
+  def isLive(self) -> bool:
+    """Flag indicating if the page holds its document"""
+    return self._docWidget is not None
+
+  def isActive(self) -> bool:
+    """Flag indicating if the page is the current tab"""
+    return self._active
+
+  def isModified(self) -> bool:
+    """Flag indicating if the document has unsaved changes"""
+    if self._docWidget is not None:
+      return self._docWidget.document().isModified()
+    return self._state is not None and self._state['modified']
+
+  def isBlank(self) -> bool:
+    """Flag indicating if the page holds an empty, untitled document which
+    a file may be opened into"""
+    return self._docWidget is not None and self._fileName is None \
+      and self._docWidget.document().isEmpty() and not self.isModified() \
+      and not self._fileLoader.isLoading()
+
+  def getMemoryUse(self) -> int:
+    """Returns the bytes of the text kept in memory while hibernating"""
+    return 0 if self._data is None else len(self._data)
+
+  def isSpilled(self) -> bool:
+    """Flag indicating if the text is kept in a temporary file while
+    hibernating"""
+    return self._spill is not None
+
+  def setActive(self, active: bool) -> NoReturn:
+    """Sets if the page is the current tab, restoring the document when
+    activated"""
+    self._active = active
+    self.lastActive = time.monotonic()
+    if active:
+      self.restore()
+
+  def _createDocWidget(self) -> DocWidget:
+    """Creates the document widget"""
+    docWidget = DocWidget(self._window)
+    self._layout.addWidget(docWidget)
+    self._docWidget = docWidget
+    self._fileSaver = FileSaver(docWidget)
+    self._fileSaver.saved.connect(self._saved)
+    self._fileSaver.failed.connect(self.saveFailed)
+    docWidget.document().modificationChanged.connect(
+      self._modificationChanged)
+    self.docWidgetCreated.emit(docWidget)
+    return docWidget
+
+  def _modificationChanged(self, *_) -> NoReturn:
+    """Updates the title of the tab"""
+    self.titleChanged.emit(self)
+
+  def _saved(self, fid: str) -> NoReturn:
+    """Marks the document as matching the saved file"""
+    if not self._fileSaver.isDirty():
+      self._docWidget.document().setModified(False)
+      self._fileState = _fileState(fid)
+    self.saved.emit(fid)
+
+  def load(self, fid: str) -> NoReturn:
+    """Streams the file into the document, which starts a new undo
+    history"""
+    self.restore()
+    self._fileLoader.cancel()
+    self.setFileName(fid)
+    self._docWidget.getUndoManager().suspend()
+    self._autoSaver.suspend()
+    self._restoring = False
+    self._fileLoader.load(fid, self._docWidget.document())
+
+  def restore(self) -> NoReturn:
+    """Creates the document widget of a hibernating page"""
+    if self._docWidget is not None:
+      return
+    docWidget = self._createDocWidget()
+    if self._data is not None:
+      text = zlib.decompress(self._data).decode('utf-8', 'surrogatepass')
+      self._data = None
+      docWidget.getUndoManager().suspend()
+      docWidget.setPlainText(text)
+      return self._restoreState()
+    source = self._spill or self._fileName
+    if source is None:
+      return self._autoSaver.setModel(docWidget.getTextModel())
+    if self._spill is None and self._state is not None \
+        and _fileState(source) != self._fileState:
+      self._state['history'] = None
+    docWidget.getUndoManager().suspend()
+    self._restoring = True
+    self._fileLoader.load(source, docWidget.document())
+
+  def _loadEnded(self, *_) -> NoReturn:
+    """Completes the load or the restore of the document"""
+    if not self._restoring:
+      self._fileState = _fileState(self._fileName)
+      self._docWidget.getUndoManager().resume()
+      self._autoSaver.setModel(self._docWidget.getTextModel())
+      return self._autoSaver.resume()
+    self._restoring = False
+    if self._spill is not None:
+      os.remove(self._spill)
+      self._spill = None
+    else:
+      self._fileState = _fileState(self._fileName)
+    self._restoreState()
+
+  def _loadFailed(self, *_) -> NoReturn:
+    """Returns a page whose text could not be restored to hibernation,
+    keeping the text, unless it is the current tab"""
+    if not self._restoring:
+      return self._loadEnded()
+    self._restoring = False
+    if self._spill is not None and not self._active:
+      return self._release()
+    if self._recovery is not None:
+      self._recovery.release()
+      self._recovery = None
+    self._state = None
+    self._docWidget.getUndoManager().resume()
+    self._autoSaver.setModel(self._docWidget.getTextModel())
+
+  def _restoreState(self) -> NoReturn:
+    """Restores the state of the document saved at hibernation"""
+    docWidget, state, self._state = self._docWidget, self._state, None
+    document = docWidget.document()
+    undoManager = docWidget.getUndoManager()
+    if state is None:
+      undoManager.resume()
+      return self._autoSaver.setModel(docWidget.getTextModel())
+    if state['history'] is None:
+      undoManager.resume()
+    else:
+      undoManager.setHistory(state['history'])
+    document.setModified(state['modified'])
+    self._autoSaver.setModel(docWidget.getTextModel())
+    if self._recovery is not None:
+      self._autoSaver.checkpoint()
+      self._autoSaver.flush()
+      self._recovery.discard()
+      self._recovery = None
+    length = document.characterCount() - 1
+    cursor = QTextCursor(document)
+    cursor.setPosition(min(state['anchor'], length))
+    cursor.setPosition(min(state['position'], length),
+                       QTextCursor.MoveMode.KeepAnchor)
+    docWidget.setTextCursor(cursor)
+    docWidget.verticalScrollBar().setValue(state['scroll'])
+    docWidget.horizontalScrollBar().setValue(state['hScroll'])
+
+  def recover(self, session: RecoverySession) -> NoReturn:
+    """Makes the text recovered from the session the hibernated text of
+    the page, marked as modified. The session is removed once the text is
+    restored, or left to be offered again if the page is closed first."""
+    fid = _spillFile()
+    with open(fid, 'wb') as file:
+      for chunk in session.recover().chunks():
+        file.write(chunk.encode('utf-8', 'surrogatepass'))
+    self._spill = fid
+    self._recovery = session
+    self._state = {'anchor': 0, 'position': 0, 'scroll': 0, 'hScroll': 0,
+                   'modified': True, 'history': None}
+    self.titleChanged.emit(self)
+
+  def canHibernate(self) -> bool:
+    """Flag indicating if the page may hibernate now"""
+    return self._docWidget is not None and not self._active \
+      and self._worker is None and not self._fileLoader.isLoading() \
+      and not self._fileSaver.isSaving()
+
+  def hibernate(self) -> bool:
+    """Starts hibernating the page. Returns False if it cannot hibernate
+    now. Unless the document matches its file, the text is written by a
+    worker thread, and the document widget is freed once it is done."""
+    if not self.canHibernate():
+      return False
+    document = self._docWidget.document()
+    if not document.isModified() and self._fileName is not None \
+        and _fileState(self._fileName) == self._fileState:
+      self._release()
+      return True
+    snapshot = self._docWidget.getTextModel().snapshot()
+    fid = _spillFile() if snapshot.length() > self.spillThreshold else None
+    self._worker = _HibernateWorker(snapshot, fid, self.chunkSize)
+    self._worker.finished.connect(self._workerFinished)
+    self._worker.start()
+    return True
+
+  def _workerFinished(self) -> NoReturn:
+    """Frees the document if it is still inactive and unchanged since
+    the snapshot was taken"""
+    worker, self._worker = self._worker, None
+    if worker is None:
+      return
+    docWidget = self._docWidget
+    if worker.error is None and docWidget is not None and not self._active \
+        and docWidget.getTextModel().getRevision() == worker.revision:
+      return self._release(worker.data, worker.fid)
+    if worker.fid is not None and os.path.exists(worker.fid):
+      os.remove(worker.fid)
+
+  def _release(self, data: bytes = None, fid: str = None) -> NoReturn:
+    """Saves the state of the document and frees the document widget"""
+    docWidget = self._docWidget
+    document = docWidget.document()
+    cursor = docWidget.textCursor()
+    if self._state is None:
+      self._state = {
+        'anchor': cursor.anchor(),
+        'position': cursor.position(),
+        'scroll': docWidget.verticalScrollBar().value(),
+        'hScroll': docWidget.horizontalScrollBar().value(),
+        'modified': document.isModified(),
+        'history': docWidget.getUndoManager().takeHistory(),
+      }
+    self._autoSaver.setModel(None)
+    if data is not None:
+      self._data = data
+    if fid is not None:
+      self._spill = fid
+    self._layout.removeWidget(docWidget)
+    self._docWidget, self._fileSaver = None, None
+    docWidget.deleteLater()
+
+  def dispose(self) -> NoReturn:
+    """Completes the work in progress before the page is closed. Unsaved
+    changes are left in the autosave session."""
+    self._fileLoader.cancel()
+    if self._fileSaver is not None:
+      self._fileSaver.wait()
+    if self._worker is not None:
+      self._worker.wait()
+      self._workerFinished()
+    self._autoSaver.close()
+    if self._recovery is not None:
+      self._recovery.release()
+      self._recovery = None
+    if self._spill is not None and os.path.exists(self._spill):
+      os.remove(self._spill)
+    self._spill, self._data = None, None
+
+
+class DocumentTabs(QTabWidget):
+  """DocumentTabs shows each open document in a tab. Pages which have
+  not been the current tab for hibernateAfter seconds are hibernated,
+  see DocumentPage, such that the memory of many open documents
+  approaches that of the few in use. The pages are checked on a low
+  frequency timer.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  pageAdded = Signal(DocumentPage)
+  pageActivated = Signal(DocumentPage)
+  docWidgetCreated = Signal(DocWidget)
+
+  def __init__(self, window: QWidget, hibernateAfter: float = 300.0,
+               interval: int = 15000) -> None:
+    QTabWidget.__init__(self)
+    self._window = window
+    self._hibernateAfter = hibernateAfter
+    self._current: Optional[DocumentPage] = None
+    self.setTabsClosable(True)
+    self.setMovable(True)
+    self.setDocumentMode(True)
+    self.currentChanged.connect(self._currentChanged)
+    self.tabCloseRequested.connect(self.closePage)
+    self._timer = QTimer(self)
+    self._timer.setInterval(interval)
+    self._timer.timeout.connect(self.hibernateIdle)
+    self._timer.start()
+
+  def getHibernateAfter(self) -> float:
+    """Getter-function for the seconds a tab is left before hibernating"""
+    return self._hibernateAfter
+
+  def setHibernateAfter(self, seconds: float) -> NoReturn:
+    """Setter-function for the seconds a tab is left before hibernating"""
+    self._hibernateAfter = seconds
+
+  def pages(self) -> list[DocumentPage]:
+    """Returns the pages in the order of the tabs"""
+    return [self.widget(index) for index in range(self.count())]
+
+  def currentPage(self) -> Optional[DocumentPage]:
+    """Returns the page of the current tab"""
+    return self._current
+
+  def newPage(self, fid: str = None, activate: bool = True) -> DocumentPage:
+    """Adds a page for the file, or an empty page. A page which is not
+    activated hibernates until it is."""
+    page = DocumentPage(self._window, fid)
+    page.docWidgetCreated.connect(self.docWidgetCreated)
+    page.titleChanged.connect(self._updateTitle)
+    self.pageAdded.emit(page)
+    index = self.addTab(page, page.getTitle())
+    self.setTabToolTip(index, fid or '')
+    if activate:
+      self.setCurrentIndex(index)
+    return page
+
+  def _updateTitle(self, page: DocumentPage) -> NoReturn:
+    """Shows the file name and modification of the page in its tab"""
+    index = self.indexOf(page)
+    if index < 0:
+      return
+    title = page.getTitle()
+    self.setTabText(index, '%s *' % title if page.isModified() else title)
+    self.setTabToolTip(index, page.getFileName() or '')
+
+  def _currentChanged(self, index: int) -> NoReturn:
+    """Deactivates the previous page and activates the current"""
+    page = self.widget(index) if index >= 0 else None
+    if page is self._current:
+      return
+    if self._current is not None:
+      self._current.setActive(False)
+    self._current = page
+    if page is not None:
+      page.setActive(True)
+      self.pageActivated.emit(page)
+
+  def closePage(self, index: int) -> NoReturn:
+    """Closes the page of the tab. The last page is replaced by an empty
+    one."""
+    page = self.widget(index)
+    if page is None:
+      return
+    if page is self._current:
+      page.setActive(False)
+      self._current = None
+    page.dispose()
+    self.removeTab(index)
+    page.deleteLater()
+    if not self.count():
+      self.newPage()
+    elif self._current is None:
+      self._currentChanged(self.currentIndex())
+
+  def hibernateIdle(self) -> NoReturn:
+    """Hibernates the pages left for longer than hibernateAfter"""
+    now = time.monotonic()
+    for page in self.pages():
+      if page.isLive() and now - page.lastActive >= self._hibernateAfter:
+        page.hibernate()
+
+  def getStats(self) -> dict:
+    """Returns the numbers of pages, of live pages and of spilled pages,
+    and the bytes of the texts hibernating in memory"""
+    pages = self.pages()
+    return {
+      'pages': len(pages),
+      'live': sum(page.isLive() for page in pages),
+      'spilled': sum(page.isSpilled() for page in pages),
+      'memory': sum(page.getMemoryUse() for page in pages),
+    }
+
+  def dispose(self) -> NoReturn:
+    """Completes the work in progress of every page before closing"""
+    self._timer.stop()
+    for page in self.pages():
+      page.dispose()
@@ -3,39 +3,194 @@
 #  MIT Licence
 from __future__ import annotations
 
-from typing import NoReturn
+from typing import NoReturn, Any
 
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QKeyEvent, QTextDocument
-from PySide6.QtWidgets import QPlainTextEdit
-from icecream import ic
+from PySide6.QtGui import QKeyEvent, QTextDocument, QMouseEvent, \
+  QContextMenuEvent, QTextCursor, QTextCharFormat, QColor, QPaintEvent, \
+  QKeySequence
+from PySide6.QtWidgets import QPlainTextEdit, QTextEdit
 
+from hackboard.pyside import SpellChecker, wordPattern, DocumentStats
+from hackboard.pyside import MarkdownHighlighter
+from hackboard.pyside import SearchIndex, TextModel, UndoManager
+from hackboard.pyside import Vocabulary, WordCompleter
+from hackboard.pyside import keyLatency
 from hackboard.pyside.style import FontStyle
 
-ic.configureOutput(includeContext=True)
-
 
 class DocWidget(QPlainTextEdit):
   """Document Widget"""
 
+  maxHighlights = 2000
+  completionKeys = (Qt.Key.Key_Return, Qt.Key.Key_Enter, Qt.Key.Key_Tab,
+                    Qt.Key.Key_Backtab, Qt.Key.Key_Escape)
+  navigationKeys = (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up,
+                    Qt.Key.Key_Down, Qt.Key.Key_Home, Qt.Key.Key_End,
+                    Qt.Key.Key_PageUp, Qt.Key.Key_PageDown)
+
   def __init__(self, parent=None) -> None:
-    self._parent = parent
     QPlainTextEdit.__init__(self, parent)
+    self._spellChecker = MarkdownHighlighter(self.document())
+    self._stats = DocumentStats(self.document())
+    self._searchIndex = SearchIndex(self.document())
+    self._textModel = TextModel(self.document())
+    self._undoManager = UndoManager(self._textModel, self)
+    self._vocabulary = Vocabulary(self._textModel)
+    self._completer = WordCompleter(self, self._vocabulary)
+    self._searchIndex.searchStarted.connect(self.clearMatches)
+    self._searchIndex.matchesFound.connect(self.highlightMatches)
+    self._matchFormat = QTextCharFormat()
+    self._matchFormat.setBackground(QColor(255, 223, 0, 255))
+    self._matches = []
 
   def getDocument(self) -> QTextDocument:
     """Getter-function for the underlying document"""
     return self.document()
 
+  def getSpellChecker(self) -> SpellChecker:
+    """Getter-function for the spell checker, which is the Markdown
+    highlighter"""
+    return self._spellChecker
+
+  def getHighlighter(self) -> MarkdownHighlighter:
+    """Getter-function for the Markdown highlighter"""
+    return self._spellChecker
+
+  def getStats(self) -> DocumentStats:
+    """Getter-function for the document statistics"""
+    return self._stats
+
+  def getSearchIndex(self) -> SearchIndex:
+    """Getter-function for the search index"""
+    return self._searchIndex
+
+  def getTextModel(self) -> TextModel:
+    """Getter-function for the text model"""
+    return self._textModel
+
+  def getUndoManager(self) -> UndoManager:
+    """Getter-function for the undo manager"""
+    return self._undoManager
+
+  def getVocabulary(self) -> Vocabulary:
+    """Getter-function for the vocabulary of the document"""
+    return self._vocabulary
+
+  def getCompleter(self) -> WordCompleter:
+    """Getter-function for the word completer"""
+    return self._completer
+
+  def setDictionary(self, dictionary: Any) -> NoReturn:
+    """Sets the dictionary of the spell checker and of the word
+    completion"""
+    self._spellChecker.setDictionary(dictionary)
+    self._vocabulary.setDictionary(dictionary)
+
+  def undo(self) -> NoReturn:
+    """Undoes the most recent step of the undo manager"""
+    self._undoManager.undo()
+
+  def redo(self) -> NoReturn:
+    """Redoes the most recently undone step of the undo manager"""
+    self._undoManager.redo()
+
+  def clearMatches(self, *_) -> NoReturn:
+    """Removes the highlighting of search matches"""
+    self._matches = []
+    self.setExtraSelections([])
+
+  def highlightMatches(self, matches: list[tuple[int, int]]) -> NoReturn:
+    """Highlights the search matches given as positions and lengths. At
+    most maxHighlights matches are highlighted."""
+    room = self.maxHighlights - len(self._matches)
+    if room <= 0:
+      return
+    for position, length in matches[:room]:
+      selection = QTextEdit.ExtraSelection()
+      selection.cursor = QTextCursor(self.document())
+      selection.cursor.setPosition(position)
+      selection.cursor.setPosition(position + length,
+                                   QTextCursor.MoveMode.KeepAnchor)
+      selection.format = self._matchFormat
+      self._matches.append(selection)
+    self.setExtraSelections(self._matches)
+
   def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Transmits certain events to the parent"""
+    """Handles undo and redo and updates the completions. While
+    completions are shown, the keys choosing or dismissing them are left to
+    the completer. Shortcuts of the window are dispatched before this by
+    its CommandRegistry."""
+    if self._completer.isPopupVisible() \
+        and event.key() in self.completionKeys:
+      return event.ignore()
+    if event.matches(QKeySequence.StandardKey.Undo):
+      return self.undo()
+    if event.matches(QKeySequence.StandardKey.Redo):
+      return self.redo()
+    if event.key() in self.navigationKeys:
+      self._undoManager.breakGroup()
+    text = event.text()
+    if text and text.isalpha():
+      self._spellChecker.setActivePosition(self.textCursor().position())
     QPlainTextEdit.keyPressEvent(self, event)
-    key = event.key()
-    if Qt.Key.Key_F1 <= key <= Qt.Key.Key_F35 and self._parent is not None:
-      self._parent.keyPressEvent(event)
+    if text and text.isalpha() or event.key() == Qt.Key.Key_Backspace \
+        and self._completer.isPopupVisible():
+      self._completer.updateCompletions()
+    elif text or event.key() in self.navigationKeys:
+      self._completer.hidePopup()
+    if keyLatency.enabled:
+      keyLatency.mark('DocWidget')
 
   def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Transmits certain events to the parent"""
+    """Commits the word being typed when a key other than a letter is
+    released"""
     QPlainTextEdit.keyReleaseEvent(self, event)
-    key = event.key()
-    if Qt.Key.Key_F1 <= key <= Qt.Key.Key_F35 and self._parent is not None:
-      self._parent.keyReleaseEvent(event)
+    text = event.text()
+    if text and not text.isalpha():
+      self._spellChecker.commitWord()
+
+  def paintEvent(self, event: QPaintEvent) -> NoReturn:
+    """Records the paint following a key press when measuring latency"""
+    QPlainTextEdit.paintEvent(self, event)
+    if keyLatency.pending:
+      keyLatency.painted()
+
+  def mousePressEvent(self, event: QMouseEvent) -> NoReturn:
+    """Commits the word being typed and ends the undo step before moving
+    the cursor"""
+    self._spellChecker.commitWord()
+    self._undoManager.breakGroup()
+    self._completer.hidePopup()
+    QPlainTextEdit.mousePressEvent(self, event)
+
+  def contextMenuEvent(self, event: QContextMenuEvent) -> NoReturn:
+    """Adds spelling suggestions for the misspelled word under the mouse
+    to the standard context menu"""
+    menu = self.createStandardContextMenu()
+    cursor = self.cursorForPosition(event.pos())
+    block, column = cursor.block(), cursor.positionInBlock()
+    spellChecker = self._spellChecker
+    for match in wordPattern.finditer(block.text()):
+      if not match.start() <= column <= match.end():
+        continue
+      word, start = match.group(), block.position() + match.start()
+      if spellChecker.getDictionary() is None or spellChecker.isKnown(word):
+        break
+      first = menu.actions()[0] if menu.actions() else None
+      for suggestion in spellChecker.suggest(word):
+        action = menu.addAction(suggestion)
+        menu.insertAction(first, action)
+        action.triggered.connect(
+          lambda *_, s=suggestion: self._replaceWord(start, len(word), s))
+      if first is not None:
+        menu.insertSeparator(first)
+      break
+    menu.exec(event.globalPos())
+
+  def _replaceWord(self, start: int, length: int, word: str) -> NoReturn:
+    """Replaces the text at start with the word"""
+    cursor = QTextCursor(self.document())
+    cursor.setPosition(start)
+    cursor.setPosition(start + length, QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(word)
@@ -0,0 +1,191 @@
+"""FileLoader streams files from disk into a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import codecs
+import os
+import queue
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
+from PySide6.QtGui import QTextCursor, QTextDocument
+
+_BOMS = [
+  (codecs.BOM_UTF32_LE, 'utf-32-le'),
+  (codecs.BOM_UTF32_BE, 'utf-32-be'),
+  (codecs.BOM_UTF8, 'utf-8'),
+  (codecs.BOM_UTF16_LE, 'utf-16-le'),
+  (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+
+def sniffEncoding(head: bytes, fallback: str = 'utf-8') -> tuple[str, int]:
+  """Returns the encoding indicated by the byte order mark at the start of
+  head together with the length of the mark. The UTF-32 marks are tested
+  before the UTF-16 marks as they share a prefix."""
+  for bom, encoding in _BOMS:
+    if head.startswith(bom):
+      return encoding, len(bom)
+  return fallback, 0
+
+
+class _LoadWorker(QThread):
+  """Reads and decodes the file on a worker thread. Decoded text is placed
+  on a bounded queue which blocks the worker when the GUI thread falls
+  behind.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, fid: str, chunks: queue.Queue,
+               firstChunk: int, chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._fid = fid
+    self._chunks = chunks
+    self._firstChunk = firstChunk
+    self._chunkSize = chunkSize
+
+  def _put(self, item: object) -> bool:
+    """Places the item on the queue. Returns False if interrupted while
+    waiting for room."""
+    while not self.isInterruptionRequested():
+      try:
+        self._chunks.put(item, timeout=0.05)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def run(self) -> NoReturn:
+    """Reads the file in chunks, normalising line endings to '\\n'"""
+    try:
+      with open(self._fid, 'rb') as file:
+        encoding, bomLength = sniffEncoding(file.read(4))
+        file.seek(bomLength)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        size, pending = self._firstChunk, ''
+        while not self.isInterruptionRequested():
+          data = file.read(size)
+          size = self._chunkSize
+          final = not data
+          text = pending + decoder.decode(data, final)
+          pending = ''
+          if not final and text.endswith('\r'):
+            text, pending = text[:-1], '\r'
+          text = text.replace('\r\n', '\n').replace('\r', '\n')
+          if text and not self._put((text, file.tell())):
+            return
+          if final:
+            break
+    except (OSError, LookupError) as e:
+      self._put(e)
+      return
+    self._put(None)
+
+
+class FileLoader(QObject):
+  """FileLoader streams a file into a QTextDocument without blocking the
+  event loop. The file is read and decoded on a worker thread, while the
+  GUI thread appends at most one chunk to the document per event loop
+  iteration. The first chunk is kept small such that the top of the file
+  is visible and editable almost immediately.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  progressed = Signal(int, int)
+  finished = Signal(str)
+  failed = Signal(str)
+  cancelled = Signal()
+
+  def __init__(self, parent: QObject = None, firstChunk: int = 16384,
+               chunkSize: int = 262144, queueSize: int = 8) -> None:
+    QObject.__init__(self, parent)
+    self._firstChunk = firstChunk
+    self._chunkSize = chunkSize
+    self._chunks = queue.Queue(maxsize=queueSize)
+    self._worker: Optional[_LoadWorker] = None
+    self._document: Optional[QTextDocument] = None
+    self._cursor: Optional[QTextCursor] = None
+    self._fid = None
+    self._total = 0
+    self._undoRedo = True
+    self._timer = QTimer(self)
+    self._timer.setInterval(0)
+    self._timer.timeout.connect(self._appendChunk)
+
+  def isLoading(self) -> bool:
+    """Flag indicating if a load is in progress"""
+    return self._worker is not None
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file currently or most recently loaded"""
+    return self._fid
+
+  def load(self, fid: str, document: QTextDocument) -> NoReturn:
+    """Starts loading the file into the document replacing its contents.
+    If the file cannot be read, failed is emitted and the document is left
+    unchanged."""
+    self.cancel()
+    self._fid = fid
+    try:
+      self._total = os.path.getsize(fid)
+    except OSError as e:
+      return self.failed.emit(str(e))
+    self._document = document
+    document.clear()
+    self._undoRedo = document.isUndoRedoEnabled()
+    document.setUndoRedoEnabled(False)
+    self._cursor = QTextCursor(document)
+    self._worker = _LoadWorker(
+      fid, self._chunks, self._firstChunk, self._chunkSize)
+    self._worker.start()
+    self._timer.start()
+    self.progressed.emit(0, self._total)
+
+  def cancel(self) -> NoReturn:
+    """Cancels the load in progress, if any. Text already appended to the
+    document remains."""
+    if self._worker is None:
+      return
+    self._stop()
+    self.cancelled.emit()
+
+  def _stop(self) -> NoReturn:
+    """Stops the worker and the timer and releases the document"""
+    self._timer.stop()
+    self._worker.requestInterruption()
+    while self._worker.isRunning():
+      self._drain()
+      self._worker.wait(10)
+    self._drain()
+    self._worker = None
+    self._cursor = None
+    self._document.setUndoRedoEnabled(self._undoRedo)
+    self._document.setModified(False)
+    self._document = None
+
+  def _drain(self) -> NoReturn:
+    """Empties the queue"""
+    while True:
+      try:
+        self._chunks.get_nowait()
+      except queue.Empty:
+        return
+
+  def _appendChunk(self) -> NoReturn:
+    """Appends the next decoded chunk, if ready, to the document"""
+    try:
+      item = self._chunks.get_nowait()
+    except queue.Empty:
+      return
+    if item is None:
+      self._stop()
+      self.progressed.emit(self._total, self._total)
+      return self.finished.emit(self._fid)
+    if isinstance(item, Exception):
+      self._stop()
+      return self.failed.emit(str(item))
+    text, position = item
+    self._cursor.movePosition(QTextCursor.MoveOperation.End)
+    self._cursor.insertText(text)
+    self.progressed.emit(position, self._total)
@@ -0,0 +1,238 @@
+"""FileSaver writes a QTextDocument to disk on a worker thread"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import bisect
+import os
+import shutil
+import tempfile
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtGui import QTextDocument
+
+from hackboard.pyside import TextModel, TextSnapshot
+
+
+def _umask() -> int:
+  """Returns the file mode creation mask of the process"""
+  mask = os.umask(0o022)
+  os.umask(mask)
+  return mask
+
+
+_newFileMode = 0o666 & ~_umask()
+
+
+def _fileState(fid: str) -> Optional[tuple[int, int]]:
+  """Returns the size and modification time of the file, or None if it
+  does not exist"""
+  try:
+    stat = os.stat(fid)
+  except OSError:
+    return None
+  return stat.st_size, stat.st_mtime_ns
+
+
+def _fsyncDir(dirName: str) -> NoReturn:
+  """Flushes the directory entry, where the platform supports it"""
+  try:
+    fd = os.open(dirName, os.O_RDONLY)
+  except OSError:
+    return
+  try:
+    os.fsync(fd)
+  except OSError:
+    pass
+  finally:
+    os.close(fd)
+
+
+class _SaveWorker(QThread):
+  """Writes the snapshot to a temporary file next to the target and
+  renames it over the target. The bytes before the first changed block
+  are copied from the previous version of the file, only the text from
+  there on is read from the snapshot and encoded.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, fid: str, snapshot: TextSnapshot, block: int,
+               offset: int, chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._fid = fid
+    self._snapshot = snapshot
+    self._block = block
+    self._offset = offset
+    self._chunkSize = chunkSize
+    self.checkpoints = []
+    self.error = None
+
+  def run(self) -> NoReturn:
+    """Writes the file. A new file is given the mode of a file created by
+    open, rather than the private mode of the temporary file."""
+    dirName = os.path.dirname(os.path.abspath(self._fid))
+    name = os.path.basename(self._fid)
+    tmp = None
+    try:
+      fd, tmp = tempfile.mkstemp(prefix='.%s.' % name, suffix='.tmp',
+                                 dir=dirName)
+      with os.fdopen(fd, 'wb') as file:
+        if self._offset:
+          with open(self._fid, 'rb') as old:
+            self._copyPrefix(old, file)
+        self._writeTail(file)
+        file.flush()
+        os.fsync(file.fileno())
+      if os.path.exists(self._fid):
+        shutil.copymode(self._fid, tmp)
+      else:
+        os.chmod(tmp, _newFileMode)
+      os.replace(tmp, self._fid)
+      _fsyncDir(dirName)
+    except (OSError, UnicodeError) as e:
+      self.error = e
+      if tmp is not None and os.path.exists(tmp):
+        os.remove(tmp)
+
+  def _copyPrefix(self, old, new) -> NoReturn:
+    """Copies the unchanged bytes from the old file"""
+    remaining = self._offset
+    while remaining:
+      data = old.read(min(remaining, 1048576))
+      if not data:
+        raise OSError('File shorter than expected: %s' % self._fid)
+      new.write(data)
+      remaining -= len(data)
+
+  def _writeTail(self, file) -> NoReturn:
+    """Encodes and writes the text in chunks ending on block boundaries,
+    recording the block number and byte offset after each chunk."""
+    snapshot, block, offset = self._snapshot, self._block, self._offset
+    self.checkpoints.append((block, offset))
+    start, n = snapshot.lineStart(block), snapshot.length()
+    while start < n:
+      block = snapshot.lineAt(min(start + self._chunkSize, n)) + 1
+      end = snapshot.lineStart(block)
+      data = snapshot.slice(start, end).encode('utf-8')
+      file.write(data)
+      offset += len(data)
+      if end < n:
+        self.checkpoints.append((block, offset))
+      start = end
+
+
+class FileSaver(QObject):
+  """FileSaver saves a QTextDocument without blocking the event loop. The
+  GUI thread only takes a snapshot of the TextModel of the document, in
+  constant time, and the text is read from it, encoded and written to a
+  temporary file by a worker thread. The temporary file is
+  synced and renamed over the target, such that the target is never left
+  partially written.
+
+  While saving, the byte offsets of block boundaries are recorded. Changes
+  to the document are tracked through contentsChange, such that the next
+  save of the same file only needs to snapshot and encode the text from
+  the first changed block on. The unchanged bytes before it are copied
+  from the previous version of the file. A document without a TextModel
+  is given one on its first save.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  saved = Signal(str)
+  failed = Signal(str)
+
+  def __init__(self, parent: QObject = None,
+               chunkSize: int = 1048576) -> None:
+    QObject.__init__(self, parent)
+    self._chunkSize = chunkSize
+    self._document: Optional[QTextDocument] = None
+    self._worker: Optional[_SaveWorker] = None
+    self._pending: Optional[str] = None
+    self._fid = None
+    self._fileState = None
+    self._checkpoints = []
+    self._dirtyBlock = None
+
+  def isSaving(self) -> bool:
+    """Flag indicating if a save is in progress"""
+    return self._worker is not None
+
+  def isDirty(self) -> bool:
+    """Flag indicating if the document changed since the last snapshot"""
+    return self._dirtyBlock is not None
+
+  def _track(self, document: QTextDocument) -> NoReturn:
+    """Tracks changes to the document"""
+    if self._document is not None:
+      self._document.contentsChange.disconnect(self._contentsChanged)
+    self._document = document
+    self._document.contentsChange.connect(self._contentsChanged)
+    self._fid = None
+    self._checkpoints = []
+    self._dirtyBlock = 0
+
+  def _contentsChanged(self, position: int, *_) -> NoReturn:
+    """Records the first block changed since the last snapshot"""
+    block = self._document.findBlock(position).blockNumber()
+    if block < 0:
+      block = 0
+    if self._dirtyBlock is None or block < self._dirtyBlock:
+      self._dirtyBlock = block
+
+  def _resumePoint(self, fid: str) -> tuple[int, int]:
+    """Returns the block number and byte offset from which the file must
+    be rewritten."""
+    if fid != self._fid or _fileState(fid) != self._fileState:
+      return 0, 0
+    if self._dirtyBlock is None:
+      return self._checkpoints[-1]
+    keys = [block for block, _ in self._checkpoints]
+    index = bisect.bisect_right(keys, self._dirtyBlock) - 1
+    return self._checkpoints[max(index, 0)]
+
+  def save(self, fid: str, document: QTextDocument) -> NoReturn:
+    """Saves the document to the file. If a save is already in progress,
+    the save is started when it completes."""
+    if document is not self._document:
+      self._track(document)
+    if self._worker is not None:
+      self._pending = fid
+      return
+    block, offset = self._resumePoint(fid)
+    if block:
+      self._checkpoints = [c for c in self._checkpoints if c[0] < block]
+    else:
+      self._checkpoints = []
+      offset = 0
+    snapshot = TextModel.forDocument(document).snapshot()
+    self._dirtyBlock = None
+    self._fid = fid
+    self._worker = _SaveWorker(fid, snapshot, block, offset,
+                               self._chunkSize)
+    self._worker.finished.connect(self._workerFinished)
+    self._worker.start()
+
+  def wait(self) -> NoReturn:
+    """Blocks until the save in progress, if any, has completed"""
+    while self._worker is not None:
+      self._worker.wait()
+      self._workerFinished()
+
+  def _workerFinished(self) -> NoReturn:
+    """Collects the result of the worker"""
+    worker = self._worker
+    if worker is None or not worker.isFinished():
+      return
+    self._worker = None
+    if worker.error is not None:
+      self._fid, self._fileState, self._checkpoints = None, None, []
+      self._dirtyBlock = 0
+      self.failed.emit(str(worker.error))
+    else:
+      self._checkpoints.extend(worker.checkpoints)
+      self._fileState = _fileState(self._fid)
+      self.saved.emit(self._fid)
+    if self._pending is not None:
+      fid, self._pending = self._pending, None
+      self.save(fid, self._document)
@@ -0,0 +1,423 @@
+"""FileViewer shows files too large for a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import bisect
+import math
+import mmap
+import operator
+import os
+import re
+import struct
+from array import array
+from itertools import accumulate
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QRectF, QThread, QTimer, Qt, Signal
+from PySide6.QtGui import QColor, QKeyEvent, QKeySequence, QPainter, \
+  QPaintEvent, QResizeEvent
+from PySide6.QtWidgets import QAbstractScrollArea, QInputDialog, QWidget
+
+from hackboard.pyside import sniffEncoding
+from hackboard.pyside.style import FontRegistry
+
+_MAGIC = b'HBLINES1'
+_HEADER = struct.Struct('<8sQQQ')
+
+
+def lineIndexFile(fid: str) -> str:
+  """Returns the name of the file persisting the line index of the file"""
+  return '%s.hblines' % fid
+
+
+def isViewable(fid: str) -> bool:
+  """Flag indicating if the file can be shown by the viewer, which splits
+  lines on the byte of the line feed. This excludes files with a UTF-16
+  or UTF-32 byte order mark."""
+  with open(fid, 'rb') as file:
+    return sniffEncoding(file.read(4))[0] == 'utf-8'
+
+
+class _IndexWorker(QThread):
+  """Builds the index of line offsets of the file on a worker thread. The
+  offsets found in each chunk are appended to the shared array in a single
+  call, so the GUI thread always sees a consistent prefix of the index.
+  The completed index is written next to the file for reuse.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  progressed = Signal(int)
+
+  def __init__(self, fid: str, offsets: array, chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._fid = fid
+    self._offsets = offsets
+    self._chunkSize = chunkSize
+    self.complete = False
+
+  def run(self) -> NoReturn:
+    """Reads the persisted index if valid and otherwise builds it"""
+    stat = os.stat(self._fid)
+    if self._readIndex(stat):
+      self.complete = True
+      return self.progressed.emit(stat.st_size)
+    position, size = self._offsets[0], stat.st_size
+    if size:
+      with open(self._fid, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+      size = min(size, len(data))
+      try:
+        while position < size:
+          if self.isInterruptionRequested():
+            return
+          end = min(position + self._chunkSize, size)
+          parts = data[position:end].split(b'\n')
+          lengths = accumulate(map(len, parts[:-1]))
+          starts = range(position + 1, position + len(parts))
+          self._offsets.extend(array('Q', map(operator.add, lengths,
+                                              starts)))
+          position = end
+          self.progressed.emit(position)
+      finally:
+        data.close()
+    self._writeIndex(stat)
+    self.complete = True
+    self.progressed.emit(size)
+
+  def _readIndex(self, stat: os.stat_result) -> bool:
+    """Reads the persisted index if it matches the size and modification
+    time of the file"""
+    try:
+      with open(lineIndexFile(self._fid), 'rb') as file:
+        header = file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+          return False
+        magic, size, modified, count = _HEADER.unpack(header)
+        if (magic, size, modified) != (_MAGIC, stat.st_size,
+                                       stat.st_mtime_ns):
+          return False
+        offsets = array('Q')
+        offsets.fromfile(file, count)
+    except (OSError, EOFError):
+      return False
+    self._offsets[:] = offsets
+    return True
+
+  def _writeIndex(self, stat: os.stat_result) -> NoReturn:
+    """Writes the index next to the file, if the directory permits"""
+    target = lineIndexFile(self._fid)
+    tmp = '%s.tmp' % target
+    try:
+      with open(tmp, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns,
+                                len(self._offsets)))
+        self._offsets.tofile(file)
+      os.replace(tmp, target)
+    except OSError:
+      if os.path.exists(tmp):
+        os.remove(tmp)
+
+
+class _FindWorker(QThread):
+  """Searches the memory map for the pattern on a worker thread. The map
+  is searched in chunks overlapping by the length of the query, letting
+  the GUI thread take the interpreter lock between chunks.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  found = Signal(int, int)
+
+  def __init__(self, data: mmap.mmap, query: bytes, start: int,
+               chunkSize: int) -> None:
+    QThread.__init__(self)
+    self._data = data
+    self._pattern = re.compile(re.escape(query), re.IGNORECASE)
+    self._overlap = len(query) - 1
+    self._start = start
+    self._chunkSize = chunkSize
+
+  def run(self) -> NoReturn:
+    """Emits the offset and length of the first match after the start, or
+    -1 if there is none"""
+    position, size = self._start, len(self._data)
+    while position < size:
+      if self.isInterruptionRequested():
+        return
+      end = min(position + self._chunkSize + self._overlap, size)
+      match = self._pattern.search(self._data, position, end)
+      if match is not None:
+        return self.found.emit(match.start(), match.end() - match.start())
+      position += self._chunkSize
+    self.found.emit(-1, 0)
+
+
+class FileViewer(QAbstractScrollArea):
+  """FileViewer shows a file read only through a memory map, for files
+  too large to be loaded into a document. The offset of the start of each
+  line is indexed on a worker thread, and lines are decoded only when
+  painted, so the memory used is eight bytes per line regardless of the
+  length of the lines.
+
+  The file can be scrolled while the index is built, and once it exists
+  jumping to a line or to the end is a lookup in the index. The index is
+  persisted next to the file and reused when the file is opened again
+  unchanged. Searches run on a worker thread from the current match,
+  ignoring the case of ASCII letters.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  indexProgressed = Signal(int, int)
+  indexFinished = Signal(int)
+  matchFound = Signal(str, int)
+
+  def __init__(self, parent: QWidget = None, maxColumns: int = 2048,
+               chunkSize: int = 16777216, delay: int = 150) -> None:
+    QAbstractScrollArea.__init__(self, parent)
+    self._maxColumns = maxColumns
+    self._chunkSize = chunkSize
+    self._fid: Optional[str] = None
+    self._data: Optional[mmap.mmap] = None
+    self._size = 0
+    self._offsets = array('Q')
+    self._indexWorker: Optional[_IndexWorker] = None
+    self._findWorker: Optional[_FindWorker] = None
+    self._query = ''
+    self._match: Optional[tuple[int, int]] = None
+    self._matchColor = QColor(255, 223, 0, 255)
+    self._font = FontRegistry.getFont('Consolas', 12)
+    self.setFont(self._font)
+    self._metrics = FontRegistry.getMetrics(self._font)
+    self._lineHeight = math.ceil(self._metrics.lineSpacing())
+    self._ascent = math.ceil(self._metrics.ascent())
+    self._charWidth = math.ceil(self._metrics.horizontalAdvance('M'))
+    self._debounce = QTimer(self)
+    self._debounce.setSingleShot(True)
+    self._debounce.setInterval(delay)
+    self._debounce.timeout.connect(self.findNext)
+    self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file shown"""
+    return self._fid
+
+  def isIndexing(self) -> bool:
+    """Flag indicating if the line index is being built"""
+    return self._indexWorker is not None and not self._indexWorker.complete
+
+  def openFile(self, fid: str) -> NoReturn:
+    """Shows the file, starting to index its lines"""
+    self.closeFile()
+    self._fid = fid
+    self._size = os.path.getsize(fid)
+    with open(fid, 'rb') as file:
+      bomLength = sniffEncoding(file.read(4))[1]
+      if self._size:
+        self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    self._offsets = array('Q', [bomLength])
+    self._indexWorker = _IndexWorker(fid, self._offsets, self._chunkSize)
+    self._indexWorker.progressed.connect(self._indexProgressed)
+    self._indexWorker.start()
+    self.verticalScrollBar().setValue(0)
+    self.horizontalScrollBar().setValue(0)
+    self._updateScrollBars()
+
+  def closeFile(self) -> NoReturn:
+    """Stops the workers and releases the memory map"""
+    self._debounce.stop()
+    for worker in (self._indexWorker, self._findWorker):
+      if worker is not None:
+        worker.requestInterruption()
+        worker.wait()
+    self._indexWorker, self._findWorker = None, None
+    if self._data is not None:
+      self._data.close()
+    self._fid, self._data, self._size = None, None, 0
+    self._offsets = array('Q')
+    self._match = None
+    self.viewport().update()
+
+  def _indexProgressed(self, position: int) -> NoReturn:
+    """Updates the scroll bars to the lines indexed so far"""
+    self._updateScrollBars()
+    self.viewport().update()
+    self.indexProgressed.emit(position, self._size)
+    if self._indexWorker is not None and self._indexWorker.complete:
+      self.indexFinished.emit(self.lineCount())
+
+  def lineCount(self) -> int:
+    """Returns the number of lines indexed. The last line is only counted
+    when the index is complete, as its end is unknown until then."""
+    if self._indexWorker is None:
+      return 0
+    if self._indexWorker.complete:
+      return len(self._offsets)
+    return len(self._offsets) - 1
+
+  def _lineRange(self, line: int) -> tuple[int, int]:
+    """Returns the offsets of the start and end of the line"""
+    start = self._offsets[line]
+    end = self._offsets[line + 1] if line + 1 < len(self._offsets) \
+      else self._size
+    return start, end
+
+  def line(self, line: int) -> str:
+    """Returns the text of the line, without the line break and truncated
+    to the maximum number of columns"""
+    start, end = self._lineRange(line)
+    data = self._data[start:min(end, start + 4 * self._maxColumns)]
+    if data.endswith(b'\n'):
+      data = data[:-1]
+    if data.endswith(b'\r'):
+      data = data[:-1]
+    return data.decode('utf-8', errors='replace')[:self._maxColumns]
+
+  def lineAt(self, offset: int) -> int:
+    """Returns the line containing the offset"""
+    return max(bisect.bisect_right(self._offsets, offset) - 1, 0)
+
+  def visibleLineCount(self) -> int:
+    """Returns the number of lines fitting in the viewport"""
+    return max(self.viewport().height() // self._lineHeight, 1)
+
+  def firstVisibleLine(self) -> int:
+    """Returns the line at the top of the viewport"""
+    return self.verticalScrollBar().value()
+
+  def _gutterWidth(self) -> int:
+    """Returns the width of the line numbers"""
+    return (len(str(max(self.lineCount(), 1))) + 2) * self._charWidth
+
+  def _updateScrollBars(self) -> NoReturn:
+    """Sets the ranges of the scroll bars to the lines indexed"""
+    visible = self.visibleLineCount()
+    vertical = self.verticalScrollBar()
+    maximum = min(max(self.lineCount() - visible, 0), 2 ** 31 - 1)
+    vertical.setRange(0, maximum)
+    vertical.setPageStep(visible)
+    horizontal = self.horizontalScrollBar()
+    width = self._maxColumns * self._charWidth + self._gutterWidth()
+    horizontal.setRange(0, max(width - self.viewport().width(), 0))
+    horizontal.setPageStep(self.viewport().width())
+    horizontal.setSingleStep(self._charWidth)
+
+  def goToLine(self, line: int) -> NoReturn:
+    """Scrolls the line, counted from zero, to the top of the viewport"""
+    self.verticalScrollBar().setValue(line)
+
+  def scrollToEnd(self) -> NoReturn:
+    """Scrolls to the last line indexed"""
+    self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+  def search(self, query: str) -> NoReturn:
+    """Schedules a search for the query from the top of the viewport"""
+    self._query = query
+    self._match = None
+    self.viewport().update()
+    self._debounce.start()
+
+  def findNext(self) -> NoReturn:
+    """Searches for the query after the current match, or from the top of
+    the viewport if there is none"""
+    self._debounce.stop()
+    if self._findWorker is not None:
+      self._findWorker.requestInterruption()
+      self._findWorker.wait()
+      self._findWorker = None
+    if not self._query or self._data is None:
+      return
+    if self._match is None:
+      line = min(self.firstVisibleLine(), len(self._offsets) - 1)
+      start = self._offsets[line]
+    else:
+      start = self._match[0] + 1
+    query = self._query.encode('utf-8')
+    worker = _FindWorker(self._data, query, start, self._chunkSize)
+    worker.found.connect(self._found)
+    self._findWorker = worker
+    worker.start()
+
+  def _found(self, offset: int, length: int) -> NoReturn:
+    """Scrolls to the match and highlights it"""
+    if self.sender() is not self._findWorker:
+      return
+    self._findWorker.wait()
+    self._findWorker = None
+    if offset < 0:
+      return self.matchFound.emit(self._query, -1)
+    self._match = (offset, length)
+    line = self.lineAt(offset)
+    first = self.firstVisibleLine()
+    if not first <= line < first + self.visibleLineCount():
+      self.goToLine(max(line - self.visibleLineCount() // 2, 0))
+    self.viewport().update()
+    self.matchFound.emit(self._query, line)
+
+  def _matchSpan(self, line: int) -> Optional[tuple[float, float]]:
+    """Returns the horizontal position and the width of the match if it
+    is on the line"""
+    if self._match is None or self.lineAt(self._match[0]) != line:
+      return None
+    offset, length = self._match
+    start = self._lineRange(line)[0]
+    before = self._data[start:offset].decode('utf-8', errors='replace')
+    match = self._data[offset:offset + length]
+    match = match.decode('utf-8', errors='replace')
+    advance = self._metrics.horizontalAdvance
+    return advance(before), advance(match)
+
+  def paintEvent(self, event: QPaintEvent) -> NoReturn:
+    """Paints the visible lines and their numbers"""
+    painter = QPainter(self.viewport())
+    painter.setFont(self._font)
+    palette = self.palette()
+    rect = self.viewport().rect()
+    painter.fillRect(rect, palette.base())
+    gutter = self._gutterWidth()
+    painter.fillRect(0, 0, gutter, rect.height(), palette.alternateBase())
+    left = gutter + self._charWidth // 2 - self.horizontalScrollBar().value()
+    first = self.firstVisibleLine()
+    last = min(first + self.visibleLineCount() + 1, self.lineCount())
+    for index, line in enumerate(range(first, last)):
+      y = index * self._lineHeight
+      span = self._matchSpan(line)
+      if span is not None:
+        painter.fillRect(QRectF(left + span[0], y, span[1],
+                                self._lineHeight), self._matchColor)
+      painter.setClipRect(gutter, 0, rect.width() - gutter, rect.height())
+      painter.setPen(palette.text().color())
+      painter.drawText(left, y + self._ascent, self.line(line))
+      painter.setClipping(False)
+      painter.setPen(palette.placeholderText().color())
+      painter.drawText(0, y, gutter - self._charWidth, self._lineHeight,
+                       Qt.AlignmentFlag.AlignRight, str(line + 1))
+    painter.end()
+
+  def scrollContentsBy(self, dx: int, dy: int) -> NoReturn:
+    """Repaints the viewport, as the lines are painted from the scroll
+    bar values"""
+    self.viewport().update()
+
+  def resizeEvent(self, event: QResizeEvent) -> NoReturn:
+    """Updates the scroll bars to the new size of the viewport"""
+    QAbstractScrollArea.resizeEvent(self, event)
+    self._updateScrollBars()
+
+  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
+    """Jumps to the start or the end, or to a line entered by the user,
+    and finds the next match on enter"""
+    if event.matches(QKeySequence.StandardKey.MoveToStartOfDocument):
+      return self.goToLine(0)
+    if event.matches(QKeySequence.StandardKey.MoveToEndOfDocument):
+      return self.scrollToEnd()
+    if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+      return self.findNext()
+    if event.key() == Qt.Key.Key_G \
+        and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+      line, ok = QInputDialog.getInt(
+        self, 'Go to Line', 'Line', self.firstVisibleLine() + 1, 1,
+        max(min(self.lineCount(), 2 ** 31 - 1), 1))
+      if ok:
+        self.goToLine(line - 1)
+      return
+    QAbstractScrollArea.keyPressEvent(self, event)
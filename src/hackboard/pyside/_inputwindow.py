@@ -5,8 +5,6 @@ from __future__ import annotations
 
 from typing import NoReturn
 
-from PySide6.QtGui import QKeyEvent
-
 from hackboard.pyside import LayoutWindow
 
 
@@ -21,11 +19,3 @@ class InputWindow(LayoutWindow):
   def show(self) -> NoReturn:
     """LOL"""
     LayoutWindow.show(self)
-
-  def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    LayoutWindow.keyReleaseEvent(self, event)
-
-  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    LayoutWindow.keyPressEvent(self, event)
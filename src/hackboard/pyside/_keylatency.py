@@ -0,0 +1,149 @@
+"""KeyLatency measures the time from key press to paint"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import time
+from array import array
+from typing import NoReturn, Optional
+
+
+class LatencyHistogram:
+  """Histogram of durations in nanoseconds with a fixed number of
+  buckets. Each power of two is divided into eight buckets, bounding the
+  relative error of the percentiles by 12.5 percent.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('counts', 'count', 'maximum')
+
+  subBuckets = 8
+
+  def __init__(self) -> None:
+    self.counts = array('Q', bytes(8 * 64 * self.subBuckets))
+    self.count = 0
+    self.maximum = 0
+
+  @classmethod
+  def _bucket(cls, value: int) -> int:
+    """Returns the index of the bucket of the value"""
+    bits = value.bit_length()
+    if bits <= 4:
+      return value
+    return (bits - 3) * 8 + ((value >> (bits - 4)) & 7)
+
+  @classmethod
+  def _upper(cls, index: int) -> int:
+    """Returns the largest value in the bucket at the index"""
+    if index < 16:
+      return index
+    shift = index // 8 - 1
+    return (((index % 8) | 8) + 1 << shift) - 1
+
+  def add(self, value: int) -> NoReturn:
+    """Records the duration"""
+    self.counts[self._bucket(value)] += 1
+    self.count += 1
+    if value > self.maximum:
+      self.maximum = value
+
+  def percentile(self, p: float) -> int:
+    """Returns the duration below which the fraction p of the recorded
+    durations fall"""
+    if not self.count:
+      return 0
+    target, seen = max(1, round(p * self.count)), 0
+    for index, count in enumerate(self.counts):
+      seen += count
+      if seen >= target:
+        return min(self._upper(index), self.maximum)
+    return self.maximum
+
+  def clear(self) -> NoReturn:
+    """Removes the recorded durations"""
+    self.counts = array('Q', bytes(len(self.counts) * 8))
+    self.count, self.maximum = 0, 0
+
+
+class KeyLatency:
+  """KeyLatency timestamps each key press when it enters the window at
+  the event filter of its CommandRegistry, after the shortcut dispatch,
+  when DocWidget has handled it, and when the document widget has painted
+  next. The durations since entry are kept in a histogram per stage, from
+  which the percentiles are read.
+
+  The handlers only read the enabled flag while disabled. A key press not
+  followed by a paint before the next key press is not counted in the
+  paint stage.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  paintStage = 'paint'
+
+  def __init__(self) -> None:
+    self.enabled = False
+    self.pending = False
+    self._entry = 0
+    self._stages = {}
+
+  def setEnabled(self, enabled: bool) -> NoReturn:
+    """Starts or stops the measurements"""
+    self.enabled = enabled
+    self.pending = False
+
+  def toggle(self) -> bool:
+    """Toggles the measurements and returns the new state"""
+    self.setEnabled(not self.enabled)
+    return self.enabled
+
+  def begin(self) -> NoReturn:
+    """Records the entry of a key press"""
+    self._entry = time.perf_counter_ns()
+    self.pending = True
+
+  def mark(self, stage: str) -> NoReturn:
+    """Records the time since entry for the stage"""
+    if not self.pending:
+      return
+    histogram = self._stages.get(stage)
+    if histogram is None:
+      histogram = self._stages[stage] = LatencyHistogram()
+    histogram.add(time.perf_counter_ns() - self._entry)
+
+  def painted(self) -> NoReturn:
+    """Records the paint following the key press"""
+    self.mark(self.paintStage)
+    self.pending = False
+
+  def getStages(self) -> list[str]:
+    """Getter-function for the names of the stages recorded"""
+    return list(self._stages)
+
+  def getHistogram(self, stage: str) -> Optional[LatencyHistogram]:
+    """Getter-function for the histogram of the stage"""
+    return self._stages.get(stage)
+
+  def percentiles(self, stage: str) -> tuple[float, float, float]:
+    """Returns the 50th, 95th and 99th percentiles of the stage in
+    milliseconds"""
+    histogram = self._stages.get(stage)
+    if histogram is None:
+      return 0.0, 0.0, 0.0
+    return tuple(histogram.percentile(p) / 1e6 for p in (.5, .95, .99))
+
+  def report(self) -> list[str]:
+    """Returns a line with the count and percentiles of each stage"""
+    lines = []
+    for stage, histogram in self._stages.items():
+      p50, p95, p99 = self.percentiles(stage)
+      lines.append('%s: n=%d p50=%.2f p95=%.2f p99=%.2f ms' % (
+        stage, histogram.count, p50, p95, p99))
+    return lines
+
+  def clear(self) -> NoReturn:
+    """Removes the recorded measurements"""
+    self._stages = {}
+    self.pending = False
+
+
+keyLatency = KeyLatency()
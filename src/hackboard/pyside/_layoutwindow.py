@@ -3,14 +3,18 @@
 #  MIT Licence
 from __future__ import annotations
 
-from typing import NoReturn
+import os
+from typing import NoReturn, Iterator, Optional
 
-from PySide6.QtGui import QKeyEvent, QTextDocument, QTextCursor
+from PySide6.QtGui import QTextDocument, QTextCursor, QCloseEvent
 from PySide6.QtWidgets import QLabel, QLineEdit, QVBoxLayout
 from PySide6.QtWidgets import QHBoxLayout, QWidget, QPushButton
-from worktoy.core import maybe
 
 from hackboard.pyside import BaseWindow, DocWidget, CustomToolBar, LogWidget
+from hackboard.pyside import openDictionary, iterateWords, WordSpan
+from hackboard.pyside import StallWatchdog, FileViewer
+from hackboard.pyside import AutoSaver, RecoverySession, FileLoader
+from hackboard.pyside import FileSaver, DocumentTabs, DocumentPage
 
 wordStart = QTextCursor.MoveOperation.StartOfWord
 wordEnd = QTextCursor.MoveOperation.EndOfWord
@@ -24,9 +28,11 @@ class LayoutWindow(BaseWindow):
   word processing application.
 
   This class adds a vertical layout to the QMainWindow and populates it
-  with a QLabel, a QLineEdit, and a QTextEdit.
+  with a QLabel, a QLineEdit, and tabs of documents.
   The QLabel displays the current file name, the QLineEdit is used for
-  entering search terms, and the QTextEdit is used for editing text.
+  entering search terms, and each tab holds a DocWidget for editing text.
+  The file name, loader, saver and autosaver are those of the current
+  tab. Tabs left unused hibernate, see DocumentTabs.
   """
 
   def __init__(self, parent: QWidget = None) -> None:
@@ -41,7 +47,23 @@ class LayoutWindow(BaseWindow):
     self._logWidget = LogWidget()
     self._logWidget.setMaximumWidth(240)
 
-    self.documentWidget = DocWidget()
+    self._dictionary = None
+    self._statsLabel = QLabel()
+    self.statusBar().addPermanentWidget(self._statsLabel)
+    self._tabs = DocumentTabs(self)
+    self._tabs.pageAdded.connect(self._pageAdded)
+    self._tabs.pageActivated.connect(self._pageActivated)
+    self._tabs.docWidgetCreated.connect(self._docWidgetCreated)
+    self._toolBar.textChanged.connect(self.search)
+    self.search_edit.textChanged.connect(self.search)
+    self._fileViewer = FileViewer(self)
+    self._fileViewer.hide()
+    self._fileViewer.indexProgressed.connect(self._indexProgressed)
+    self._fileViewer.indexFinished.connect(self._indexFinished)
+    self._fileViewer.matchFound.connect(self._viewerMatchFound)
+    self._tabs.newPage()
+    self._watchdog = StallWatchdog(self)
+    self._watchdog.stallReported.connect(self._logWidget.tellMe)
     self.debugButton = QPushButton()
     self._centralWidget = QWidget()
 
@@ -49,40 +71,257 @@ class LayoutWindow(BaseWindow):
     """Sets up the widgets"""
     main_layout = QVBoxLayout()
     bottom_layout = QHBoxLayout()
-    bottom_layout.addWidget(self.documentWidget)
+    bottom_layout.addWidget(self._tabs)
+    bottom_layout.addWidget(self._fileViewer)
     bottom_layout.addWidget(self._logWidget)
     main_layout.addWidget(self._toolBar)
     main_layout.addLayout(bottom_layout)
     self._centralWidget.setLayout(main_layout)
     self.setCentralWidget(self._centralWidget)
 
+  def getTabs(self) -> DocumentTabs:
+    """Getter-function for the tabs of the documents"""
+    return self._tabs
+
+  def getPage(self) -> DocumentPage:
+    """Getter-function for the page of the current tab"""
+    return self._tabs.currentPage()
+
+  def getDocWidget(self) -> DocWidget:
+    """Getter-function for the document widget of the current tab"""
+    return self._tabs.currentPage().getDocWidget()
+
   def getDoc(self) -> QTextDocument:
     """Getter-function for the underlying document"""
-    return self.documentWidget.getDocument()
+    return self.getDocWidget().getDocument()
+
+  def getFileName(self) -> Optional[str]:
+    """Getter-function for the file name of the current document"""
+    return self.getPage().getFileName()
+
+  def setFileName(self, fid: Optional[str]) -> NoReturn:
+    """Setter-function for the file name of the current document"""
+    self.getPage().setFileName(fid)
+
+  def getFileLoader(self) -> FileLoader:
+    """Getter-function for the loader of the current document"""
+    return self.getPage().getFileLoader()
+
+  def getFileSaver(self) -> FileSaver:
+    """Getter-function for the saver of the current document"""
+    return self.getPage().getFileSaver()
+
+  def getAutoSaver(self) -> AutoSaver:
+    """Getter-function for the autosaver of the current document"""
+    return self.getPage().getAutoSaver()
+
+  def _pageAdded(self, page: DocumentPage) -> NoReturn:
+    """Shows the progress of the loads and saves of the page"""
+    loader = page.getFileLoader()
+    loader.progressed.connect(self._loadProgressed)
+    loader.finished.connect(self._loadFinished)
+    loader.failed.connect(self._loadFailed)
+    loader.cancelled.connect(self._loadCancelled)
+    page.saved.connect(self._saveFinished)
+    page.saveFailed.connect(self._saveFailed)
+    page.getAutoSaver().failed.connect(self._autoSaveFailed)
+
+  def _docWidgetCreated(self, docWidget: DocWidget) -> NoReturn:
+    """Connects a new document widget to the window"""
+    self.getCommands().watch(docWidget)
+    docWidget.getStats().statsChanged.connect(self.updateStats)
+    docWidget.getSearchIndex().searchFinished.connect(self._searchFinished)
+    if self._dictionary is not None:
+      docWidget.setDictionary(self._dictionary)
+
+  def _pageActivated(self, page: DocumentPage) -> NoReturn:
+    """Updates the window for the document of the current tab"""
+    self.getCommands().setEnabled('cancelLoad',
+                                  page.getFileLoader().isLoading())
+    dialog = self._replaceDialog
+    if dialog is not None and not page.isLive():
+      dialog.close()
+    elif dialog is not None and dialog.getDocument() is not self.getDoc():
+      dialog.close()
+    self.updateStats()
+
+  def _isCurrentLoader(self) -> bool:
+    """Flag indicating if the signal being handled was sent by the loader
+    of the current document"""
+    return self.sender() is self.getFileLoader()
+
+  def _loadProgressed(self, position: int, total: int) -> NoReturn:
+    """Shows the progress of the current document only"""
+    if self._isCurrentLoader():
+      BaseWindow._loadProgressed(self, position, total)
+
+  def newDocument(self) -> NoReturn:
+    """Opens an empty document in a new tab"""
+    self._showTabs()
+    self._tabs.newPage()
+
+  def closeDocument(self) -> NoReturn:
+    """Closes the current tab"""
+    if self.isViewing():
+      return self._showTabs()
+    self._tabs.closePage(self._tabs.currentIndex())
+
+  def openFiles(self, fids: list[str]) -> NoReturn:
+    """Opens the first file, and the others in tabs which are loaded when
+    first activated"""
+    if not fids:
+      return
+    self.openFile(fids[0])
+    current = self._tabs.currentIndex()
+    for fid in fids[1:]:
+      self._tabs.newPage(fid, False)
+    self._tabs.setCurrentIndex(current)
+
+  def _showTabs(self) -> NoReturn:
+    """Closes the read only viewer, if open, and shows the tabs"""
+    if self.isViewing():
+      self._fileViewer.closeFile()
+      self._fileViewer.hide()
+      self._tabs.show()
+
+  def loadFile(self, fid: str) -> NoReturn:
+    """Streams the file into the current document if it is blank, and
+    into a new tab otherwise"""
+    self._showTabs()
+    if not self.getPage().isBlank():
+      self._tabs.newPage()
+    self.getCommands().setEnabled('cancelLoad', True)
+    self.getPage().load(fid)
+
+  def _saveFinished(self, fid: str) -> NoReturn:
+    """Invoked when the file has been saved. The page of the document
+    marks it as matching the file."""
+    self.setStatus('Saved %s' % os.path.basename(fid))
+
+  def _autoSaveFailed(self, msg: str) -> NoReturn:
+    """Invoked when unsaved changes could not be written for recovery"""
+    self.setStatus('Failed to autosave changes: %s' % msg)
+
+  def recoverSession(self, session: RecoverySession,
+                     activate: bool = True) -> DocumentPage:
+    """Opens the text recovered from the session in a new tab. The
+    document keeps the file name of the session and is marked modified.
+    Unless activated, the tab is restored when first activated."""
+    self._showTabs()
+    page = self._tabs.newPage(session.getFileName(), False)
+    page.recover(session)
+    if activate:
+      self._tabs.setCurrentWidget(page)
+    self.setStatus('Recovered unsaved changes of %s' % page.getTitle())
+    return page
+
+  def viewFile(self, fid: str) -> NoReturn:
+    """Shows the file in the read only viewer in place of the tabs"""
+    self._tabs.hide()
+    self._fileViewer.show()
+    self._fileViewer.openFile(fid)
+    self._fileViewer.setFocus()
+
+  def isViewing(self) -> bool:
+    """Flag indicating if a file is shown in the read only viewer"""
+    return self._fileViewer.getFileName() is not None
+
+  def getViewer(self) -> FileViewer:
+    """Getter-function for the read only file viewer"""
+    return self._fileViewer
+
+  def search(self, query: str) -> NoReturn:
+    """Searches the viewer or the document for the query"""
+    if self.isViewing():
+      return self._fileViewer.search(query)
+    self.getDocWidget().getSearchIndex().search(query)
+
+  def _indexProgressed(self, position: int, total: int) -> NoReturn:
+    """Shows the progress of indexing the lines of the viewed file"""
+    percent = 100 * position // total if total else 100
+    self.setStatus('Indexing %s: %d%%' % (
+      os.path.basename(self._fileViewer.getFileName()), percent))
+
+  def _indexFinished(self, count: int) -> NoReturn:
+    """Shows the number of lines of the viewed file"""
+    self.setStatus('Viewing %s read-only: %d lines' % (
+      os.path.basename(self._fileViewer.getFileName()), count))
+
+  def _viewerMatchFound(self, query: str, line: int) -> NoReturn:
+    """Shows the line of the match found by the viewer"""
+    if line < 0:
+      return self.setStatus('No more matches for "%s"' % query)
+    self.setStatus('"%s" found on line %d' % (query, line + 1))
+
+  def updateStats(self) -> NoReturn:
+    """Shows the statistics of the current document in the status bar"""
+    docWidget = self.getDocWidget()
+    if docWidget is not None:
+      self._statsLabel.setText(str(docWidget.getStats()))
+
+  def _searchFinished(self, query: str, count: int) -> NoReturn:
+    """Shows the number of matches in the status bar"""
+    if query:
+      self.setStatus('%d matches for "%s"' % (count, query))
+
+  def loadDictionary(self, fid: str) -> NoReturn:
+    """Loads the spell checking dictionary from the file, shared by the
+    documents of every tab. Plain word lists are compiled to the memory
+    mapped dictionary format on first use. A dictionary which cannot be
+    read is reported in the status bar, keeping the previous one."""
+    try:
+      dictionary = openDictionary(fid)
+    except (OSError, ValueError) as e:
+      return self.setStatus('Failed to load dictionary: %s' % e)
+    previous, self._dictionary = self._dictionary, dictionary
+    for page in self._tabs.pages():
+      if page.isLive():
+        page.getDocWidget().setDictionary(self._dictionary)
+    if hasattr(previous, 'close'):
+      previous.close()
+    self.setStatus('Loaded dictionary %s' % os.path.basename(fid))
 
   def getCursor(self) -> QTextCursor:
     """Getter-function for underlying text cursor"""
-    return self.documentWidget.textCursor()
+    return self.getDocWidget().textCursor()
+
+  def __iter__(self, ) -> Iterator[WordSpan]:
+    """Implementation of iteration over the words in the document"""
+    return iterateWords(self.getDoc())
+
+  def getDocuments(self) -> list[QTextDocument]:
+    """Getter-function for the documents held by the tabs. Hibernating
+    tabs hold none."""
+    return [page.getDocWidget().getDocument()
+            for page in self._tabs.pages() if page.isLive()]
 
-  def __iter__(self, ) -> QWidget:
-    """Implementation of iteration"""
-    self.getCursor().movePosition()
-    return self
+  def getLogWidget(self) -> LogWidget:
+    """Getter-function for the log widget"""
+    return self._logWidget
+
+  def getWatchdog(self) -> StallWatchdog:
+    """Getter-function for the stall watchdog"""
+    return self._watchdog
 
   def show(self) -> NoReturn:
     """Sets up the widgets before invoking the show super call"""
     self.setupWidgets()
     BaseWindow.show(self)
+    self._watchdog.start()
+
+  def closeEvent(self, event: QCloseEvent) -> NoReturn:
+    """Stops the stall watchdog and the file viewer before closing, and
+    leaves any unsaved changes to the autosavers of the tabs. The queued
+    log messages are spooled before the spool is released."""
+    self._watchdog.stop()
+    self._fileViewer.closeFile()
+    BaseWindow.closeEvent(self, event)
+    self._tabs.dispose()
+    while self._logWidget.model.pendingCount():
+      self._logWidget.model.flush()
+    self._logWidget.spool.close()
 
   def tellMe(self, msg: str) -> NoReturn:
     """Transmits the message to the log widget"""
-    if maybe(msg):
+    if msg:
       self._logWidget.tellMe(msg)
-
-  def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    BaseWindow.keyReleaseEvent(self, event)
-
-  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    BaseWindow.keyPressEvent(self, event)
@@ -0,0 +1,127 @@
+"""LogModel is a fixed capacity list model for log messages"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import sys
+from collections import deque
+from typing import NoReturn, Any
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, \
+  QTimer, Signal
+
+from hackboard.pyside import LogSpool
+
+
+class LogModel(QAbstractListModel):
+  """LogModel keeps the most recent messages in a ring buffer of fixed
+  capacity. Messages may be enqueued from any thread, and are inserted
+  into the model by a timer on the GUI thread, one batch per frame, such
+  that views lay out once per batch rather than once per message. When
+  the capacity is exceeded the oldest rows are evicted. When a LogSpool
+  is given, every batch is also appended to it, keeping the full history
+  on disk.
+
+  A batch holds at most batchLimit messages, such that a producer
+  outpacing the timer does not stall the event loop, and the rest wait
+  for the next frame. Without a spool, only the most recent messages up
+  to the capacity are queued, as older ones would be evicted anyway.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  flushed = Signal(int)
+
+  batchLimit = 4096
+
+  def __init__(self, parent: QObject = None, capacity: int = 10000,
+               interval: int = 16, spool: LogSpool = None) -> None:
+    QAbstractListModel.__init__(self, parent)
+    self._capacity = capacity
+    self._spool = spool
+    self._buffer = [None] * capacity
+    self._head = 0
+    self._count = 0
+    self._pending = deque(maxlen=capacity if spool is None else None)
+    self._timer = QTimer(self)
+    self._timer.setInterval(interval)
+    self._timer.timeout.connect(self.flush)
+    self._timer.start()
+
+  def getCapacity(self) -> int:
+    """Getter-function for the capacity"""
+    return self._capacity
+
+  def getSpool(self) -> LogSpool:
+    """Getter-function for the spool"""
+    return self._spool
+
+  def enqueue(self, message: str) -> NoReturn:
+    """Queues the message for insertion. This method is thread safe."""
+    self._pending.append(message)
+
+  def pendingCount(self) -> int:
+    """Returns the number of queued messages not yet inserted"""
+    return len(self._pending)
+
+  def flush(self) -> NoReturn:
+    """Inserts up to batchLimit of the queued messages in a single
+    batch"""
+    n = min(len(self._pending), self.batchLimit)
+    if not n:
+      return
+    pending = self._pending
+    messages = [pending.popleft() for _ in range(n)]
+    if self._spool is not None:
+      self._spool.append(messages)
+    capacity = self._capacity
+    if n >= capacity:
+      self.beginResetModel()
+      self._buffer = messages[n - capacity:]
+      self._head, self._count = 0, capacity
+      self.endResetModel()
+      return self.flushed.emit(n)
+    overflow = self._count + n - capacity
+    if overflow > 0:
+      self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+      self._head = (self._head + overflow) % capacity
+      self._count -= overflow
+      self.endRemoveRows()
+    first = self._count
+    self.beginInsertRows(QModelIndex(), first, first + n - 1)
+    start = (self._head + first) % capacity
+    head = min(n, capacity - start)
+    self._buffer[start:start + head] = messages[:head]
+    self._buffer[:n - head] = messages[head:]
+    self._count += n
+    self.endInsertRows()
+    self.flushed.emit(n)
+
+  def memoryEstimate(self) -> int:
+    """Returns the estimated number of bytes held by the messages"""
+    items = [item for item in self._buffer if item is not None]
+    return sys.getsizeof(self._buffer) + sum(map(sys.getsizeof, items))
+
+  def message(self, row: int) -> str:
+    """Returns the message at the row"""
+    return self._buffer[(self._head + row) % self._capacity]
+
+  def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+    """Implementation of rowCount"""
+    return 0 if parent.isValid() else self._count
+
+  def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+    """Implementation of data"""
+    if role != Qt.DisplayRole or not index.isValid():
+      return None
+    row = index.row()
+    if not 0 <= row < self._count:
+      return None
+    return self._buffer[(self._head + row) % self._capacity]
+
+  def clear(self) -> NoReturn:
+    """Removes all messages"""
+    self.beginResetModel()
+    self._pending.clear()
+    self._buffer = [None] * self._capacity
+    self._head, self._count = 0, 0
+    self.endResetModel()
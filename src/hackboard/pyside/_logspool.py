@@ -0,0 +1,289 @@
+"""LogSpool keeps the log history on disk"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+from typing import NoReturn, Optional, Any
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, \
+  Signal, QStandardPaths, QLockFile
+
+
+def defaultSpoolDir() -> str:
+  """Returns the default directory of the log spool"""
+  location = QStandardPaths.StandardLocation.AppLocalDataLocation
+  return os.path.join(QStandardPaths.writableLocation(location), 'log')
+
+
+class _SpoolSegment:
+  """A data file of messages, one per line, and an index file holding the
+  end offset of each line as unsigned 64 bit integers. Both files are
+  read through memory maps, which are renewed when the files have grown.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, base: str) -> None:
+    self.dataFile = '%s.log' % base
+    self.indexFile = '%s.idx' % base
+    self._dataMap: Optional[mmap.mmap] = None
+    self._indexMap: Optional[mmap.mmap] = None
+    self._ends: Optional[memoryview] = None
+    self.count = 0
+    self.size = 0
+    self._repair()
+
+  def _repair(self) -> NoReturn:
+    """Truncates the files to the last complete line"""
+    for fid in (self.dataFile, self.indexFile):
+      if not os.path.exists(fid):
+        open(fid, 'wb').close()
+    indexSize = os.path.getsize(self.indexFile)
+    if indexSize % 8:
+      os.truncate(self.indexFile, indexSize - indexSize % 8)
+    self.count = indexSize // 8
+    if self.count:
+      ends = array('Q')
+      with open(self.indexFile, 'rb') as file:
+        file.seek(8 * (self.count - 1))
+        ends.frombytes(file.read(8))
+      self.size = ends[0]
+    if os.path.getsize(self.dataFile) != self.size:
+      os.truncate(self.dataFile, self.size)
+
+  def append(self, data: bytes, ends: array) -> NoReturn:
+    """Appends the encoded lines and their end offsets"""
+    with open(self.dataFile, 'ab') as file:
+      file.write(data)
+    with open(self.indexFile, 'ab') as file:
+      ends.tofile(file)
+    self.size += len(data)
+    self.count += len(ends)
+
+  def _remap(self) -> NoReturn:
+    """Maps the files again to cover everything appended"""
+    self.close()
+    if not self.count:
+      return
+    with open(self.dataFile, 'rb') as file:
+      self._dataMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    with open(self.indexFile, 'rb') as file:
+      self._indexMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    self._ends = memoryview(self._indexMap).cast('Q')
+
+  def line(self, row: int) -> str:
+    """Returns the line at the row"""
+    if self._ends is None or row >= len(self._ends):
+      self._remap()
+    start = self._ends[row - 1] if row else 0
+    data = self._dataMap[start:self._ends[row] - 1]
+    return data.decode('utf-8', errors='replace')
+
+  def close(self) -> NoReturn:
+    """Releases the memory maps"""
+    if self._ends is not None:
+      self._ends.release()
+      self._ends = None
+    for item in (self._dataMap, self._indexMap):
+      if item is not None:
+        item.close()
+    self._dataMap, self._indexMap = None, None
+
+  def remove(self) -> NoReturn:
+    """Deletes the files of the segment"""
+    self.close()
+    for fid in (self.dataFile, self.indexFile):
+      if os.path.exists(fid):
+        os.remove(fid)
+
+
+class LogSpool(QObject):
+  """LogSpool appends every log message to rotating segment files on
+  disk. Each segment consists of an append only data file and an index of
+  line offsets. Opening the spool only reads the sizes of the index files,
+  and lines are read through memory maps on demand, so the memory used
+  does not depend on the length of the history. When a segment exceeds
+  the configured size a new segment is started, and the oldest segments
+  beyond the configured number are deleted.
+
+  The directory is held by a lock file, as the segments are appended
+  without coordination. An instance finding the directory held by another
+  running instance, or unable to create it, spools to a temporary
+  directory instead, which is removed by close.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  appended = Signal(int)
+  rotated = Signal()
+
+  def __init__(self, directory: str = None, segmentSize: int = 67108864,
+               maxSegments: int = 16, parent: QObject = None) -> None:
+    QObject.__init__(self, parent)
+    self._directory = defaultSpoolDir() if directory is None else directory
+    self._segmentSize = segmentSize
+    self._maxSegments = maxSegments
+    self._lock: Optional[QLockFile] = None
+    self._closed = False
+    if not self._lockDirectory():
+      self._directory = tempfile.mkdtemp(prefix='hackboard-log-')
+    names = sorted(name[:-4] for name in os.listdir(self._directory)
+                   if name.endswith('.idx') and name[:-4].isdigit())
+    self._segments = [_SpoolSegment(os.path.join(self._directory, name))
+                      for name in names]
+    self._serial = int(names[-1]) if names else 0
+    if not self._segments:
+      self._newSegment()
+
+  def _lockDirectory(self) -> bool:
+    """Creates and locks the directory, and returns False if either is
+    not possible"""
+    try:
+      os.makedirs(self._directory, exist_ok=True)
+    except OSError:
+      return False
+    lock = QLockFile(os.path.join(self._directory, 'lock'))
+    lock.setStaleLockTime(0)
+    if not lock.tryLock(0):
+      return False
+    self._lock = lock
+    return True
+
+  def getDirectory(self) -> str:
+    """Getter-function for the spool directory"""
+    return self._directory
+
+  def isTemporary(self) -> bool:
+    """Flag indicating if the spool is kept in a temporary directory for
+    this instance only"""
+    return self._lock is None
+
+  def _newSegment(self) -> NoReturn:
+    """Starts a new segment and deletes the oldest beyond the limit"""
+    self._serial += 1
+    base = os.path.join(self._directory, '%08d' % self._serial)
+    self._segments.append(_SpoolSegment(base))
+    while len(self._segments) > self._maxSegments:
+      self._segments.pop(0).remove()
+
+  def count(self) -> int:
+    """Returns the number of lines in the spool"""
+    return sum(segment.count for segment in self._segments)
+
+  def append(self, messages: list[str]) -> NoReturn:
+    """Appends the messages to the spool. Messages appended after close
+    are dropped."""
+    if not messages or self._closed:
+      return
+    segment = self._segments[-1]
+    if segment.size >= self._segmentSize:
+      self._newSegment()
+      segment = self._segments[-1]
+      self.rotated.emit()
+    data, ends, offset = bytearray(), array('Q'), segment.size
+    for message in messages:
+      data += message.replace('\n', ' ').encode('utf-8')
+      data += b'\n'
+      ends.append(offset + len(data))
+    segment.append(bytes(data), ends)
+    self.appended.emit(len(messages))
+
+  def line(self, row: int) -> str:
+    """Returns the line at the row counted from the oldest line kept"""
+    for segment in self._segments:
+      if row < segment.count:
+        return segment.line(row)
+      row -= segment.count
+    raise IndexError(row)
+
+  def close(self) -> NoReturn:
+    """Releases the memory maps and the directory. A temporary directory
+    is removed."""
+    self._closed = True
+    for segment in self._segments:
+      segment.close()
+    if self._lock is not None:
+      self._lock.unlock()
+    elif os.path.isdir(self._directory):
+      shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class LogHistoryModel(QAbstractListModel):
+  """LogHistoryModel presents the lines of a LogSpool, starting from the
+  newest page. Older lines are inserted above a page at a time by
+  fetchOlder, as the view is scrolled to the top, and lines appended to
+  the spool since are made available through canFetchMore and fetchMore.
+  Lines are read from the spool only when displayed, and a small cache
+  holds the most recently displayed lines.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, spool: LogSpool, parent: QObject = None,
+               pageSize: int = 1000, cacheSize: int = 1024) -> None:
+    QAbstractListModel.__init__(self, parent)
+    self._spool = spool
+    self._pageSize = pageSize
+    self._cacheSize = cacheSize
+    self._cache = {}
+    self._end = spool.count()
+    self._first = max(self._end - pageSize, 0)
+    spool.rotated.connect(self.reset)
+
+  def reset(self) -> NoReturn:
+    """Resets the model to the newest page of the spool"""
+    self.beginResetModel()
+    self._cache = {}
+    self._end = self._spool.count()
+    self._first = max(self._end - self._pageSize, 0)
+    self.endResetModel()
+
+  def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+    """Implementation of rowCount"""
+    return 0 if parent.isValid() else self._end - self._first
+
+  def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+    """Implementation of canFetchMore"""
+    return not parent.isValid() and self._end < self._spool.count()
+
+  def fetchMore(self, parent: QModelIndex = QModelIndex()) -> NoReturn:
+    """Implementation of fetchMore"""
+    if parent.isValid():
+      return
+    n = min(self._pageSize, self._spool.count() - self._end)
+    if n <= 0:
+      return
+    rows = self._end - self._first
+    self.beginInsertRows(QModelIndex(), rows, rows + n - 1)
+    self._end += n
+    self.endInsertRows()
+
+  def canFetchOlder(self) -> bool:
+    """Flag indicating if older lines of the spool are not yet shown"""
+    return self._first > 0
+
+  def fetchOlder(self) -> int:
+    """Inserts the page of lines before the first row, and returns the
+    number of rows inserted"""
+    n = min(self._pageSize, self._first)
+    if n > 0:
+      self.beginInsertRows(QModelIndex(), 0, n - 1)
+      self._first -= n
+      self.endInsertRows()
+    return n
+
+  def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+    """Implementation of data"""
+    if role != Qt.DisplayRole or not index.isValid():
+      return None
+    line = self._first + index.row()
+    text = self._cache.get(line)
+    if text is None:
+      if not self._first <= line < self._end:
+        return None
+      if len(self._cache) >= self._cacheSize:
+        self._cache.clear()
+      text = self._cache[line] = self._spool.line(line)
+    return text
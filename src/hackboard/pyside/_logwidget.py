@@ -7,57 +7,108 @@ from typing import NoReturn
 
 #  Copyright (c) 2023 Asger Jon Vistisen
 #  MIT Licence
-from PySide6.QtCore import Slot, QStringListModel, Qt, Signal
-from PySide6.QtGui import QKeyEvent, QFont
-from PySide6.QtWidgets import QListView, QVBoxLayout, QWidget
+from PySide6.QtCore import Slot, Qt, Signal, QAbstractItemModel
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QListView, QVBoxLayout, QWidget, QCheckBox
 
-from hackboard.pyside.style import FontStyle
+from hackboard.pyside import LogModel, LogSpool, LogHistoryModel
+from hackboard.pyside.style import FontStyle, FontRegistry
 
 
 class LogWidget(QWidget):
-  """LogWidget"""
+  """LogWidget shows log messages in a list view backed by a LogModel.
+  Messages are inserted in batches once per frame, and only the most
+  recent messages up to the capacity of the model are kept in memory.
+  Every message is also appended to a LogSpool on disk, and checking the
+  history box shows the complete history, starting from the newest lines
+  and paged in from the spool as the view is scrolled up."""
   logUpdated = Signal()
   messageHighlighted = Signal(str)
   scrolled = Signal()
 
   signalTextTransmit = Signal(str)
   textChanged = Signal(str)
-  _font = QFont()
-  _font.setFamily('Consolas')
-  _font.setPointSize(16)
+  _font = FontRegistry.getFont('Consolas', 16)
 
   @classmethod
   def getFont(cls) -> QFont:
     """Getter-function for _font"""
     return cls._font
 
-  def __init__(self, parent: QWidget = None):
-    self._parent = parent
+  def __init__(self, parent: QWidget = None, capacity: int = 10000,
+               spoolDir: str = None) -> None:
     super().__init__()
-    self.setFont(FontStyle.getNormalFont())
+    FontStyle @ self
     self.layout = QVBoxLayout()
     self.list_view = QListView()
     self.list_view.setFont(self.getFont())
-    self.model = QStringListModel()
-    self.list_view.setModel(self.model)
+    self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+    self.spool = LogSpool(spoolDir, parent=self)
+    self.model = LogModel(self, capacity, spool=self.spool)
+    self.model.rowsAboutToBeInserted.connect(self._rowsAboutToBeInserted)
+    self.model.flushed.connect(self._flushed)
+    self.historyModel = LogHistoryModel(self.spool, self)
+    self.historyBox = QCheckBox('History')
+    self.historyBox.toggled.connect(self.showHistory)
+    self._followTail = True
     self.list_view.setWordWrap(True)
     self.list_view.setTextElideMode(Qt.ElideNone)
     self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-    self.list_view.selectionModel().selectionChanged.connect(
-      self.highlighted)
-    self.list_view.verticalScrollBar().valueChanged.connect(self.scrolled)
+    self.list_view.verticalScrollBar().valueChanged.connect(
+      self._scrollChanged)
+    self._setModel(self.model)
+    self.layout.addWidget(self.historyBox)
     self.layout.addWidget(self.list_view)
     self.setLayout(self.layout)
 
+  def _setModel(self, model: QAbstractItemModel) -> NoReturn:
+    """Shows the model in the list view. The view creates a new selection
+    model for each model, so the selection is connected again."""
+    selectionModel = self.list_view.selectionModel()
+    if selectionModel is not None:
+      selectionModel.selectionChanged.disconnect(self.highlighted)
+      selectionModel.deleteLater()
+    self.list_view.setModel(model)
+    self.list_view.selectionModel().selectionChanged.connect(
+      self.highlighted)
+
+  @Slot(bool)
+  def showHistory(self, history: bool = True) -> NoReturn:
+    """Shows the complete history from the spool, or only the recent
+    messages held in memory. The history rows have uniform heights, such
+    that the view does not measure every fetched row, and are laid out in
+    a single pass, such that the view opens at the newest row."""
+    if history:
+      self.historyModel.reset()
+    self.list_view.setUniformItemSizes(history)
+    self.list_view.setLayoutMode(QListView.LayoutMode.SinglePass if history
+                                 else QListView.LayoutMode.Batched)
+    self.list_view.setWordWrap(not history)
+    self._setModel(self.historyModel if history else self.model)
+    if history:
+      self.list_view.doItemsLayout()
+      self.list_view.scrollToBottom()
+    if self.historyBox.isChecked() != history:
+      self.historyBox.setChecked(history)
+
   @Slot(str)
   def tellMe(self, message: str) -> NoReturn:
-    """LOL"""
+    """Queues the message for the log. This method may be invoked from any
+    thread."""
     if not message:
       return
-    row_count = self.model.rowCount()
-    self.model.insertRow(row_count)
-    index = self.model.index(row_count)
-    self.model.setData(index, message)
+    self.model.enqueue(message)
+
+  def _rowsAboutToBeInserted(self, *_) -> NoReturn:
+    """Records if the view is scrolled to the bottom"""
+    scrollBar = self.list_view.verticalScrollBar()
+    self._followTail = scrollBar.value() >= scrollBar.maximum()
+
+  def _flushed(self, count: int) -> NoReturn:
+    """Keeps the view at the bottom if it was there before the insertion
+    and notifies once per batch"""
+    if self._followTail and self.list_view.model() is self.model:
+      self.list_view.scrollToBottom()
     self.logUpdated.emit()
 
   @Slot()
@@ -68,17 +119,14 @@ class LogWidget(QWidget):
       self.messageHighlighted.emit(selected_message)
 
   @Slot()
-  def scrolled(self):
+  def _scrollChanged(self):
+    """Pages in older history when the view is scrolled to the top,
+    keeping the row at the top in place"""
+    model, scrollBar = self.historyModel, self.list_view.verticalScrollBar()
+    if self.list_view.model() is model and model.canFetchOlder() \
+        and scrollBar.value() == scrollBar.minimum():
+      rows = model.fetchOlder()
+      self.list_view.doItemsLayout()
+      self.list_view.scrollTo(model.index(rows, 0),
+                              QListView.ScrollHint.PositionAtTop)
     self.scrolled.emit()
-
-  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Transmits certain events to the parent"""
-    key = event.key()
-    if Qt.Key.Key_F1 <= key <= Qt.Key.Key_F35 and self._parent is not None:
-      self._parent.keyPressEvent(event)
-
-  def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Transmits certain events to the parent"""
-    key = event.key()
-    if Qt.Key.Key_F1 <= key <= Qt.Key.Key_F35 and self._parent is not None:
-      self._parent.keyReleaseEvent(event)
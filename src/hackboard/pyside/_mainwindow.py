@@ -3,14 +3,17 @@
 #  MIT Licence
 from __future__ import annotations
 
-from typing import NoReturn
+import os
+import threading
+import time
+from typing import NoReturn, Iterator, Optional
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QKeyEvent, QTextCursor
-from loremify import lorem
-from worktoy.typetools import Any
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QMessageBox
 
-from hackboard.pyside import InputWindow
+from hackboard.pyside import InputWindow, iterateWords, WordSpan, keyLatency
+from hackboard.pyside import AutoSaver
 
 
 class MainWindow(InputWindow):
@@ -23,37 +26,114 @@ class MainWindow(InputWindow):
     self.setMinimumWidth(640)
     self.setMinimumHeight(480)
     self._toolBar.signalTextTransmit.connect(self._logWidget.tellMe)
-    self._cursor = QTextCursor(self.documentWidget.document())
+    self._cursor = QTextCursor(self.getDoc())
+    self._debugData = None
 
   def getCursor(self) -> QTextCursor:
     """Getter-function for QTextCursor"""
-    return QTextCursor(self.documentWidget.document())
+    return QTextCursor(self.getDoc())
 
   def debugFunc01(self) -> NoReturn:
     """Inserts lorem ipsum to the document widget"""
+    from loremify import lorem
     print('debugFunc01')
     self.tellMe('DebugFunc01')
-    self.documentWidget.insertPlainText(lorem())
+    self.getDocWidget().insertPlainText(lorem())
 
   def debugFunc02(self) -> NoReturn:
-    """Debugger"""
+    """Logs the document statistics"""
     print('debugFunc02')
-    self._logWidget.tellMe('block count: %s' % self._cursor)
+    stats = self.getDocWidget().getStats()
+    self._logWidget.tellMe('block count: %d' % stats.getBlockCount())
+    self._logWidget.tellMe('word count: %d' % stats.getWordCount())
 
-  def iterateWords(self) -> Any:
-    """"""
+  def debugFunc03(self, duration: float = 2.0) -> NoReturn:
+    """Floods the log widget from a worker thread and logs the sustained
+    message rate together with the longest stall of the event loop"""
+    print('debugFunc03')
+    state = {'count': 0, 'stall': 0.0, 'last': time.perf_counter()}
+
+    def flood() -> NoReturn:
+      """Sends messages to the log for the duration"""
+      count, end = 0, time.perf_counter() + duration
+      while time.perf_counter() < end:
+        self._logWidget.tellMe('Flood message %d' % count)
+        count += 1
+      state['count'] = count
+
+    def tick() -> NoReturn:
+      """Measures the time since the previous tick"""
+      now = time.perf_counter()
+      state['stall'] = max(state['stall'], now - state['last'])
+      state['last'] = now
+      if not thread.is_alive():
+        timer.stop()
+        rate = state['count'] / duration
+        self.tellMe('Log throughput: %d messages/s' % rate)
+        self.tellMe('Longest stall: %d ms' % (1000 * state['stall']))
+
+    thread = threading.Thread(target=flood, daemon=True)
+    timer = QTimer(self)
+    timer.setInterval(5)
+    timer.timeout.connect(tick)
+    timer.start()
+    thread.start()
+
+  def debugFunc04(self) -> NoReturn:
+    """Toggles the keystroke latency measurements. When toggled off, the
+    percentiles of each stage are logged."""
+    print('debugFunc04')
+    if keyLatency.toggle():
+      keyLatency.clear()
+      return self.tellMe('Key latency: measuring')
+    self.tellMe('Key latency: stopped')
+    for line in keyLatency.report():
+      self.tellMe(line)
+
+  def debugFunc05(self) -> NoReturn:
+    """Shows or hides the memory accounting panel"""
+    print('debugFunc05')
+    if self._debugData is None:
+      from hackboard.pyside import DebugData
+      self._debugData = DebugData(self)
+      self._debugData.setWindowFlag(Qt.WindowType.Tool)
+      self._debugData.setWindowTitle('Memory')
+    self._debugData.setVisible(not self._debugData.isVisible())
+
+  def iterateWords(self, start: int = 0,
+                   end: Optional[int] = None) -> Iterator[WordSpan]:
+    """Iterates over the words in the document between the positions start
+    and end"""
+    return iterateWords(self.getDoc(), start, end)
 
   def show(self) -> NoReturn:
-    """Reimplementation"""
+    """Reimplementation. Recovery of unsaved changes left by a previous
+    run is offered once the event loop runs."""
     InputWindow.show(self)
     self.setWindowTitle('HackBoard')
+    QTimer.singleShot(0, self.offerRecovery)
 
-  def keyReleaseEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    InputWindow.keyReleaseEvent(self, event)
-    # if event.key() == Qt.Key.Key_Space:
-    #   self.spaceKeyRelease.emit()
-
-  def keyPressEvent(self, event: QKeyEvent) -> NoReturn:
-    """Triggers spell checking"""
-    InputWindow.keyPressEvent(self, event)
+  def offerRecovery(self) -> NoReturn:
+    """Offers to recover the sessions left with unsaved changes. Each is
+    recovered in a tab, of which only the most recent is restored at once.
+    Declined sessions are removed."""
+    sessions = AutoSaver.findSessions()
+    if not sessions:
+      return
+    names = ', '.join(
+      os.path.basename(session.getFileName() or '') or 'untitled'
+      for session in sessions)
+    when = time.strftime('%Y-%m-%d %H:%M',
+                         time.localtime(sessions[0].getModified()))
+    answer = QMessageBox.question(
+      self, 'Recover unsaved changes',
+      'HackBoard has unsaved changes to %s from %s. Recover them?' % (
+        names, when))
+    if answer != QMessageBox.StandardButton.Yes:
+      for session in sessions:
+        session.discard()
+      return
+    first = self.recoverSession(sessions[0])
+    for session in sessions[1:]:
+      self.recoverSession(session, False)
+    self.getTabs().setCurrentWidget(first)
@@ -0,0 +1,237 @@
+"""MarkdownHighlighter highlights Markdown incrementally"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import re
+import time
+from typing import NoReturn, Any, Optional
+
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QTextCharFormat, QTextCursor, QTextDocument
+
+from hackboard.pyside import SpellChecker
+from hackboard.pyside.style import FontStyle
+
+TEXT, BACKTICKS, TILDES, LIST = 0, 1, 2, 3
+
+_fencePattern = re.compile(r' {0,3}(`{3,}(?=[^`]*$)|~{3,})')
+_listPattern = re.compile(r'( {0,3})([-*+]|\d{1,9}[.)])(?: +|$)')
+_headingPattern = re.compile(r' {0,3}(#{1,6})(?: |$)')
+_rulePattern = re.compile(r' {0,3}([-*_])(?: *\1){2,} *$')
+_quotePattern = re.compile(r' {0,3}>')
+_indentPattern = re.compile(r'(?: {4}|\t)')
+
+_inlineRules = [
+  (re.compile(r'!?\[[^\]\n]*\]\([^)\s]*(?: "[^"]*")?\)'), 'link'),
+  (re.compile(r'<(?:https?|mailto):[^>\s]+>'), 'link'),
+  (re.compile(r'(?<![*\w])\*(?![*\s])[^*]*?(?<![*\s])\*(?![*\w])'),
+   'emphasis'),
+  (re.compile(r'(?<!\w)_(?![_\s])[^_]*?(?<![_\s])_(?!\w)'), 'emphasis'),
+  (re.compile(r'\*\*(?!\s)[^*]+?(?<!\s)\*\*'), 'strong'),
+  (re.compile(r'(?<!\w)__(?!\s)[^_]+?(?<!\s)__(?!\w)'), 'strong'),
+  (re.compile(r'(`+)(?!`).+?(?<!`)\1(?!`)'), 'code'),
+]
+
+
+def _kind(state: int) -> int:
+  """Returns the context carried by the block state"""
+  return TEXT if state < 0 else state & 15
+
+
+def _width(state: int) -> int:
+  """Returns the fence length or list indentation of the block state"""
+  return 0 if state < 0 else state >> 4
+
+
+def blockState(text: str, previous: int) -> int:
+  """Returns the state carried from the line to the next, given the state
+  carried to the line. The state holds the context in its low four bits:
+  TEXT, a fenced code block opened by BACKTICKS or TILDES, or a LIST item.
+  The higher bits hold the length of the opening fence, or the
+  indentation of the content of the list item."""
+  kind, width = _kind(previous), _width(previous)
+  fence = _fencePattern.match(text)
+  if kind in (BACKTICKS, TILDES):
+    if fence is not None and fence.group(1)[0] == '`~'[kind - 1] \
+        and len(fence.group(1)) >= width and not text[fence.end():].strip():
+      return TEXT
+    return previous
+  if fence is not None:
+    marker = fence.group(1)
+    return (BACKTICKS if marker[0] == '`' else TILDES) | len(marker) << 4
+  item = _listPattern.match(text)
+  if item is not None and _rulePattern.match(text) is None:
+    return LIST | item.end() << 4
+  if kind == LIST:
+    indent = len(text) - len(text.lstrip(' '))
+    if not text.strip() or indent >= width:
+      return previous
+  return TEXT
+
+
+class MarkdownHighlighter(SpellChecker):
+  """MarkdownHighlighter formats the Markdown of the document and
+  underlines misspelled words, as a document is highlighted by one
+  highlighter only. The block structure is recognised by a table of
+  precompiled patterns, and inline spans by another. The formats are the
+  shared formats of FontStyle.
+
+  Context spanning lines, a fenced code block or a list item, is carried
+  from block to block in the block state, see blockState. Qt highlights
+  the blocks changed by an edit, and continues with the following blocks
+  only while the state carried into them changes. Typing therefore
+  rehighlights one block, while opening a fence rehighlights the blocks
+  down to where the carried state agrees again.
+
+  Highlighting is limited to sliceBudget seconds per event loop
+  iteration. Blocks reached after the budget, such as those of a large
+  file being loaded, only have their state computed, which takes a single
+  pattern match, and are highlighted by a timer in slices of the same
+  budget. The window thereby stays interactive while a long document is
+  highlighted.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  sliceBudget = 0.008
+
+  def __init__(self, document: QTextDocument, dictionary: Any = None,
+               cacheSize: int = 65536) -> None:
+    self._passStart = None
+    self._forced = False
+    self._deferred: Optional[QTextCursor] = None
+    self._deferredCount = 0
+    self._pending: list[QTextCursor] = []
+    SpellChecker.__init__(self, document, dictionary, cacheSize)
+    self._passTimer = QTimer(self)
+    self._passTimer.setSingleShot(True)
+    self._passTimer.setInterval(0)
+    self._passTimer.timeout.connect(self._endPass)
+    self._sliceTimer = QTimer(self)
+    self._sliceTimer.setInterval(0)
+    self._sliceTimer.timeout.connect(self._highlightSlice)
+
+  def isPending(self) -> bool:
+    """Flag indicating if blocks are waiting to be highlighted"""
+    return bool(self._pending)
+
+  def _endPass(self) -> NoReturn:
+    """Ends the time budget of the event loop iteration, and adds the
+    blocks deferred in it to those waiting to be highlighted"""
+    self._passStart = None
+    if self._deferred is None:
+      return
+    document = self.document()
+    first = document.findBlock(self._deferred.position())
+    last = document.findBlockByNumber(
+      first.blockNumber() + self._deferredCount - 1)
+    if not last.isValid():
+      last = document.lastBlock()
+    self._deferred, self._deferredCount = None, 0
+    self._defer(first.position(), last.position() + last.length() - 1)
+
+  def _overBudget(self) -> bool:
+    """Flag indicating if the highlighting in this event loop iteration
+    has used its budget"""
+    if self._forced:
+      return False
+    now = time.perf_counter()
+    if self._passStart is None:
+      self._passStart = now
+      self._passTimer.start()
+      return False
+    return now - self._passStart > self.sliceBudget
+
+  def _defer(self, start: int, end: int) -> NoReturn:
+    """Adds the blocks between the positions to those waiting to be
+    highlighted"""
+    if self._pending:
+      cursor = self._pending[-1]
+      if cursor.selectionStart() <= start <= cursor.selectionEnd() + 1:
+        if end > cursor.selectionEnd():
+          cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        return
+    cursor = QTextCursor(self.document())
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    self._pending.append(cursor)
+    self._sliceTimer.start()
+
+  def _highlightSlice(self) -> NoReturn:
+    """Highlights waiting blocks for at most the budget"""
+    document = self.document()
+    stop = time.perf_counter() + self.sliceBudget
+    self._forced = True
+    try:
+      while self._pending and time.perf_counter() < stop:
+        cursor = self._pending[0]
+        end = cursor.selectionEnd()
+        block = document.findBlock(cursor.selectionStart())
+        while block.isValid() and block.position() <= end \
+            and time.perf_counter() < stop:
+          self.rehighlightBlock(block)
+          block = block.next()
+        if not block.isValid() or block.position() > end:
+          self._pending.pop(0)
+        else:
+          cursor.setPosition(end)
+          cursor.setPosition(block.position(),
+                             QTextCursor.MoveMode.KeepAnchor)
+    finally:
+      self._forced = False
+    if not self._pending:
+      self._sliceTimer.stop()
+
+  def highlightBlock(self, text: str) -> NoReturn:
+    """Highlights the Markdown of the current block and carries its state
+    to the next"""
+    previous = self.previousBlockState()
+    state = blockState(text, previous)
+    self.setCurrentBlockState(state)
+    if self._overBudget():
+      if self._deferred is None:
+        self._deferred = QTextCursor(self.currentBlock())
+      self._deferredCount += 1
+      return
+    kind = _kind(previous)
+    if kind in (BACKTICKS, TILDES):
+      return self.setFormat(0, len(text), FontStyle.getCharFormat('code'))
+    if _kind(state) in (BACKTICKS, TILDES):
+      return self.setFormat(0, len(text), FontStyle.getCharFormat('fence'))
+    if kind != LIST and _kind(state) != LIST \
+        and _indentPattern.match(text) is not None:
+      return self.setFormat(0, len(text), FontStyle.getCharFormat('code'))
+    if _rulePattern.match(text) is not None:
+      return self.setFormat(0, len(text), FontStyle.getCharFormat('rule'))
+    heading = _headingPattern.match(text)
+    if heading is not None:
+      role = 'heading%d' % len(heading.group(1))
+      self.setFormat(0, len(text), FontStyle.getCharFormat(role))
+    else:
+      if _quotePattern.match(text) is not None:
+        self.setFormat(0, len(text), FontStyle.getCharFormat('quote'))
+      item = _listPattern.match(text)
+      if item is not None:
+        self.setFormat(item.start(2), len(item.group(2)),
+                       FontStyle.getCharFormat('listMarker'))
+      for pattern, role in _inlineRules:
+        charFormat = FontStyle.getCharFormat(role)
+        for match in pattern.finditer(text):
+          self.setFormat(match.start(), match.end() - match.start(),
+                         charFormat)
+    SpellChecker.highlightBlock(self, text)
+
+  def underline(self, start: int, length: int) -> NoReturn:
+    """Underlines the misspelled word on top of the Markdown formats. Words
+    in code spans are not underlined."""
+    code, end = FontStyle.getCharFormat('code'), start + length
+    while start < end:
+      charFormat = self.format(start)
+      stop = start + 1
+      while stop < end and self.format(stop) == charFormat:
+        stop += 1
+      if charFormat != code:
+        merged = QTextCharFormat(charFormat)
+        merged.merge(self.getUnderlineFormat())
+        self.setFormat(start, stop - start, merged)
+      start = stop
@@ -0,0 +1,107 @@
+"""ReplaceDialog provides find and replace all"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from typing import NoReturn
+
+from PySide6.QtGui import QTextDocument
+from PySide6.QtWidgets import QDialog, QLineEdit, QCheckBox, QLabel, \
+  QListWidget, QPushButton, QFormLayout, QHBoxLayout, QVBoxLayout, QWidget
+
+from hackboard.pyside import Replacer
+
+
+class ReplaceDialog(QDialog):
+  """ReplaceDialog lets the user preview the matches of a pattern, with
+  the match count and the first matches, before replacing all of them.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, document: QTextDocument, widget: QWidget = None,
+               parent: QWidget = None) -> None:
+    QDialog.__init__(self, parent)
+    self.setWindowTitle('Replace All')
+    self._document = document
+    self._replacer = Replacer(document, widget)
+    self._replacer.previewReady.connect(self._showPreview)
+    self._replacer.applied.connect(self._showApplied)
+    self._replacer.failed.connect(self._showFailure)
+    self._applyWhenReady = False
+    self.findEdit = QLineEdit()
+    self.replaceEdit = QLineEdit()
+    self.regexBox = QCheckBox('Regular expression')
+    self.caseBox = QCheckBox('Match case')
+    self.caseBox.setChecked(True)
+    self.countLabel = QLabel()
+    self.hitList = QListWidget()
+    self.previewButton = QPushButton('Preview')
+    self.replaceButton = QPushButton('Replace All')
+    self.closeButton = QPushButton('Close')
+    form = QFormLayout()
+    form.addRow('Find', self.findEdit)
+    form.addRow('Replace', self.replaceEdit)
+    form.addRow(self.regexBox, self.caseBox)
+    buttons = QHBoxLayout()
+    buttons.addWidget(self.previewButton)
+    buttons.addWidget(self.replaceButton)
+    buttons.addWidget(self.closeButton)
+    layout = QVBoxLayout()
+    layout.addLayout(form)
+    layout.addWidget(self.countLabel)
+    layout.addWidget(self.hitList)
+    layout.addLayout(buttons)
+    self.setLayout(layout)
+    self.previewButton.clicked.connect(self.preview)
+    self.replaceButton.clicked.connect(self.replaceAll)
+    self.closeButton.clicked.connect(self.close)
+    for edit in (self.findEdit, self.replaceEdit):
+      edit.textEdited.connect(self._invalidate)
+    for box in (self.regexBox, self.caseBox):
+      box.toggled.connect(self._invalidate)
+
+  def getDocument(self) -> QTextDocument:
+    """Getter-function for the document"""
+    return self._document
+
+  def _invalidate(self, *_) -> NoReturn:
+    """Discards the preview when the parameters change"""
+    self._replacer.cancel()
+    self._applyWhenReady = False
+    self.countLabel.clear()
+    self.hitList.clear()
+
+  def preview(self) -> NoReturn:
+    """Finds the matches and shows the count and the first matches"""
+    self._invalidate()
+    self.countLabel.setText('Searching...')
+    self._replacer.find(self.findEdit.text(), self.replaceEdit.text(),
+                        self.regexBox.isChecked(), self.caseBox.isChecked())
+
+  def replaceAll(self) -> NoReturn:
+    """Replaces all matches, finding them first if necessary"""
+    if self._replacer.isReady():
+      self._replacer.apply()
+      return
+    self.preview()
+    self._applyWhenReady = True
+
+  def _showPreview(self, count: int, hits: list) -> NoReturn:
+    """Shows the match count and the first matches"""
+    self.countLabel.setText('%d matches' % count)
+    self.hitList.clear()
+    for position, _, text, replacement in hits:
+      self.hitList.addItem('%d: %s → %s' % (position, text, replacement))
+    if self._applyWhenReady:
+      self._applyWhenReady = False
+      self._replacer.apply()
+
+  def _showApplied(self, count: int) -> NoReturn:
+    """Shows the number of replacements made"""
+    self.countLabel.setText('Replaced %d matches' % count)
+    self.hitList.clear()
+
+  def _showFailure(self, msg: str) -> NoReturn:
+    """Shows the error"""
+    self._applyWhenReady = False
+    self.countLabel.setText(msg)
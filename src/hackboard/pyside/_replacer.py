@@ -0,0 +1,169 @@
+"""Replacer performs bulk find and replace on a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import re
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtGui import QTextCursor, QTextDocument
+from PySide6.QtWidgets import QWidget
+
+_astralPattern = re.compile('[\U00010000-\U0010FFFF]')
+
+
+class _MatchWorker(QThread):
+  """Finds every match in the snapshot and expands the replacement of
+  each. Positions are converted to the UTF-16 positions used by Qt when
+  the text contains characters outside the basic multilingual plane.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, text: str, pattern: re.Pattern, replacement: str,
+               expand: bool) -> None:
+    QThread.__init__(self)
+    self._text = text
+    self._pattern = pattern
+    self._replacement = replacement
+    self._expand = expand
+    self.matches = []
+    self.error = None
+
+  def run(self) -> NoReturn:
+    """Collects the matches as positions, lengths and replacements"""
+    text, matches = self._text, self.matches
+    astral = _astralPattern.search(text) is not None
+    previous, shift = 0, 0
+    try:
+      for count, match in enumerate(self._pattern.finditer(text)):
+        if not count % 1024 and self.isInterruptionRequested():
+          return
+        start, end = match.span()
+        if astral:
+          shift += len(_astralPattern.findall(text, previous, start))
+          inner = len(_astralPattern.findall(text, start, end))
+          previous = end
+          start, end = start + shift, end + shift + inner
+          shift += inner
+        if self._expand:
+          replacement = match.expand(self._replacement)
+        else:
+          replacement = self._replacement
+        matches.append((start, end - start, match.group(), replacement))
+    except (re.error, IndexError) as e:
+      self.error = e
+    self._text = None
+
+
+class Replacer(QObject):
+  """Replacer finds all matches of a pattern on a worker thread, working
+  on a snapshot of the text, such that the GUI thread is not blocked while
+  matching. The matches are announced by previewReady with the total count
+  and the first of the matches, and are only applied to the document when
+  apply is invoked.
+
+  The replacements are applied in reverse order inside a single edit
+  block, making the whole replacement a single undo step and letting the
+  document layout update once. Updates of the widget are suspended while
+  applying.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  previewReady = Signal(int, list)
+  applied = Signal(int)
+  failed = Signal(str)
+
+  def __init__(self, document: QTextDocument, widget: QWidget = None,
+               previewSize: int = 100) -> None:
+    QObject.__init__(self, document)
+    self._document = document
+    self._widget = widget
+    self._previewSize = previewSize
+    self._worker: Optional[_MatchWorker] = None
+    self._retired = set()
+    self._matches = []
+    self._revision = None
+
+  def isRunning(self) -> bool:
+    """Flag indicating if matches are being computed"""
+    return self._worker is not None
+
+  def isReady(self) -> bool:
+    """Flag indicating if the matches are computed and still valid"""
+    if self._worker is not None or self._revision is None:
+      return False
+    return self._revision == self._document.revision()
+
+  def getMatchCount(self) -> int:
+    """Getter-function for the number of matches found"""
+    return len(self._matches)
+
+  def cancel(self) -> NoReturn:
+    """Cancels the computation in progress. The worker is left to finish
+    in the background and its result is discarded."""
+    worker, self._worker = self._worker, None
+    if worker is not None:
+      worker.requestInterruption()
+      self._retired.add(worker)
+
+  def find(self, pattern: str, replacement: str, regex: bool = True,
+           caseSensitive: bool = True) -> NoReturn:
+    """Starts computing the matches of the pattern"""
+    self.cancel()
+    self._matches, self._revision = [], None
+    flags = 0 if caseSensitive else re.IGNORECASE
+    try:
+      compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+    except re.error as e:
+      return self.failed.emit(str(e))
+    if not pattern:
+      return self.failed.emit('Nothing to find')
+    text = self._document.toPlainText()
+    self._revision = self._document.revision()
+    worker = _MatchWorker(text, compiled, replacement, regex)
+    worker.finished.connect(self._workerFinished)
+    self._worker = worker
+    worker.start()
+
+  def _workerFinished(self) -> NoReturn:
+    """Collects the matches of the worker, unless it was cancelled"""
+    for worker in [w for w in self._retired if w.isFinished()]:
+      self._retired.discard(worker)
+    worker = self._worker
+    if worker is None or not worker.isFinished():
+      return
+    self._worker = None
+    if worker.error is not None:
+      self._revision = None
+      return self.failed.emit(str(worker.error))
+    self._matches = worker.matches
+    self.previewReady.emit(len(self._matches),
+                           self._matches[:self._previewSize])
+
+  def apply(self) -> int:
+    """Applies the replacements as a single undo step. Returns the number
+    of replacements made. The matches are discarded if the document has
+    changed since they were computed."""
+    if not self.isReady():
+      self._matches, self._revision = [], None
+      self.failed.emit('The document changed, find the matches again')
+      return 0
+    matches, self._matches, self._revision = self._matches, [], None
+    widget = self._widget
+    if widget is not None:
+      widget.setUpdatesEnabled(False)
+    cursor = QTextCursor(self._document)
+    cursor.beginEditBlock()
+    try:
+      for position, length, _, replacement in reversed(matches):
+        cursor.setPosition(position)
+        cursor.setPosition(position + length,
+                           QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(replacement)
+    finally:
+      cursor.endEditBlock()
+      if widget is not None:
+        widget.setUpdatesEnabled(True)
+    self.applied.emit(len(matches))
+    return len(matches)
@@ -0,0 +1,199 @@
+"""SearchIndex answers substring queries on a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import re
+import sys
+import time
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextDocument
+
+_trigramPattern = re.compile(r'(?=(...))', re.DOTALL)
+
+
+def trigrams(text: str) -> set[str]:
+  """Returns the set of trigrams in the lower case text"""
+  return set(map(sys.intern, set(_trigramPattern.findall(text.lower()))))
+
+
+class _Segment:
+  """A run of consecutive blocks together with the trigrams occurring in
+  them. The trigrams are collected again when the segment is dirty.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('count', 'trigrams', 'dirty')
+
+  def __init__(self, count: int) -> None:
+    self.count = count
+    self.trigrams = frozenset()
+    self.dirty = True
+
+
+class SearchIndex(QObject):
+  """SearchIndex keeps a trigram index of the document in segments of
+  consecutive blocks. Edits only mark the segments they touch as dirty,
+  and dirty segments are indexed again when next searched.
+
+  A query is answered by scanning only the blocks in segments containing
+  every trigram of the query. Queries are debounced and run in time
+  slices on the event loop. Starting a new query cancels the previous
+  one. Matches are emitted by matchesFound as they are found, as lists of
+  document positions and lengths.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  matchesFound = Signal(list)
+  searchStarted = Signal(str)
+  searchFinished = Signal(str, int)
+
+  def __init__(self, document: QTextDocument, segmentSize: int = 512,
+               delay: int = 150, timeSlice: float = 0.008) -> None:
+    QObject.__init__(self, document)
+    self._document = document
+    self._segmentSize = segmentSize
+    self._timeSlice = timeSlice
+    self._blockCount = document.blockCount()
+    self._segments = [_Segment(self._blockCount)]
+    self._split(0)
+    self._query = ''
+    self._pattern: Optional[re.Pattern] = None
+    self._queryTrigrams = set()
+    self._segmentIndex, self._segmentStart, self._total = 0, 0, 0
+    self._debounce = QTimer(self)
+    self._debounce.setSingleShot(True)
+    self._debounce.setInterval(delay)
+    self._debounce.timeout.connect(self._start)
+    self._slice = QTimer(self)
+    self._slice.setInterval(0)
+    self._slice.timeout.connect(self._searchSlice)
+    document.contentsChange.connect(self._contentsChanged)
+
+  def isSearching(self) -> bool:
+    """Flag indicating if a query is pending or running"""
+    return self._debounce.isActive() or self._slice.isActive()
+
+  def getQuery(self) -> str:
+    """Getter-function for the current query"""
+    return self._query
+
+  def search(self, query: str) -> NoReturn:
+    """Schedules the query, cancelling the query in progress"""
+    self._slice.stop()
+    self._query = query
+    self._debounce.start()
+
+  def searchNow(self, query: str) -> NoReturn:
+    """Starts the query without waiting for the debounce delay"""
+    self._debounce.stop()
+    self._query = query
+    self._start()
+
+  def cancel(self) -> NoReturn:
+    """Cancels the query in progress"""
+    self._debounce.stop()
+    self._slice.stop()
+
+  def _split(self, index: int) -> NoReturn:
+    """Splits the segment at the index into segments of the configured
+    size"""
+    segment = self._segments[index]
+    if segment.count <= 2 * self._segmentSize:
+      return
+    size, count = self._segmentSize, segment.count
+    parts = [_Segment(size) for _ in range(count // size)]
+    parts[-1].count += count % size
+    self._segments[index:index + 1] = parts
+
+  def _contentsChanged(self, position: int, removed: int,
+                       added: int) -> NoReturn:
+    """Updates the block counts of the segments spanned by the change and
+    marks them dirty"""
+    document = self._document
+    firstBlock = document.findBlock(position)
+    lastBlock = document.findBlock(position + added)
+    if not lastBlock.isValid():
+      lastBlock = document.lastBlock()
+    first = max(firstBlock.blockNumber(), 0)
+    newCount = lastBlock.blockNumber() - first + 1
+    blockCount, self._blockCount = self._blockCount, document.blockCount()
+    oldCount = blockCount - (self._blockCount - newCount)
+    start, index = 0, 0
+    while index < len(self._segments) - 1:
+      if start + self._segments[index].count > first:
+        break
+      start += self._segments[index].count
+      index += 1
+    head = self._segments[index]
+    head.dirty = True
+    remaining = oldCount - (start + head.count - first)
+    head.count += newCount - oldCount
+    while remaining > 0 and index + 1 < len(self._segments):
+      following = self._segments[index + 1]
+      taken = min(remaining, following.count)
+      following.count -= taken
+      head.count += taken
+      remaining -= taken
+      if following.count:
+        following.dirty = True
+        break
+      del self._segments[index + 1]
+    if head.count <= 0 and len(self._segments) > 1:
+      del self._segments[index]
+    else:
+      self._split(index)
+    if self._slice.isActive():
+      self._start()
+
+  def _index(self, segment: _Segment, start: int) -> NoReturn:
+    """Collects the trigrams of the segment starting at the block start"""
+    block = self._document.findBlockByNumber(start)
+    texts = []
+    for _ in range(segment.count):
+      texts.append(block.text())
+      block = block.next()
+    segment.trigrams = frozenset(trigrams('\n'.join(texts)))
+    segment.dirty = False
+
+  def _start(self) -> NoReturn:
+    """Starts the current query from the top of the document"""
+    self._slice.stop()
+    self._segmentIndex, self._segmentStart, self._total = 0, 0, 0
+    self.searchStarted.emit(self._query)
+    if not self._query:
+      self._pattern = None
+      return self.searchFinished.emit(self._query, 0)
+    self._pattern = re.compile(re.escape(self._query), re.IGNORECASE)
+    self._queryTrigrams = trigrams(self._query)
+    self._slice.start()
+
+  def _searchSlice(self) -> NoReturn:
+    """Searches segments for the duration of a time slice"""
+    deadline = time.perf_counter() + self._timeSlice
+    pattern, queryTrigrams, matches = self._pattern, self._queryTrigrams, []
+    while self._segmentIndex < len(self._segments):
+      segment = self._segments[self._segmentIndex]
+      start = self._segmentStart
+      self._segmentIndex += 1
+      self._segmentStart += segment.count
+      if segment.dirty:
+        self._index(segment, start)
+      if queryTrigrams <= segment.trigrams:
+        block = self._document.findBlockByNumber(start)
+        for _ in range(segment.count):
+          position = block.position()
+          for match in pattern.finditer(block.text()):
+            matches.append((position + match.start(),
+                            match.end() - match.start()))
+          block = block.next()
+      if time.perf_counter() > deadline:
+        break
+    if matches:
+      self._total += len(matches)
+      self.matchesFound.emit(matches)
+    if self._segmentIndex >= len(self._segments):
+      self._slice.stop()
+      self.searchFinished.emit(self._query, self._total)
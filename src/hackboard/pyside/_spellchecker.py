@@ -0,0 +1,156 @@
+"""SpellChecker underlines misspelled words in a QTextDocument"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from typing import NoReturn, Optional, Any
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, \
+  QTextDocument, QTextBlock
+
+from hackboard.pyside import wordPattern
+
+
+class WordList:
+  """WordList is a plain set based dictionary read from a file with one
+  word per line.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, fid: str) -> None:
+    with open(fid, 'r', encoding='utf-8') as file:
+      self._words = frozenset(line.strip() for line in file)
+
+  def __contains__(self, word: str) -> bool:
+    return word in self._words
+
+
+class SpellChecker(QSyntaxHighlighter):
+  """SpellChecker underlines misspelled words in the document. Qt invokes
+  highlightBlock only for the blocks changed by an edit, so the cost of a
+  keystroke is proportional to the edited block. The misspelled spans of
+  each block are cached by block number, keyed by the revision of the
+  block and the hash of its text, such that rehighlighting an unchanged
+  block does not check its words again. Verdicts on individual words are
+  cached as well.
+
+  The word being typed is not underlined until the word is committed by
+  calling commitWord, which happens on space key release.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  def __init__(self, document: QTextDocument, dictionary: Any = None,
+               cacheSize: int = 65536) -> None:
+    QSyntaxHighlighter.__init__(self, document)
+    self._dictionary = dictionary
+    self._verdicts = {}
+    self._blocks = {}
+    self._cacheSize = cacheSize
+    self._activePosition: Optional[int] = None
+    self._format = QTextCharFormat()
+    self._format.setUnderlineStyle(
+      QTextCharFormat.UnderlineStyle.SpellCheckUnderline)
+    self._format.setUnderlineColor(QColor(Qt.GlobalColor.red))
+
+  def getDictionary(self) -> Any:
+    """Getter-function for the dictionary"""
+    return self._dictionary
+
+  def setDictionary(self, dictionary: Any) -> NoReturn:
+    """Setter-function for the dictionary. Any object supporting the 'in'
+    operator on words can be used. Setting the dictionary invalidates the
+    cached results and rehighlights the document."""
+    self._dictionary = dictionary
+    self._verdicts = {}
+    self._blocks = {}
+    self.rehighlight()
+
+  def isKnown(self, word: str) -> bool:
+    """Checks the word against the dictionary. Words are accepted in
+    lower case as well, to allow capitalised words."""
+    verdict = self._verdicts.get(word)
+    if verdict is None:
+      dictionary = self._dictionary
+      verdict = word in dictionary or word.lower() in dictionary
+      if len(self._verdicts) >= self._cacheSize:
+        self._verdicts.clear()
+      self._verdicts[word] = verdict
+    return verdict
+
+  def suggest(self, word: str, limit: int = 5) -> list[str]:
+    """Returns correction suggestions for the word, if the dictionary
+    provides them"""
+    suggest = getattr(self._dictionary, 'suggest', None)
+    if suggest is None:
+      return []
+    return suggest(word, limit=limit)
+
+  def checkText(self, text: str) -> list[tuple[int, int]]:
+    """Returns the start and length of each misspelled word in text"""
+    isKnown = self.isKnown
+    return [(m.start(), m.end() - m.start())
+            for m in wordPattern.finditer(text) if not isKnown(m.group())]
+
+  def setActivePosition(self, position: Optional[int]) -> NoReturn:
+    """Sets the position of the word being typed. This word is not
+    underlined before it is committed. A word being typed in another block
+    is committed first."""
+    active = self._activePosition
+    if active is not None and position is not None:
+      document = self.document()
+      if document.findBlock(active) != document.findBlock(position):
+        self.commitWord()
+    self._activePosition = position
+
+  def commitWord(self) -> NoReturn:
+    """Commits the word being typed by rehighlighting its block. The block
+    is not checked again, as its result is cached."""
+    position, self._activePosition = self._activePosition, None
+    if position is not None:
+      self.rehighlightBlock(self.document().findBlock(position))
+
+  def highlightBlock(self, text: str) -> NoReturn:
+    """Underlines the misspelled words in the current block"""
+    if self._dictionary is None:
+      return
+    block = self.currentBlock()
+    number, key = block.blockNumber(), (block.revision(), hash(text))
+    cached = self._blocks.get(number)
+    if cached is None or cached[0] != key:
+      if len(self._blocks) > 2 * self.document().blockCount() + 1024:
+        self._blocks.clear()
+      cached = key, self.checkText(text)
+      self._blocks[number] = cached
+    active = self._activePosition
+    if active is not None:
+      active -= block.position()
+    for start, length in cached[1]:
+      if active is None or not start <= active <= start + length:
+        self.underline(start, length)
+
+  def underline(self, start: int, length: int) -> NoReturn:
+    """Underlines the misspelled word in the current block"""
+    self.setFormat(start, length, self._format)
+
+  def getUnderlineFormat(self) -> QTextCharFormat:
+    """Getter-function for the format of misspelled words"""
+    return self._format
+
+  def rehighlight(self) -> NoReturn:
+    """Rehighlights the document. The modification flag is kept, as Qt
+    marks a document without an undo stack as modified when formats
+    change."""
+    document = self.document()
+    modified = document.isModified()
+    QSyntaxHighlighter.rehighlight(self)
+    if document.isModified() != modified:
+      document.setModified(modified)
+
+  def rehighlightBlock(self, block: QTextBlock) -> NoReturn:
+    """Rehighlights the block, keeping the modification flag"""
+    document = self.document()
+    modified = document.isModified()
+    QSyntaxHighlighter.rehighlightBlock(self, block)
+    if document.isModified() != modified:
+      document.setModified(modified)
@@ -4,13 +4,146 @@
 from __future__ import annotations
 
 import os
+import weakref
+from importlib import resources, import_module
+from typing import NoReturn, Optional, Iterator
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, Signal
+from PySide6.QtWidgets import QWidget
+
+
+def _styleFiles(package: str) -> Iterator[tuple[str, str, Optional[str]]]:
+  """Yields the name, the text and the path of each QSS file shipped with
+  the package. The path is None for files inside an archive. Python 3.8
+  lacks resources.files, so the older resources functions are used there."""
+  if not hasattr(resources, 'files'):
+    directory = os.path.dirname(import_module(package).__file__)
+    for name in resources.contents(package):
+      if name.endswith('.css'):
+        path = os.path.join(directory, name)
+        yield (name, resources.read_text(package, name, 'utf-8'),
+               path if os.path.isfile(path) else None)
+    return
+  for entry in resources.files(package).iterdir():
+    if entry.name.endswith('.css'):
+      path = os.fspath(entry) if isinstance(entry, os.PathLike) else None
+      yield entry.name, entry.read_text(encoding='utf-8'), path
+
+
+class StyleRegistry(QObject):
+  """StyleRegistry loads the QSS files shipped with the package once,
+  through the package resources rather than paths relative to the working
+  directory. Each file defines the context named by the file name, such
+  that '_qlabel.css' defines the context 'qlabel'. Contexts are case
+  insensitive. Stylesheets composed of several contexts are cached.
+
+  Styles are applied to a widget with apply, which sets the composed
+  stylesheet once. To style a whole tree of widgets, apply the contexts to
+  a common ancestor; the selectors then cascade to the descendants, at the
+  cost of a single call to setStyleSheet.
+
+  In dev mode the files are watched, and when a file changes it is loaded
+  again and only the widgets styled with the affected context are
+  restyled. Dev mode is enabled by the environment variable HACKBOARD_DEV
+  or by setDevMode.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  styleChanged = Signal(str)
+
+  def __init__(self, package: str = 'hackboard.pyside',
+               parent: QObject = None) -> None:
+    QObject.__init__(self, parent)
+    self._sources = {}
+    self._paths = {}
+    self._composed = {}
+    self._widgets = weakref.WeakKeyDictionary()
+    self._watcher: Optional[QFileSystemWatcher] = None
+    for name, text, path in _styleFiles(package):
+      context = name[:-4].lstrip('_').lower()
+      self._sources[context] = text
+      if path is not None:
+        self._paths[path] = context
+    if os.environ.get('HACKBOARD_DEV'):
+      self.setDevMode(True)
+
+  def getContexts(self) -> list[str]:
+    """Getter-function for the names of the contexts"""
+    return sorted(self._sources)
+
+  def getStats(self) -> dict[str, int]:
+    """Returns the sizes of the caches"""
+    return {
+      'contexts': len(self._sources),
+      'composed': len(self._composed),
+      'widgets': len(self._widgets),
+    }
+
+  def isDevMode(self) -> bool:
+    """Flag indicating if the files are watched"""
+    return self._watcher is not None
+
+  def setDevMode(self, enabled: bool) -> NoReturn:
+    """Starts or stops watching the files for changes. Files inside an
+    archive cannot be watched."""
+    if enabled and self._watcher is None and self._paths:
+      self._watcher = QFileSystemWatcher(list(self._paths), self)
+      self._watcher.fileChanged.connect(self._fileChanged)
+    elif not enabled and self._watcher is not None:
+      self._watcher.deleteLater()
+      self._watcher = None
+
+  def compose(self, *contexts: str) -> str:
+    """Returns the stylesheet of the contexts. Unknown contexts contribute
+    nothing."""
+    key = tuple(context.lower() for context in contexts)
+    style = self._composed.get(key)
+    if style is None:
+      parts = [self._sources.get(context, '') for context in key]
+      style = self._composed[key] = '\n'.join(part for part in parts if part)
+    return style
+
+  def apply(self, widget: QWidget, *contexts: str) -> NoReturn:
+    """Sets the stylesheet of the contexts on the widget, which also styles
+    its descendants. The widget is restyled when the contexts change."""
+    key = tuple(context.lower() for context in contexts)
+    if widget not in self._widgets:
+      widget.destroyed.connect(self._widgetDestroyed)
+    self._widgets[widget] = key
+    widget.setStyleSheet(self.compose(*key))
+
+  def _widgetDestroyed(self, widget: QObject) -> NoReturn:
+    """Forgets the destroyed widget"""
+    self._widgets.pop(widget, None)
+
+  def _fileChanged(self, path: str) -> NoReturn:
+    """Loads the changed file again and restyles the affected widgets"""
+    context = self._paths.get(path)
+    if context is None or not os.path.exists(path):
+      return
+    with open(path, 'r', encoding='utf-8') as file:
+      self._sources[context] = file.read()
+    if path not in self._watcher.files():
+      self._watcher.addPath(path)
+    for key in [key for key in self._composed if context in key]:
+      del self._composed[key]
+    for widget, key in list(self._widgets.items()):
+      if context in key:
+        widget.setStyleSheet(self.compose(*key))
+    self.styleChanged.emit(context)
+
+
+_registry: Optional[StyleRegistry] = None
+
+
+def getStyleRegistry() -> StyleRegistry:
+  """Returns the style registry, creating it on first use"""
+  global _registry
+  if _registry is None:
+    _registry = StyleRegistry()
+  return _registry
 
 
 def getStyle(context: str) -> str:
   """Get the style for the given context"""
-  if context.lower() == 'qlabel':
-    root = os.getcwd()
-    fid = os.path.join(root, 'src', 'hackboard', 'pyside', '_qlabel.css')
-    with open(fid, 'r') as f:
-      labelStyle = f.read()
-    return labelStyle
+  return getStyleRegistry().compose(context)
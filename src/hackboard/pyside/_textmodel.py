@@ -0,0 +1,296 @@
+"""TextModel mirrors a QTextDocument in a persistent rope"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import re
+from typing import NoReturn, Optional, Iterator
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QTextCursor, QTextDocument
+
+_astralPattern = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def utf16Length(text: str) -> int:
+  """Returns the length of the text in the UTF-16 units used by Qt"""
+  return len(text) + len(_astralPattern.findall(text))
+
+
+def pythonIndex(text: str, units: int) -> int:
+  """Returns the index in the text after the number of UTF-16 units"""
+  if _astralPattern.search(text) is None:
+    return min(units, len(text))
+  index = 0
+  while units > 0 and index < len(text):
+    units -= 2 if text[index] > '\uffff' else 1
+    index += 1
+  return index
+
+
+class _Node:
+  """Immutable node of the rope. Leaves hold text, inner nodes hold two
+  children. Each node knows the UTF-16 length, the number of line feeds
+  and the height of its subtree.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('left', 'right', 'text', 'units', 'lines', 'height')
+
+  def __init__(self, left: Optional[_Node], right: Optional[_Node],
+               text: Optional[str] = None) -> None:
+    self.left, self.right, self.text = left, right, text
+    if text is None:
+      self.units = left.units + right.units
+      self.lines = left.lines + right.lines
+      self.height = max(left.height, right.height) + 1
+    else:
+      self.units = utf16Length(text)
+      self.lines = text.count('\n')
+      self.height = 0
+
+
+_leafSize = 4096
+
+
+def _leaf(text: str) -> Optional[_Node]:
+  """Returns a leaf holding the text, or None if it is empty"""
+  return _Node(None, None, text) if text else None
+
+
+def _build(text: str) -> Optional[_Node]:
+  """Returns a balanced rope of the text"""
+  nodes = [_Node(None, None, text[i:i + _leafSize])
+           for i in range(0, len(text), _leafSize)]
+  while len(nodes) > 1:
+    pairs = [_Node(nodes[i], nodes[i + 1])
+             for i in range(0, len(nodes) - 1, 2)]
+    if len(nodes) % 2:
+      pairs[-1] = _join(pairs[-1], nodes[-1])
+    nodes = pairs
+  return nodes[0] if nodes else None
+
+
+def _balance(left: _Node, right: _Node) -> _Node:
+  """Returns the node of the children, rotating if their heights differ
+  by more than one"""
+  if left.height > right.height + 1:
+    if left.left.height >= left.right.height:
+      return _Node(left.left, _Node(left.right, right))
+    inner = left.right
+    return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+  if right.height > left.height + 1:
+    if right.right.height >= right.left.height:
+      return _Node(_Node(left, right.left), right.right)
+    inner = right.left
+    return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+  return _Node(left, right)
+
+
+def _join(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+  """Returns the concatenation of the ropes. Adjacent small leaves are
+  merged, such that typing does not fragment the rope."""
+  if left is None:
+    return right
+  if right is None:
+    return left
+  if left.height > right.height + 1:
+    return _balance(left.left, _join(left.right, right))
+  if right.height > left.height + 1:
+    return _balance(_join(left, right.left), right.right)
+  if left.text is not None and right.text is not None \
+      and len(left.text) + len(right.text) <= _leafSize:
+    return _Node(None, None, left.text + right.text)
+  return _balance(left, right)
+
+
+def _split(node: Optional[_Node], units: int) -> tuple[Optional[_Node], ...]:
+  """Returns the ropes before and after the UTF-16 offset"""
+  if node is None:
+    return None, None
+  if node.text is not None:
+    index = pythonIndex(node.text, units)
+    return _leaf(node.text[:index]), _leaf(node.text[index:])
+  if units < node.left.units:
+    left, right = _split(node.left, units)
+    return left, _join(right, node.right)
+  left, right = _split(node.right, units - node.left.units)
+  return _join(node.left, left), right
+
+
+class TextSnapshot:
+  """TextSnapshot is an immutable view of the text of a document at one
+  revision. Offsets are UTF-16 positions as used by QTextDocument, and
+  lines are separated by line feeds. As the rope is never modified, a
+  snapshot may be read from any thread while the document is edited.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('_root', 'revision')
+
+  def __init__(self, root: Optional[_Node], revision: int) -> None:
+    self._root = root
+    self.revision = revision
+
+  @staticmethod
+  def fromText(text: str) -> TextSnapshot:
+    """Returns a snapshot of the text"""
+    return TextSnapshot(_build(text), 0)
+
+  def replace(self, start: int, end: int, text: str) -> TextSnapshot:
+    """Returns a new snapshot with the text between the offsets replaced.
+    This snapshot is unchanged and shares the untouched pieces."""
+    before, rest = _split(self._root, start)
+    after = _split(rest, end - start)[1]
+    root = _join(_join(before, _build(text)), after)
+    return TextSnapshot(root, self.revision + 1)
+
+  def length(self) -> int:
+    """Returns the length of the text in UTF-16 units"""
+    return 0 if self._root is None else self._root.units
+
+  def lineCount(self) -> int:
+    """Returns the number of lines"""
+    return 1 if self._root is None else self._root.lines + 1
+
+  def chunks(self, start: int = 0, end: int = None) -> Iterator[str]:
+    """Yields the text between the offsets as the pieces it is stored in"""
+    end = self.length() if end is None else min(end, self.length())
+    stack, offset = [self._root], 0
+    while stack and offset < end:
+      node = stack.pop()
+      if node is None:
+        continue
+      if offset + node.units <= start:
+        offset += node.units
+      elif node.text is None:
+        stack.append(node.right)
+        stack.append(node.left)
+      else:
+        text = node.text
+        if start > offset or end < offset + node.units:
+          first = pythonIndex(text, start - offset) if start > offset else 0
+          text = text[first:pythonIndex(text, end - offset)]
+        offset += node.units
+        yield text
+
+  def slice(self, start: int, end: int) -> str:
+    """Returns the text between the offsets"""
+    return ''.join(self.chunks(start, end))
+
+  def text(self) -> str:
+    """Returns the whole text"""
+    return ''.join(self.chunks())
+
+  def lineStart(self, line: int) -> int:
+    """Returns the offset of the start of the line, or the length of the
+    text if there are fewer lines"""
+    if line <= 0 or self._root is None:
+      return 0
+    if line > self._root.lines:
+      return self._root.units
+    node, offset = self._root, 0
+    while node.text is None:
+      if line <= node.left.lines:
+        node = node.left
+      else:
+        offset += node.left.units
+        line -= node.left.lines
+        node = node.right
+    index = -1
+    for _ in range(line):
+      index = node.text.index('\n', index + 1)
+    return offset + utf16Length(node.text[:index + 1])
+
+  def lineAt(self, position: int) -> int:
+    """Returns the line containing the offset"""
+    node, line = self._root, 0
+    while node is not None and node.text is None:
+      if position < node.left.units:
+        node = node.left
+      else:
+        position -= node.left.units
+        line += node.left.lines
+        node = node.right
+    if node is None:
+      return line
+    return line + node.text.count('\n', 0, pythonIndex(node.text, position))
+
+  def line(self, line: int) -> str:
+    """Returns the text of the line without the line feed"""
+    text = self.slice(self.lineStart(line), self.lineStart(line + 1))
+    return text[:-1] if text.endswith('\n') else text
+
+
+class TextModel(QObject):
+  """TextModel mirrors the text of a QTextDocument in a persistent rope:
+  a balanced tree of text pieces in which an edit creates new nodes only
+  along the path to the change and shares the rest. A snapshot is
+  therefore a reference to the current root, taken in constant time, and
+  remains valid and unchanged while the document is edited further.
+
+  Each change of the document reads only the changed text from the
+  document. Changes leaving the text unchanged, such as those of the
+  highlighters, are recognised and ignored. Otherwise, changed is emitted
+  with the position and the removed and added texts.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  changed = Signal(int, str, str)
+  reset = Signal()
+
+  def __init__(self, document: QTextDocument) -> None:
+    QObject.__init__(self, document)
+    self._document = document
+    self._revision = 0
+    self._root = _build(document.toPlainText())
+    document.contentsChange.connect(self._contentsChanged)
+
+  @staticmethod
+  def forDocument(document: QTextDocument) -> TextModel:
+    """Returns the model of the document, creating it if it has none"""
+    model = document.findChild(TextModel)
+    return TextModel(document) if model is None else model
+
+  def getDocument(self) -> QTextDocument:
+    """Getter-function for the document"""
+    return self._document
+
+  def getRevision(self) -> int:
+    """Getter-function for the number of changes of the text"""
+    return self._revision
+
+  def snapshot(self) -> TextSnapshot:
+    """Returns an immutable view of the current text"""
+    return TextSnapshot(self._root, self._revision)
+
+  def _contentsChanged(self, position: int, removed: int,
+                       added: int) -> NoReturn:
+    """Applies the change to the rope. The counts of Qt include the final
+    paragraph separator when the whole document changes, so they are
+    clamped to the lengths of the texts."""
+    document, root = self._document, self._root
+    length = 0 if root is None else root.units
+    removed = max(min(removed, length - position), 0)
+    added = max(min(added, document.characterCount() - 1 - position), 0)
+    cursor = QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + added, QTextCursor.MoveMode.KeepAnchor)
+    addedText = cursor.selectedText().replace('\u2029', '\n')
+    before, rest = _split(root, position)
+    old, after = _split(rest, removed)
+    removedText = TextSnapshot(old, 0).text()
+    if removedText == addedText:
+      return
+    self._root = _join(_join(before, _build(addedText)), after)
+    self._revision += 1
+    if length - removed + added != document.characterCount() - 1:
+      return self._rebuild()
+    self.changed.emit(position, removedText, addedText)
+
+  def _rebuild(self) -> NoReturn:
+    """Reads the whole text again, should the rope disagree with the
+    document"""
+    self._root = _build(self._document.toPlainText())
+    self._revision += 1
+    self.reset.emit()
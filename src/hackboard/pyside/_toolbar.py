@@ -10,6 +10,7 @@ from PySide6.QtGui import QFont
 from PySide6.QtWidgets import QToolBar, QLineEdit, QPushButton
 
 from hackboard.pyside import minPol, hPol
+from hackboard.pyside.style import FontRegistry
 
 
 class CustomToolBar(QToolBar):
@@ -19,9 +20,7 @@ class CustomToolBar(QToolBar):
 
   signalTextTransmit = Signal(str)
   textChanged = Signal(str)
-  _font = QFont()
-  _font.setFamily('Consolas')
-  _font.setPointSize(16)
+  _font = FontRegistry.getFont('Consolas', 16)
 
   @classmethod
   def getFont(cls) -> QFont:
@@ -0,0 +1,293 @@
+"""UndoManager keeps a memory bounded undo history"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import marshal
+import tempfile
+import time
+import zlib
+from collections import deque
+from typing import NoReturn
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QPlainTextEdit
+
+from hackboard.pyside import TextModel, utf16Length
+
+
+class UndoManager(QObject):
+  """UndoManager replaces the undo stack of the QTextDocument with one of
+  bounded memory. The removed and added texts of each change are taken
+  from the TextModel of the document.
+
+  Consecutive single character insertions and deletions are coalesced
+  into one undo step, until a new word is started, the cursor moves, or
+  the time window passes. Changes leaving the text unchanged, such as
+  those of the highlighters, are ignored.
+
+  When the undo steps exceed the memory budget, the oldest are spilled in
+  batches to a compressed journal in a temporary file, and are read back
+  one batch at a time when undone that far. The journal is a stack, so
+  both spilling and reading back take constant time regardless of the
+  length of the history.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  undoAvailable = Signal(bool)
+  redoAvailable = Signal(bool)
+
+  editOverhead = 96
+
+  def __init__(self, model: TextModel, widget: QPlainTextEdit = None,
+               budget: int = 33554432, window: float = 1.0) -> None:
+    document = model.getDocument()
+    QObject.__init__(self, document)
+    self._document = document
+    self._widget = widget
+    self._budget = budget
+    self._window = window
+    self._undo = deque()
+    self._redo = []
+    self._size = 0
+    self._journal = None
+    self._spilled = []
+    self._open = False
+    self._lastTime = 0.0
+    self._applying = False
+    self._suspended = False
+    document.setUndoRedoEnabled(False)
+    model.changed.connect(self._changed)
+    model.reset.connect(self.clear)
+
+  def getBudget(self) -> int:
+    """Getter-function for the memory budget in bytes"""
+    return self._budget
+
+  def getSize(self) -> int:
+    """Getter-function for the estimated bytes of the steps in memory"""
+    return self._size
+
+  def spilledCount(self) -> int:
+    """Returns the number of undo steps in the journal"""
+    return sum(count for _, _, count in self._spilled)
+
+  def isUndoAvailable(self) -> bool:
+    """Flag indicating if a step can be undone"""
+    return bool(self._undo or self._spilled)
+
+  def isRedoAvailable(self) -> bool:
+    """Flag indicating if a step can be redone"""
+    return bool(self._redo)
+
+  def suspend(self) -> NoReturn:
+    """Stops recording, such as while a file is loaded"""
+    self._suspended = True
+
+  def resume(self, *_) -> NoReturn:
+    """Resumes recording with an empty history"""
+    self._suspended = False
+    self._document.setUndoRedoEnabled(False)
+    self.clear()
+
+  def clear(self) -> NoReturn:
+    """Removes the undo history"""
+    self._undo.clear()
+    self._redo.clear()
+    self._size = 0
+    self._spilled = []
+    if self._journal is not None:
+      self._journal.close()
+      self._journal = None
+    self._open = False
+    self._notify()
+
+  def takeHistory(self) -> tuple:
+    """Returns the undo history and leaves the manager with an empty one.
+    All but the most recent undo step are first spilled to the journal.
+    The history remains valid for any document with the same text, such as
+    a hibernated document when it is restored."""
+    self._spill(0)
+    history = (self._undo, self._redo, self._size, self._journal,
+               self._spilled)
+    self._undo, self._redo, self._size = deque(), [], 0
+    self._journal, self._spilled = None, []
+    self._open = False
+    self._notify()
+    return history
+
+  def setHistory(self, history: tuple) -> NoReturn:
+    """Replaces the undo history with one returned by takeHistory, and
+    resumes recording"""
+    self.clear()
+    self._undo, self._redo, self._size, self._journal, self._spilled = \
+      history
+    self._suspended = False
+    self._document.setUndoRedoEnabled(False)
+    self._notify()
+
+  def breakGroup(self) -> NoReturn:
+    """Ends the current undo step, such that the next change starts a new
+    one"""
+    self._open = False
+
+  def _notify(self) -> NoReturn:
+    """Emits the availability of undo and redo"""
+    self.undoAvailable.emit(self.isUndoAvailable())
+    self.redoAvailable.emit(self.isRedoAvailable())
+
+  def _changed(self, position: int, removedText: str,
+               addedText: str) -> NoReturn:
+    """Records the change without the text common to its start and end"""
+    if self._suspended or self._applying:
+      return
+    prefix = 0
+    while prefix < min(len(removedText), len(addedText)) \
+        and removedText[prefix] == addedText[prefix]:
+      prefix += 1
+    suffix = 0
+    while suffix < min(len(removedText), len(addedText)) - prefix \
+        and removedText[-1 - suffix] == addedText[-1 - suffix]:
+      suffix += 1
+    stop = -suffix or None
+    self._record(position + utf16Length(removedText[:prefix]),
+                 removedText[prefix:stop], addedText[prefix:stop])
+
+  def _record(self, position: int, removed: str, added: str) -> NoReturn:
+    """Records the change, coalescing it with the previous if it continues
+    the typing"""
+    now = time.monotonic()
+    single = len(removed) + len(added) == 1
+    last = self._undo[-1][-1] if self._open and self._undo else None
+    before = 0 if last is None else self._editSize(last)
+    if single and last is not None and now - self._lastTime < self._window \
+        and self._coalesce(position, removed, added):
+      self._size += self._editSize(last) - before
+    else:
+      edit = [position, removed, added]
+      self._undo.append([edit])
+      self._size += self._editSize(edit) + self.editOverhead
+    self._open = single
+    self._lastTime = now
+    if self._redo:
+      self._redo.clear()
+    if self._size > self._budget:
+      self._spill()
+    self._notify()
+
+  def _coalesce(self, position: int, removed: str, added: str) -> bool:
+    """Merges the single character change into the current step if it
+    continues it. Typing extends the insertion, and backspace and delete
+    extend the deletion or take back the last character typed."""
+    edit = self._undo[-1][-1]
+    lastPosition, lastRemoved, lastAdded = edit
+    end = lastPosition + utf16Length(lastAdded)
+    if added:
+      if not lastAdded or position != end:
+        return False
+      if lastAdded[-1].isspace() and not added.isspace():
+        return False
+      edit[2] = lastAdded + added
+      return True
+    if lastAdded:
+      if position + utf16Length(removed) != end \
+          or not lastAdded.endswith(removed):
+        return False
+      edit[2] = lastAdded[:-1]
+      return True
+    if position + utf16Length(removed) == lastPosition:
+      edit[0], edit[1] = position, removed + lastRemoved
+      return True
+    if position == lastPosition:
+      edit[1] = lastRemoved + removed
+      return True
+    return False
+
+  @staticmethod
+  def _editSize(edit: list) -> int:
+    """Returns the estimated bytes of the texts of the edit"""
+    return 2 * (len(edit[1]) + len(edit[2]))
+
+  def _groupSize(self, group: list) -> int:
+    """Returns the estimated bytes of the undo step"""
+    return sum(map(self._editSize, group)) + self.editOverhead
+
+  def _spill(self, target: int = None) -> NoReturn:
+    """Moves the oldest steps to the journal until the steps in memory
+    take at most target bytes, by default three quarters of the budget"""
+    target = self._budget * 3 // 4 if target is None else target
+    groups = []
+    while self._size > target and len(self._undo) > 1:
+      group = self._undo.popleft()
+      self._size -= self._groupSize(group)
+      groups.append(group)
+    if not groups:
+      return
+    if self._journal is None:
+      self._journal = tempfile.TemporaryFile(prefix='hackboard-undo-')
+    data = zlib.compress(marshal.dumps(groups), 1)
+    self._journal.seek(0, 2)
+    offset = self._journal.tell()
+    self._journal.write(data)
+    self._spilled.append((offset, len(data), len(groups)))
+
+  def _restore(self) -> NoReturn:
+    """Reads the most recently spilled batch back from the journal"""
+    offset, length, _ = self._spilled.pop()
+    self._journal.seek(offset)
+    groups = marshal.loads(zlib.decompress(self._journal.read(length)))
+    self._journal.truncate(offset)
+    for group in reversed(groups):
+      group = [list(edit) for edit in group]
+      self._undo.appendleft(group)
+      self._size += self._groupSize(group)
+
+  def _apply(self, edits: list, undo: bool) -> int:
+    """Applies the edits in one edit block and returns the position after
+    the last"""
+    cursor = QTextCursor(self._document)
+    self._applying = True
+    cursor.beginEditBlock()
+    try:
+      for position, removed, added in edits:
+        old, new = (added, removed) if undo else (removed, added)
+        cursor.setPosition(position)
+        cursor.setPosition(position + utf16Length(old),
+                           QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(new)
+    finally:
+      cursor.endEditBlock()
+      self._applying = False
+    return cursor.position()
+
+  def _moveCursor(self, position: int) -> NoReturn:
+    """Moves the cursor of the widget to the position"""
+    if self._widget is not None:
+      cursor = self._widget.textCursor()
+      cursor.setPosition(position)
+      self._widget.setTextCursor(cursor)
+
+  def undo(self) -> NoReturn:
+    """Undoes the most recent step"""
+    if not self._undo and self._spilled:
+      self._restore()
+    if not self._undo:
+      return
+    group = self._undo.pop()
+    self._size -= self._groupSize(group)
+    self._redo.append(group)
+    self._open = False
+    self._moveCursor(self._apply(list(reversed(group)), True))
+    self._notify()
+
+  def redo(self) -> NoReturn:
+    """Redoes the most recently undone step"""
+    if not self._redo:
+      return
+    group = self._redo.pop()
+    self._undo.append(group)
+    self._size += self._groupSize(group)
+    self._open = False
+    self._moveCursor(self._apply(group, False))
+    self._notify()
@@ -0,0 +1,173 @@
+"""StallWatchdog reports where the GUI thread blocks"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import NoReturn, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal, QStandardPaths
+
+
+def defaultReportFile() -> str:
+  """Returns the default file of the stall reports"""
+  location = QStandardPaths.StandardLocation.AppLocalDataLocation
+  directory = QStandardPaths.writableLocation(location)
+  return os.path.join(directory, 'stalls.txt')
+
+
+class _Stall:
+  """Stalls sharing the stack signature of the GUI thread
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('stack', 'count', 'samples', 'total', 'longest')
+
+  def __init__(self, stack: traceback.StackSummary) -> None:
+    self.stack = stack
+    self.count = 0
+    self.samples = 0
+    self.total = 0.0
+    self.longest = 0.0
+
+
+class StallWatchdog(QObject):
+  """StallWatchdog detects when the event loop of the GUI thread stops
+  responding. A timer on the GUI thread records a heartbeat, and a
+  background thread checks that the heartbeat is not late by more than the
+  threshold. While the heartbeat is late, the Python stack of the GUI
+  thread is sampled through sys._current_frames at each check.
+
+  Samples are aggregated by the signature of the stack, being the file,
+  line and function of each frame. When the stall ends, it is attributed
+  to the signature sampled most often, and stallReported is emitted with
+  a summary, which is also appended with the full stack to the report
+  file. The heartbeat costs one timer event per interval, and the
+  background thread only reads a float per check while the GUI thread is
+  responsive.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  stallReported = Signal(str)
+
+  def __init__(self, parent: QObject = None, threshold: float = 0.5,
+               interval: float = 0.1, reportFile: str = None) -> None:
+    QObject.__init__(self, parent)
+    self._threshold = threshold
+    self._interval = interval
+    self._reportFile = reportFile
+    self._guiThread = threading.get_ident()
+    self._lastBeat = time.monotonic()
+    self._stalls = {}
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread: Optional[threading.Thread] = None
+    self._heartbeat = QTimer(self)
+    self._heartbeat.setInterval(int(1000 * interval))
+    self._heartbeat.timeout.connect(self._beat)
+
+  def getThreshold(self) -> float:
+    """Getter-function for the threshold in seconds"""
+    return self._threshold
+
+  def getReportFile(self) -> str:
+    """Getter-function for the report file"""
+    if self._reportFile is None:
+      self._reportFile = defaultReportFile()
+    return self._reportFile
+
+  def isRunning(self) -> bool:
+    """Flag indicating if the watchdog is running"""
+    return self._thread is not None
+
+  def start(self) -> NoReturn:
+    """Starts the heartbeat and the background thread"""
+    if self._thread is not None:
+      return
+    self.getReportFile()
+    self._beat()
+    self._heartbeat.start()
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._watch, daemon=True,
+                                    name='StallWatchdog')
+    self._thread.start()
+
+  def stop(self) -> NoReturn:
+    """Stops the heartbeat and the background thread"""
+    if self._thread is None:
+      return
+    self._heartbeat.stop()
+    self._stop.set()
+    self._thread.join()
+    self._thread = None
+
+  def _beat(self) -> NoReturn:
+    """Records the heartbeat"""
+    self._lastBeat = time.monotonic()
+
+  def _watch(self) -> NoReturn:
+    """Checks the heartbeat and samples the GUI thread while stalled"""
+    check = self._interval / 2
+    samples, stalledSince = {}, None
+    while not self._stop.wait(check):
+      lastBeat = self._lastBeat
+      late = time.monotonic() - lastBeat - self._interval
+      if late > self._threshold:
+        if stalledSince != lastBeat:
+          samples, stalledSince = {}, lastBeat
+        frame = sys._current_frames().get(self._guiThread)
+        if frame is not None:
+          stack = traceback.extract_stack(frame)
+          del frame
+          signature = tuple((f.filename, f.lineno, f.name) for f in stack)
+          entry = samples.setdefault(signature, [0, stack])
+          entry[0] += 1
+      elif stalledSince is not None:
+        duration = lastBeat - stalledSince - self._interval
+        if samples:
+          self._record(samples, duration)
+        samples, stalledSince = {}, None
+
+  def _record(self, samples: dict, duration: float) -> NoReturn:
+    """Aggregates the stall and reports it"""
+    signature, (count, stack) = max(samples.items(),
+                                    key=lambda item: item[1][0])
+    with self._lock:
+      stall = self._stalls.get(signature)
+      if stall is None:
+        stall = self._stalls[signature] = _Stall(stack)
+      stall.count += 1
+      stall.samples += sum(entry[0] for entry in samples.values())
+      stall.total += duration
+      stall.longest = max(stall.longest, duration)
+    frame = stack[-1]
+    summary = 'UI stall of %d ms (%d times) at %s:%d in %s' % (
+      1000 * duration, stall.count, os.path.basename(frame.filename),
+      frame.lineno, frame.name)
+    self._writeReport(summary, stack)
+    self.stallReported.emit(summary)
+
+  def _writeReport(self, summary: str, stack: traceback.StackSummary
+                   ) -> NoReturn:
+    """Appends the summary and the stack to the report file"""
+    fid = self.getReportFile()
+    try:
+      os.makedirs(os.path.dirname(fid) or '.', exist_ok=True)
+      with open(fid, 'a', encoding='utf-8') as file:
+        file.write('%s %s\n' % (time.strftime('%Y-%m-%d %H:%M:%S'), summary))
+        file.writelines(stack.format())
+        file.write('\n')
+    except OSError:
+      pass
+
+  def getStalls(self) -> list[tuple[float, int, float, str]]:
+    """Returns the total duration, count, longest duration and formatted
+    stack of each signature, the longest total first"""
+    with self._lock:
+      stalls = [(s.total, s.count, s.longest, ''.join(s.stack.format()))
+                for s in self._stalls.values()]
+    return sorted(stalls, reverse=True)
@@ -4,4 +4,5 @@
 from __future__ import annotations
 
 from ._metastyle import MetaStyle
+from ._fontregistry import FontRegistry
 from ._fontstyles import FontStyle
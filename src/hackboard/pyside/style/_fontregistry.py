@@ -0,0 +1,128 @@
+"""FontRegistry shares fonts and text measurements"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import NoReturn, Any, Callable
+
+from PySide6.QtGui import QFont, QFontMetricsF
+
+
+class _LRUCache:
+  """Mapping of bounded size discarding the least recently used entries.
+  Lookups are counted as hits and misses.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  __slots__ = ('_data', '_size', 'hits', 'misses')
+
+  def __init__(self, size: int) -> None:
+    self._data = OrderedDict()
+    self._size = size
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key: Any, factory: Callable[[], Any]) -> Any:
+    """Returns the cached value, creating it with the factory if absent"""
+    data = self._data
+    try:
+      value = data[key]
+    except KeyError:
+      self.misses += 1
+      value = data[key] = factory()
+      if len(data) > self._size:
+        data.popitem(last=False)
+      return value
+    self.hits += 1
+    data.move_to_end(key)
+    return value
+
+  def __len__(self) -> int:
+    return len(self._data)
+
+  def clear(self) -> NoReturn:
+    """Removes the entries and resets the counters"""
+    self._data.clear()
+    self.hits, self.misses = 0, 0
+
+
+class FontRegistry:
+  """FontRegistry returns a single shared QFont for each combination of
+  family, size, weight and slant, such that widgets using the same font
+  share the instance. The shared fonts must not be changed; copy them
+  first. Font metrics are cached per font, and the sizes of measured texts
+  are cached per font and text, both with least recently used eviction.
+  The number of hits and misses of each cache is available from getStats.
+  #  Copyright (c) 2023 Asger Jon Vistisen
+  #  MIT Licence"""
+
+  _fonts = {}
+  _fontHits = 0
+  _metrics = _LRUCache(64)
+  _sizes = _LRUCache(8192)
+
+  @classmethod
+  def getFont(cls, family: str, pointSize: int,
+              weight: QFont.Weight = QFont.Weight.Normal,
+              italic: bool = False) -> QFont:
+    """Returns the shared font"""
+    key = (family, pointSize, weight, italic)
+    font = cls._fonts.get(key)
+    if font is not None:
+      cls._fontHits += 1
+      return font
+    font = cls._fonts[key] = QFont()
+    font.setFamily(family)
+    font.setPointSize(pointSize)
+    font.setWeight(weight)
+    font.setItalic(italic)
+    return font
+
+  @classmethod
+  def getMetrics(cls, font: QFont) -> QFontMetricsF:
+    """Returns the cached metrics of the font"""
+    return cls._metrics.get(font.key(), lambda: QFontMetricsF(font))
+
+  @classmethod
+  def measure(cls, font: QFont, text: str) -> tuple[float, float]:
+    """Returns the width and height of the text in the font. Line breaks
+    in the text start new lines."""
+
+    def factory() -> tuple[float, float]:
+      size = cls.getMetrics(font).size(0, text)
+      return size.width(), size.height()
+
+    return cls._sizes.get((font.key(), text), factory)
+
+  @classmethod
+  def width(cls, font: QFont, text: str) -> float:
+    """Returns the width of the text in the font"""
+    return cls.measure(font, text)[0]
+
+  @classmethod
+  def height(cls, font: QFont, text: str) -> float:
+    """Returns the height of the text in the font"""
+    return cls.measure(font, text)[1]
+
+  @classmethod
+  def getStats(cls) -> dict[str, int]:
+    """Returns the hits, misses and sizes of the caches"""
+    return {
+      'fontHits': cls._fontHits,
+      'fontMisses': len(cls._fonts),
+      'metricsHits': cls._metrics.hits,
+      'metricsMisses': cls._metrics.misses,
+      'metricsCached': len(cls._metrics),
+      'sizeHits': cls._sizes.hits,
+      'sizeMisses': cls._sizes.misses,
+      'sizesCached': len(cls._sizes),
+    }
+
+  @classmethod
+  def clearCache(cls) -> NoReturn:
+    """Clears the cached metrics and sizes. The shared fonts are kept, as
+    widgets may be using them."""
+    cls._fontHits = 0
+    cls._metrics.clear()
+    cls._sizes.clear()
@@ -6,11 +6,10 @@ from __future__ import annotations
 from typing import NoReturn
 
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont, QPen, QColor, QPainter
+from PySide6.QtGui import QFont, QPen, QColor, QPainter, QTextCharFormat
 from PySide6.QtWidgets import QWidget
-from worktoy.parsing import maybeType
 
-from hackboard.pyside.style import MetaStyle
+from hackboard.pyside.style import MetaStyle, FontRegistry
 
 
 class FontStyle(MetaStyle):
@@ -18,13 +17,31 @@ class FontStyle(MetaStyle):
   #  Copyright (c) 2023 Asger Jon Vistisen
   #  MIT Licence"""
 
-  _normalFont = QFont()
-  _normalFont.setFamily('Courier')
-  _normalFont.setPointSize(16)
+  _normalFont = FontRegistry.getFont('Courier', 16)
   _textPen = QPen()
   _textPen.setStyle(Qt.PenStyle.SolidLine)
   _textPen.setColor(QColor(0, 0, 0, 255))
   _textPen.setWidth(1)
+  _formats = {}
+  _formatsFont = None
+  _formatSpecs = {
+    'heading1': (QFont.Weight.Bold, False, QColor(0, 0, 96), None),
+    'heading2': (QFont.Weight.Bold, False, QColor(0, 0, 128), None),
+    'heading3': (QFont.Weight.Bold, False, QColor(0, 32, 144), None),
+    'heading4': (QFont.Weight.Bold, False, QColor(0, 64, 160), None),
+    'heading5': (QFont.Weight.Bold, True, QColor(0, 64, 160), None),
+    'heading6': (QFont.Weight.Normal, True, QColor(0, 64, 160), None),
+    'strong': (QFont.Weight.Bold, False, None, None),
+    'emphasis': (QFont.Weight.Normal, True, None, None),
+    'code': (QFont.Weight.Normal, False, QColor(128, 0, 64),
+             QColor(240, 240, 240)),
+    'fence': (QFont.Weight.Normal, False, QColor(128, 128, 128),
+              QColor(240, 240, 240)),
+    'quote': (QFont.Weight.Normal, True, QColor(96, 96, 96), None),
+    'listMarker': (QFont.Weight.Bold, False, QColor(160, 80, 0), None),
+    'link': (QFont.Weight.Normal, False, QColor(0, 0, 224), None),
+    'rule': (QFont.Weight.Normal, False, QColor(160, 160, 160), None),
+  }
 
   @classmethod
   def getNormalFont(cls) -> QFont:
@@ -36,6 +53,31 @@ class FontStyle(MetaStyle):
     """Getter-function for normal pen"""
     return cls._textPen
 
+  @classmethod
+  def getCharFormat(cls, role: str) -> QTextCharFormat:
+    """Returns the shared character format of the role, such as 'strong'
+    or 'heading1', derived from the normal font. The formats are cached,
+    and rebuilt should the normal font change. The shared formats must not
+    be changed; copy them first."""
+    key = cls._normalFont.key()
+    if cls._formatsFont != key:
+      cls._formats, cls._formatsFont = {}, key
+    charFormat = cls._formats.get(role)
+    if charFormat is not None:
+      return charFormat
+    weight, italic, foreground, background = cls._formatSpecs[role]
+    font = cls._normalFont
+    charFormat = cls._formats[role] = QTextCharFormat()
+    charFormat.setFont(FontRegistry.getFont(
+      font.family(), font.pointSize(), weight, italic))
+    if foreground is not None:
+      charFormat.setForeground(foreground)
+    if background is not None:
+      charFormat.setBackground(background)
+    if role == 'link':
+      charFormat.setFontUnderline(True)
+    return charFormat
+
   @classmethod
   def __call__(cls, *args, ) -> QPainter | QWidget:
     """Calling the style applies the font and pen to the argument."""
@@ -49,16 +91,28 @@ class FontStyle(MetaStyle):
 
   @classmethod
   def apply(cls, *args) -> QPainter | QWidget:
-    """Applies the font and pen to the argument."""
-    painter = maybeType(QPainter, *args)
-    widget = maybeType(QWidget, *args)
+    """Applies the font and pen to the argument. A widget passes the font
+    on to the descendants not setting a font of their own, so applying the
+    style to the root of a subtree styles the subtree in one call. Widgets
+    already explicitly using the font are left untouched, which avoids the
+    font change events and relayouts of the subtree."""
+    painter = next((a for a in args if isinstance(a, QPainter)), None)
+    widget = next((a for a in args if isinstance(a, QWidget)), None)
+    font = cls._normalFont
     if painter is None:
-      widget.setFont(cls._normalFont)
+      if not widget.testAttribute(Qt.WidgetAttribute.WA_SetFont) \
+          or widget.font() != font:
+        widget.setFont(font)
       return widget
-    painter.setFont(cls._normalFont)
+    painter.setFont(font)
     painter.setPen(cls._textPen)
     return painter
 
+  @classmethod
+  def measure(cls, text: str) -> tuple[float, float]:
+    """Returns the width and height of the text in the normal font"""
+    return FontRegistry.measure(cls._normalFont, text)
+
   def loadFromDisk(self) -> NoReturn:
     """Loads color styles from disk"""
     raise NotImplementedError
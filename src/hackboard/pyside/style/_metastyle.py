@@ -5,8 +5,6 @@ from __future__ import annotations
 
 from typing import Any
 
-from PySide6.QtGui import QPainter
-
 
 class _MetaStyle(type):
   """MetaStyle is a metaclass relating to applying styles
@@ -14,7 +12,12 @@ class _MetaStyle(type):
   #  MIT Licence"""
 
   def __matmul__(cls, other: Any) -> Any:
-    """Enabling the @ operator"""
+    """Enabling the @ operator. 'Style @ target' applies the style to the
+    target and returns the target."""
+    apply = getattr(cls, 'apply', None)
+    if apply is None:
+      return NotImplemented
+    return apply(other)
 
 
 class MetaStyle(metaclass=_MetaStyle):
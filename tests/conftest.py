@@ -0,0 +1,26 @@
+"""Fixtures shared by the tests. Qt runs on the offscreen platform and
+QStandardPaths in test mode, such that the tests touch neither the screen
+nor the directories of the user."""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+import sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+import pytest
+from PySide6.QtCore import QStandardPaths
+from PySide6.QtWidgets import QApplication
+
+
+@pytest.fixture(scope='session')
+def app() -> QApplication:
+  """The application shared by the tests"""
+  QStandardPaths.setTestModeEnabled(True)
+  application = QApplication.instance() or QApplication([])
+  application.setOrganizationName('hackboard')
+  application.setApplicationName('hackboard-tests')
+  return application
@@ -0,0 +1,83 @@
+"""Tests of AutoSaver and RecoverySession"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import shutil
+
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication
+
+from hackboard.pyside import AutoSaver, DocWidget
+
+
+def _edit(document, start: int, end: int, text: str = '') -> None:
+  """Replaces the text between the UTF-16 positions"""
+  cursor = QTextCursor(document)
+  cursor.setPosition(start)
+  cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+  cursor.insertText(text)
+
+
+def _recover(tmp_path, edits: list) -> str:
+  """Applies the edits with an AutoSaver journaling them, and returns the
+  text recovered from the session left behind"""
+  widget = DocWidget()
+  document = widget.document()
+  saver = AutoSaver(widget.getTextModel(), directory=str(tmp_path))
+  _edit(document, 0, 0, 'xab😀😀cd')
+  saver.flush()
+  for edit in edits:
+    _edit(document, *edit)
+  saver.close()
+  sessions = AutoSaver.findSessions(str(tmp_path))
+  assert len(sessions) == 1
+  text = sessions[0].recover().text()
+  sessions[0].discard()
+  assert text == document.toPlainText()
+  return text
+
+
+def testRecoverAstralDeletion(app, tmp_path) -> None:
+  """Deleting characters outside the BMP is replayed in UTF-16 units"""
+  assert _recover(tmp_path, [(3, 7)]) == 'xabcd'
+
+
+def testRecoverAstralReplacement(app, tmp_path) -> None:
+  """Replacing across characters outside the BMP keeps the text after"""
+  assert _recover(tmp_path, [(5, 7, '🙂'), (1, 3, 'é')]) == 'xé😀🙂cd'
+
+
+def testUncreatableDirectory(app, tmp_path) -> None:
+  """A recovery directory which cannot be created is reported, and the
+  document may still be saved afterwards"""
+  blocker = tmp_path / 'file'
+  blocker.write_text('')
+  widget = DocWidget()
+  saver = AutoSaver(widget.getTextModel(), directory=str(blocker / 'dir'))
+  errors = []
+  saver.failed.connect(errors.append)
+  _edit(widget.document(), 0, 0, 'hello')
+  saver.flush()
+  assert len(errors) == 1
+  assert saver.getSessionDir() is None
+  widget.document().setModified(False)
+  saver.close()
+
+
+def testWorkerErrorReported(app, tmp_path) -> None:
+  """Writes failing on the worker thread are reported by failed"""
+  widget = DocWidget()
+  saver = AutoSaver(widget.getTextModel(), directory=str(tmp_path),
+                    journalLimit=0)
+  errors = []
+  saver.failed.connect(errors.append)
+  _edit(widget.document(), 0, 0, 'hello')
+  saver.flush()
+  _edit(widget.document(), 5, 5, ' world')
+  shutil.rmtree(saver.getSessionDir())
+  saver.flush()
+  widget.document().setModified(False)
+  saver.close()
+  QApplication.processEvents()
+  assert errors
@@ -0,0 +1,63 @@
+"""Tests of BaseWindow"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from hackboard.pyside import BaseWindow
+
+
+def _waitForLoad(window: BaseWindow) -> None:
+  """Processes events until the load in progress is done"""
+  deadline = time.perf_counter() + 10
+  while window.getFileLoader().isLoading():
+    assert time.perf_counter() < deadline
+    QApplication.processEvents()
+
+
+def testLoadIntoOwnDocument(app, tmp_path) -> None:
+  """The window loads files into a document of its own"""
+  fid = tmp_path / 'text.txt'
+  fid.write_text('hello\nworld\n')
+  window = BaseWindow()
+  window.openFile(str(fid))
+  _waitForLoad(window)
+  assert window.getDoc().toPlainText() == 'hello\nworld\n'
+  assert window.getFileName() == str(fid)
+  window.closeDocument()
+  assert window.getDoc().isEmpty()
+  assert window.getFileName() is None
+  window.close()
+
+
+def testDefaultsWithoutViewer(app, tmp_path) -> None:
+  """Without a viewer or a spell checker, the window reports so in the
+  status bar"""
+  fid = tmp_path / 'text.txt'
+  fid.write_text('hello')
+  window = BaseWindow()
+  window.openFile(str(fid), True)
+  assert not window.isViewing()
+  assert 'read-only' in window._statusLabel.text()
+  window.loadDictionary(str(fid))
+  assert 'not available' in window._statusLabel.text()
+  window.newDocument()
+  assert window.getDoc().isEmpty()
+  window.close()
+
+
+def testOpenMissingFile(app, tmp_path) -> None:
+  """A file which cannot be read is reported in the status bar"""
+  fid = str(tmp_path / 'missing.txt')
+  window = BaseWindow()
+  window.openFile(fid)
+  assert window._statusLabel.text().startswith('Failed to load file')
+  window.setStatus('')
+  window.loadFile(fid)
+  assert window._statusLabel.text().startswith('Failed to load file')
+  assert not window.getFileLoader().isLoading()
+  assert not window.getCommands().isEnabled('cancelLoad')
+  window.close()
@@ -0,0 +1,78 @@
+"""Tests of Vocabulary"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication
+
+from hackboard.pyside import DocWidget, wordPattern
+
+
+def _counts(widget: DocWidget) -> Counter:
+  """Returns the word counts of the vocabulary of the widget once every
+  change is counted"""
+  vocabulary = widget.getVocabulary()
+  while not vocabulary.isComplete():
+    QApplication.processEvents()
+  return Counter({word: count for count, word in
+                  vocabulary.getTrie().words()})
+
+
+def _replace(widget: DocWidget, start: int, end: int, text: str) -> None:
+  """Replaces the text between the positions"""
+  cursor = QTextCursor(widget.document())
+  cursor.setPosition(start)
+  cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+  cursor.insertText(text)
+
+
+def testLongWordAcrossContext(app) -> None:
+  """Splitting and joining a word longer than the context is counted as
+  the whole words"""
+  word = 'a' * 100 + 'b' * 100
+  widget = DocWidget()
+  widget.setPlainText('x %s y' % word)
+  _counts(widget)
+  _replace(widget, 102, 102, ' ')
+  assert _counts(widget) == Counter(['x', 'a' * 100, 'b' * 100, 'y'])
+  _replace(widget, 102, 103, '')
+  assert _counts(widget) == Counter(['x', word, 'y'])
+
+
+def testPunctuationAndApostrophes(app) -> None:
+  """Words joined by apostrophes and split by punctuation are counted as
+  wordPattern finds them"""
+  widget = DocWidget()
+  widget.setPlainText("don,t stop, it's 4you")
+  _counts(widget)
+  _replace(widget, 3, 4, "'")
+  _replace(widget, 17, 18, '')
+  text = widget.toPlainText()
+  assert text == "don't stop, it's you"
+  assert _counts(widget) == Counter(wordPattern.findall(text))
+
+
+def testRandomEdits(app) -> None:
+  """The vocabulary matches the words of the text after random edits"""
+  rng = random.Random(7)
+  alphabet = "ab'’ ,.1_\n😀é"
+  widget = DocWidget()
+  widget.setPlainText(''.join(rng.choice(alphabet) for _ in range(500)))
+  for _ in range(300):
+    text = widget.toPlainText()
+    start = rng.randrange(len(text) + 1)
+    end = min(start + rng.randrange(4), len(text))
+    added = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(4)))
+    cursor = QTextCursor(widget.document())
+    cursor.setPosition(0)
+    cursor.movePosition(QTextCursor.MoveOperation.Right,
+                        QTextCursor.MoveMode.MoveAnchor, start)
+    cursor.movePosition(QTextCursor.MoveOperation.Right,
+                        QTextCursor.MoveMode.KeepAnchor, end - start)
+    cursor.insertText(added)
+  text = widget.toPlainText()
+  assert _counts(widget) == Counter(wordPattern.findall(text))
@@ -0,0 +1,119 @@
+"""Tests of CompactDictionary against the set based WordList"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+import random
+import stat
+import time
+import tracemalloc
+
+import pytest
+
+from hackboard.pyside import CompactDictionary, WordList, compileDictionary
+from hackboard.pyside import openDictionary
+
+
+@pytest.fixture(scope='module')
+def wordList(tmp_path_factory) -> str:
+  """A word list of random words with frequency counts"""
+  rng, words = random.Random(0), set()
+  while len(words) < 20000:
+    words.add(''.join(rng.choices('abcdefghij', k=rng.randint(3, 10))))
+  fid = str(tmp_path_factory.mktemp('dictionary') / 'words.txt')
+  with open(fid, 'w', encoding='utf-8') as file:
+    for word in sorted(words):
+      file.write('%s %d\n' % (word, rng.randint(1, 1000)))
+  return fid
+
+
+@pytest.fixture(scope='module')
+def compiled(wordList) -> str:
+  """The word list compiled to the memory mapped format"""
+  target = '%s.hbdict' % wordList
+  compileDictionary(wordList, target)
+  return target
+
+
+def _retained(opener) -> tuple[object, int]:
+  """Returns the object opened and the bytes of Python heap it retains"""
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    opened = opener()
+    return opened, tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+
+
+def testSameWords(wordList, compiled) -> None:
+  """The compiled dictionary knows exactly the words of the word list"""
+  dictionary = CompactDictionary(compiled)
+  with open(wordList, encoding='utf-8') as file:
+    words = [line.split()[0] for line in file]
+  assert len(dictionary) == len(words)
+  assert all(word in dictionary for word in words[::97])
+  assert not any(word + 'z' in dictionary for word in words[::97])
+  dictionary.close()
+
+
+def testSuggestAndComplete(compiled) -> None:
+  """Suggestions are within the edit distance and completions share the
+  prefix"""
+  dictionary = CompactDictionary(compiled)
+  word = dictionary.getWord(1234)
+  assert dictionary.suggest(word) == [word]
+  suggestions = dictionary.suggest(word[:-1] + 'z')
+  assert word[:-1] + 'z' not in suggestions and suggestions
+  assert all(found.startswith(word[:2])
+             for found in dictionary.complete(word[:2]))
+  dictionary.close()
+
+
+def testColdStartAndMemory(wordList, compiled) -> None:
+  """Opening the compiled dictionary is faster and retains far less heap
+  than reading the word list into a set"""
+  start = time.perf_counter()
+  dictionary, compactBytes = _retained(lambda: CompactDictionary(compiled))
+  compactTime = time.perf_counter() - start
+  start = time.perf_counter()
+  words, listBytes = _retained(lambda: WordList(wordList))
+  listTime = time.perf_counter() - start
+  assert compactBytes * 20 < listBytes
+  assert compactTime < listTime
+  dictionary.close()
+
+
+def testOpenReadOnlyWordList(tmp_path) -> None:
+  """A word list in a read only directory is compiled to the cache
+  directory, and compiled again when it changes"""
+  source, cache = tmp_path / 'share', str(tmp_path / 'cache')
+  source.mkdir()
+  fid = source / 'words'
+  fid.write_text('alpha\nbeta\n')
+  source.chmod(stat.S_IRUSR | stat.S_IXUSR)
+  try:
+    dictionary = openDictionary(str(fid), cache)
+    assert 'beta' in dictionary and os.listdir(str(source)) == ['words']
+    first = os.listdir(cache)
+    dictionary.close()
+    assert os.listdir(cache) == first
+    source.chmod(stat.S_IRWXU)
+    fid.write_text('gamma\n')
+    os.utime(str(fid), ns=(0, 10 ** 18))
+    dictionary = openDictionary(str(fid), cache)
+    assert 'gamma' in dictionary and 'beta' not in dictionary
+    assert len(os.listdir(cache)) == 1 and os.listdir(cache) != first
+    dictionary.close()
+  finally:
+    source.chmod(stat.S_IRWXU)
+
+
+def testTruncatedFileRejected(compiled, tmp_path) -> None:
+  """A truncated dictionary file raises ValueError"""
+  fid = tmp_path / 'truncated.hbdict'
+  with open(compiled, 'rb') as file:
+    fid.write_bytes(file.read()[:-1])
+  with pytest.raises(ValueError):
+    CompactDictionary(str(fid))
@@ -0,0 +1,51 @@
+"""Tests of FileSaver"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+import stat
+
+from PySide6.QtGui import QTextDocument
+
+from hackboard.pyside import FileSaver, TextSnapshot
+from hackboard.pyside._filesaver import _SaveWorker
+
+
+def _save(fid: str, text: str) -> list:
+  """Saves the text to the file and returns the emitted signals"""
+  saver, emitted = FileSaver(), []
+  saver.saved.connect(lambda name: emitted.append(('saved', name)))
+  saver.failed.connect(lambda msg: emitted.append(('failed', msg)))
+  document = QTextDocument()
+  document.setPlainText(text)
+  saver.save(fid, document)
+  saver.wait()
+  return emitted
+
+
+def testMissingDirectoryFails(app, tmp_path) -> None:
+  """A file in a directory which does not exist is reported as failed"""
+  fid = str(tmp_path / 'missing' / 'x.txt')
+  emitted = _save(fid, 'hello')
+  assert [name for name, _ in emitted] == ['failed']
+  assert not os.path.exists(fid)
+
+
+def testNewFileMode(app, tmp_path) -> None:
+  """A new file is created with the mode allowed by the umask"""
+  mask = os.umask(0o022)
+  os.umask(mask)
+  fid = str(tmp_path / 'x.txt')
+  assert _save(fid, 'hello') == [('saved', fid)]
+  assert stat.S_IMODE(os.stat(fid).st_mode) == 0o666 & ~mask
+
+
+def testEncodeErrorFails(app, tmp_path) -> None:
+  """Text which cannot be encoded fails the save and leaves no file"""
+  fid = str(tmp_path / 'x.txt')
+  worker = _SaveWorker(fid, TextSnapshot.fromText('a\ud800b'), 0, 0, 1024)
+  worker.start()
+  worker.wait()
+  assert isinstance(worker.error, UnicodeError)
+  assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,34 @@
+"""Tests of LogModel"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from hackboard.pyside import LogModel, LogSpool
+
+
+def testQueueBoundedWithoutSpool(app) -> None:
+  """Without a spool only the most recent messages are queued"""
+  model = LogModel(capacity=100)
+  for index in range(1000):
+    model.enqueue('message %d' % index)
+  assert model.pendingCount() == 100
+  model.flush()
+  assert model.rowCount() == 100
+  assert model.message(0) == 'message 900'
+  assert model.message(99) == 'message 999'
+
+
+def testFlushLimitedToBatch(app, tmp_path) -> None:
+  """A flush inserts and spools at most batchLimit messages"""
+  spool = LogSpool(str(tmp_path))
+  model = LogModel(capacity=100000, spool=spool)
+  total = 2 * model.batchLimit + 10
+  for index in range(total):
+    model.enqueue('message %d' % index)
+  model.flush()
+  assert model.rowCount() == spool.count() == model.batchLimit
+  while model.pendingCount():
+    model.flush()
+  assert model.rowCount() == spool.count() == total
+  assert spool.line(total - 1) == 'message %d' % (total - 1)
+  spool.close()
@@ -0,0 +1,47 @@
+"""Tests of LogSpool and LogHistoryModel"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+import os
+
+from hackboard.pyside import LogSpool, LogHistoryModel
+
+
+def testSecondInstanceSpoolsAside(app, tmp_path) -> None:
+  """A spool whose directory is held by another instance writes to a
+  temporary directory, leaving the shared spool intact"""
+  first = LogSpool(str(tmp_path))
+  first.append(['a', 'b'])
+  second = LogSpool(str(tmp_path))
+  assert not first.isTemporary() and second.isTemporary()
+  second.append(['x', 'y', 'z'])
+  first.append(['c'])
+  assert [first.line(row) for row in range(first.count())] == [
+    'a', 'b', 'c']
+  assert second.count() == 3
+  directory = second.getDirectory()
+  second.close()
+  assert not os.path.exists(directory)
+  first.close()
+  third = LogSpool(str(tmp_path))
+  assert not third.isTemporary() and third.count() == 3
+  third.close()
+
+
+def testHistoryStartsAtNewestPage(app, tmp_path) -> None:
+  """The history shows the newest page first and pages in older lines"""
+  spool = LogSpool(str(tmp_path))
+  spool.append(['line %d' % index for index in range(25)])
+  model = LogHistoryModel(spool, pageSize=10)
+  assert model.rowCount() == 10
+  assert model.index(9, 0).data() == 'line 24'
+  assert not model.canFetchMore()
+  assert model.fetchOlder() == 10 and model.fetchOlder() == 5
+  assert not model.canFetchOlder()
+  assert model.index(0, 0).data() == 'line 0'
+  spool.append(['line 25'])
+  assert model.canFetchMore()
+  model.fetchMore()
+  assert model.index(model.rowCount() - 1, 0).data() == 'line 25'
+  spool.close()
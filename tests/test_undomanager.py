@@ -0,0 +1,48 @@
+"""Tests of UndoManager"""
+#  Copyright (c) 2023 Asger Jon Vistisen
+#  MIT Licence
+from __future__ import annotations
+
+from PySide6.QtGui import QTextCursor
+
+from hackboard.pyside import DocWidget
+
+
+def _totalSize(manager) -> int:
+  """Returns the sum of the sizes of the undo steps in memory"""
+  return sum(manager._groupSize(group) for group in manager._undo)
+
+
+def testSizeFollowsTypingAndBackspace(app) -> None:
+  """Backspace taking back typed characters shrinks the estimated size"""
+  widget = DocWidget()
+  manager = widget.getUndoManager()
+  cursor = QTextCursor(widget.document())
+  for _ in range(3):
+    for char in 'hello':
+      cursor.insertText(char)
+    for _ in range(4):
+      cursor.deletePreviousChar()
+    cursor.insertText(' ')
+    cursor.setPosition(0)
+    cursor.deleteChar()
+    cursor.movePosition(QTextCursor.MoveOperation.End)
+    assert manager.getSize() == _totalSize(manager)
+  assert widget.toPlainText() == ' h '
+  manager.undo()
+  assert manager.getSize() == _totalSize(manager)
+
+
+def testUndoRestoresTyping(app) -> None:
+  """Typing and backspace coalesced into one step are undone together"""
+  widget = DocWidget()
+  manager = widget.getUndoManager()
+  cursor = QTextCursor(widget.document())
+  for char in 'word':
+    cursor.insertText(char)
+  cursor.deletePreviousChar()
+  assert widget.toPlainText() == 'wor'
+  manager.undo()
+  assert widget.toPlainText() == ''
+  manager.redo()
+  assert widget.toPlainText() == 'wor'